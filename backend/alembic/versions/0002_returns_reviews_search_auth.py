@@ -0,0 +1,134 @@
+"""returns, reviews, semantic search, refresh tokens, login history
+
+The schema changes made through the models after the baseline:
+- returns.refund_amount and the admin queue index;
+- the products' denormalized rating aggregates, filled from the existing
+  reviews, and the reviews-by-product index;
+- products.embedding, with the vector extension and HNSW index on
+  PostgreSQL (left NULL: the embedding backfill fills it);
+- the refresh_tokens table;
+- the login_history and login_monthly_stats tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-20 09:12:31.470215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.types import EmbeddingVector
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The EMBEDDING_DIM default when this revision was written
+EMBEDDING_DIM = 1536
+RATING_COUNTS = ['rating_count', 'rating_sum'] + [f'rating_{star}_count' for star in range(1, 6)]
+
+
+def upgrade() -> None:
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.batch_alter_table('returns', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('refund_amount', sa.Float(), nullable=True))
+        batch_op.create_index('ix_returns_status_requested_at_id', ['status', 'requested_at', 'id'], unique=False)
+
+    if postgres:
+        op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        for name in RATING_COUNTS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('embedding', EmbeddingVector(EMBEDDING_DIM), nullable=True))
+    if postgres:
+        # Approximate nearest-neighbour index for semantic search (cosine distance)
+        op.create_index(
+            'ix_products_embedding_hnsw', 'products', ['embedding'],
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+        )
+    # Same result as app.services.reviews.recompute_rating_aggregates
+    stars = ', '.join(
+        f'rating_{star}_count = (SELECT count(*) FROM reviews'
+        f' WHERE reviews.product_id = products.id AND reviews.rating = {star})'
+        for star in range(1, 6)
+    )
+    op.execute(
+        'UPDATE products SET '
+        'rating_count = (SELECT count(*) FROM reviews WHERE reviews.product_id = products.id), '
+        'rating_sum = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.product_id = products.id), '
+        f'{stars}'
+    )
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_product_id_created_at', ['product_id', 'created_at'], unique=False)
+
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('family_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('refresh_tokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_family_id'), ['family_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_token_hash'), ['token_hash'], unique=True)
+        batch_op.create_index(batch_op.f('ix_refresh_tokens_user_id'), ['user_id'], unique=False)
+
+    op.create_table('login_history',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=True),
+    sa.Column('login_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('ip_address', postgresql.INET().with_variant(sa.String(length=45), 'sqlite'), nullable=True),
+    sa.Column('device_agent', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('login_history', schema=None) as batch_op:
+        batch_op.create_index('idx_login_history_login_at', ['login_at', 'user_id'], unique=False)
+
+    op.create_table('login_monthly_stats',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('active_users', sa.Integer(), nullable=False),
+    sa.Column('login_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('login_monthly_stats')
+    with op.batch_alter_table('login_history', schema=None) as batch_op:
+        batch_op.drop_index('idx_login_history_login_at')
+
+    op.drop_table('login_history')
+    with op.batch_alter_table('refresh_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_refresh_tokens_user_id'))
+        batch_op.drop_index(batch_op.f('ix_refresh_tokens_token_hash'))
+        batch_op.drop_index(batch_op.f('ix_refresh_tokens_family_id'))
+
+    op.drop_table('refresh_tokens')
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_product_id_created_at')
+
+    op.drop_index('ix_products_embedding_hnsw', table_name='products', if_exists=True)
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('embedding')
+        for name in reversed(RATING_COUNTS):
+            batch_op.drop_column(name)
+
+    with op.batch_alter_table('returns', schema=None) as batch_op:
+        batch_op.drop_index('ix_returns_status_requested_at_id')
+        batch_op.drop_column('refund_amount')
@@ -0,0 +1,48 @@
+"""per-product reorder threshold
+
+Adds products.reorder_threshold and the partial index holding the
+products that are under it (app.services.low_stock).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 19:41:12.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The LOW_STOCK_THRESHOLD default when this revision was written
+DEFAULT_THRESHOLD = 10
+
+# As the model renders it on each dialect; SQLite only uses a partial index whose WHERE the query repeats
+LOW_STOCK = {
+    'postgresql_where': sa.text('is_active = true AND stock_quantity < reorder_threshold'),
+    'sqlite_where': sa.text('is_active = 1 AND stock_quantity < reorder_threshold'),
+}
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'reorder_threshold', sa.Integer(),
+            server_default=str(DEFAULT_THRESHOLD), nullable=False,
+        ))
+
+    op.create_index(
+        'ix_products_low_stock', 'products', ['stock_quantity', 'id'], unique=False,
+        **LOW_STOCK,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_low_stock', table_name='products')
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('reorder_threshold')
@@ -0,0 +1,96 @@
+"""hot path indexes and integrity constraints
+
+Indexes for the per-user and catalog lookups that were table scans:
+- orders by user, newest first (GET /orders/me);
+- order items by order (loading an order's items);
+- addresses by user;
+- featured products (is_featured first: nearly every product is active,
+  so is_active alone narrows nothing and the catalog page is read in
+  table order).
+The promo code lookup (code, is_active) is already served by the unique
+index on code, so it gets no index of its own.
+
+Constraints the application assumed but the database did not enforce:
+- one wishlist row per user and product (its index also serves the
+  user's wishlist);
+- at most one default address per user;
+- no negative stock or reorder threshold, no empty order lines.
+Rows that break them are fixed first, or the constraints can't be added.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 19:52:40.118934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_ADDRESS = {
+    'postgresql_where': sa.text('is_default = true'),
+    'sqlite_where': sa.text('is_default = 1'),
+}
+
+
+def upgrade() -> None:
+    # Keep the earliest wishlist row of each (user, product) pair
+    op.execute(
+        "DELETE FROM wishlists WHERE EXISTS ("
+        "SELECT 1 FROM wishlists AS earlier"
+        " WHERE earlier.user_id = wishlists.user_id"
+        " AND earlier.product_id = wishlists.product_id"
+        " AND (earlier.created_at < wishlists.created_at"
+        " OR (earlier.created_at = wishlists.created_at AND earlier.id < wishlists.id)))"
+    )
+    # Keep the most recent default address of each user
+    op.execute(
+        "UPDATE addresses SET is_default = false WHERE is_default = true AND EXISTS ("
+        "SELECT 1 FROM addresses AS later"
+        " WHERE later.user_id = addresses.user_id AND later.is_default = true"
+        " AND (later.created_at > addresses.created_at"
+        " OR (later.created_at = addresses.created_at AND later.id > addresses.id)))"
+    )
+    op.execute("UPDATE products SET stock_quantity = 0 WHERE stock_quantity < 0")
+    op.execute("UPDATE products SET reorder_threshold = 0 WHERE reorder_threshold < 0")
+
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_addresses_user_id'), 'addresses', ['user_id'], unique=False)
+    op.create_index('uq_addresses_user_id_default', 'addresses', ['user_id'], unique=True, **DEFAULT_ADDRESS)
+    op.create_index('ix_products_is_featured_is_active', 'products', ['is_featured', 'is_active'], unique=False)
+
+    # Batch mode: SQLite can only add constraints by rebuilding the table
+    with op.batch_alter_table('wishlists', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_wishlists_user_id_product_id', ['user_id', 'product_id'])
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_products_stock_quantity_non_negative', 'stock_quantity >= 0')
+        batch_op.create_check_constraint('ck_products_reorder_threshold_non_negative', 'reorder_threshold >= 0')
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_order_items_quantity_positive', 'quantity > 0')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_order_items_quantity_positive', type_='check')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_products_reorder_threshold_non_negative', type_='check')
+        batch_op.drop_constraint('ck_products_stock_quantity_non_negative', type_='check')
+
+    with op.batch_alter_table('wishlists', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_wishlists_user_id_product_id', type_='unique')
+
+    op.drop_index('ix_products_is_featured_is_active', table_name='products')
+    op.drop_index('uq_addresses_user_id_default', table_name='addresses')
+    op.drop_index(op.f('ix_addresses_user_id'), table_name='addresses')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
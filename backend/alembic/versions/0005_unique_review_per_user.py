@@ -0,0 +1,54 @@
+"""one review per user and product
+
+The review endpoint only checked for an existing review before inserting,
+so two concurrent requests could both insert. Duplicates are removed first,
+keeping each user's most recent review, and the rating aggregates of the
+products are recomputed from what is left.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-20 10:05:17.836402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the most recent review of each (user, product) pair
+    op.execute(
+        "DELETE FROM reviews WHERE EXISTS ("
+        "SELECT 1 FROM reviews AS later"
+        " WHERE later.user_id = reviews.user_id"
+        " AND later.product_id = reviews.product_id"
+        " AND (later.created_at > reviews.created_at"
+        " OR (later.created_at = reviews.created_at AND later.id > reviews.id)))"
+    )
+    # Same result as app.services.reviews.recompute_rating_aggregates
+    stars = ', '.join(
+        f'rating_{star}_count = (SELECT count(*) FROM reviews'
+        f' WHERE reviews.product_id = products.id AND reviews.rating = {star})'
+        for star in range(1, 6)
+    )
+    op.execute(
+        'UPDATE products SET '
+        'rating_count = (SELECT count(*) FROM reviews WHERE reviews.product_id = products.id), '
+        'rating_sum = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.product_id = products.id), '
+        f'{stars}'
+    )
+
+    # Batch mode: SQLite can only add constraints by rebuilding the table
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_reviews_user_id_product_id', ['user_id', 'product_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_reviews_user_id_product_id', type_='unique')
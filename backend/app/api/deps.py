@@ -1,34 +1,70 @@
+import logging
+import uuid
+from typing import NamedTuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
+from app.core.metrics import timed
 from app.core.config import settings
 from app.db.session import get_db
 from app.models.all import User
+from app.services.token_revocation import get_revocation_list
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
+
+class TokenUser(NamedTuple):
+    """The signed-in user as described by their access token (no database row)."""
+    id: uuid.UUID
+    email: str
+    role: str
+
+
+async def _is_revoked(payload: dict) -> bool:
+    try:
+        return await get_revocation_list().is_revoked(payload.get("jti"), payload.get("uid"), payload.get("iat", 0))
+    except Exception:
+        # Tokens are short-lived; an outage of the revocation store must not log everyone out
+        logger.warning("Revocation list unavailable, accepting token", exc_info=True)
+        return False
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    """
+    Tokens carrying uid and role claims are trusted as-is, so most requests
+    authenticate without a query. Role changes therefore take effect when
+    the user's tokens are revoked (revoke_user) or expire.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with timed("auth"):
+        try:
+            payload = security.decode_access_token(token)
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
+        if await _is_revoked(payload):
+            raise credentials_exception
+
+        if "uid" in payload and "role" in payload:
+            return TokenUser(uuid.UUID(payload["uid"]), email, payload["role"])
+
+        # Tokens issued before uid/role claims existed
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+        if user is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalars().first()
-    if user is None:
-        raise credentials_exception
-    return user
+        return user
 
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -1,82 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from typing import List
-from ..models.all import get_db, Address, User
-from ..schemas.all import AddressCreate, AddressResponse
-from ..dependencies import get_current_user
+import uuid
+from app.api import deps
+from app.models.all import Address
+from app.schemas.all import AddressCreate, AddressResponse
+from app.db.session import get_db
 
 router = APIRouter()
 
+
+async def get_address_or_404(db: AsyncSession, address_id: uuid.UUID, user_id: uuid.UUID) -> Address:
+    result = await db.execute(
+        select(Address).where(Address.id == address_id, Address.user_id == user_id)
+    )
+    address = result.scalars().first()
+    if not address:
+        raise HTTPException(status_code=404, detail="Address not found")
+    return address
+
+
+async def unset_default(db: AsyncSession, user_id: uuid.UUID) -> None:
+    # Before setting a new default: uq_addresses_user_id_default allows one per user
+    await db.execute(
+        update(Address)
+        .where(Address.user_id == user_id, Address.is_default == True)
+        .values(is_default=False)
+    )
+
+
 @router.get("/addresses", response_model=List[AddressResponse])
-def get_addresses(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_addresses(
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all saved addresses for the current user"""
-    return db.query(Address).filter(Address.user_id == current_user.id).all()
+    result = await db.execute(
+        select(Address).where(Address.user_id == current_user.id).order_by(Address.created_at)
+    )
+    return result.scalars().all()
+
 
 @router.post("/addresses", response_model=AddressResponse, status_code=status.HTTP_201_CREATED)
-def create_address(
-    address: AddressCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def create_address(
+    address_in: AddressCreate,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new shipping address"""
-    # If this is set as default, unset other defaults
-    if address.is_default:
-        db.query(Address).filter(Address.user_id == current_user.id).update({"is_default": False})
-    
-    db_address = Address(**address.dict(), user_id=current_user.id)
-    db.add(db_address)
-    db.commit()
-    db.refresh(db_address)
-    return db_address
+    if address_in.is_default:
+        await unset_default(db, current_user.id)
+    address = Address(**address_in.model_dump(), user_id=current_user.id)
+    db.add(address)
+    await db.commit()
+    await db.refresh(address)
+    return address
+
 
 @router.put("/addresses/{address_id}", response_model=AddressResponse)
-def update_address(
-    address_id: int,
-    address: AddressCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def update_address(
+    address_id: uuid.UUID,
+    address_in: AddressCreate,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an existing address"""
-    db_address = db.query(Address).filter(
-        Address.id == address_id,
-        Address.user_id == current_user.id
-    ).first()
-    
-    if not db_address:
-        raise HTTPException(status_code=404, detail="Address not found")
-    
-    # If this is set as default, unset other defaults
-    if address.is_default:
-        db.query(Address).filter(
-            Address.user_id == current_user.id,
-            Address.id != address_id
-        ).update({"is_default": False})
-    
-    for key, value in address.dict().items():
-        setattr(db_address, key, value)
-    
-    db.commit()
-    db.refresh(db_address)
-    return db_address
+    address = await get_address_or_404(db, address_id, current_user.id)
+    if address_in.is_default and not address.is_default:
+        await unset_default(db, current_user.id)
+    for key, value in address_in.model_dump().items():
+        setattr(address, key, value)
+    await db.commit()
+    await db.refresh(address)
+    return address
+
 
 @router.delete("/addresses/{address_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_address(
-    address_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def delete_address(
+    address_id: uuid.UUID,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an address"""
-    db_address = db.query(Address).filter(
-        Address.id == address_id,
-        Address.user_id == current_user.id
-    ).first()
-    
-    if not db_address:
-        raise HTTPException(status_code=404, detail="Address not found")
-    
-    db.delete(db_address)
-    db.commit()
-    return None
+    address = await get_address_or_404(db, address_id, current_user.id)
+    await db.delete(address)
+    await db.commit()
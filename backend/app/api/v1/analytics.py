@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
 from app.api import deps
+from app.core.slow_queries import slow_query_log
 from app.models.all import Order, User, Product
 from app.db.session import get_db
+from app.services import login_history
+from app.services.low_stock import low_stock_products
 
 router = APIRouter()
 
@@ -23,12 +26,46 @@ async def get_admin_stats(
     total_users = user_result.scalar() or 0
 
     # Low Stock Products
-    stock_query = select(Product).where(Product.stock_quantity < 10).limit(5)
-    stock_result = await db.execute(stock_query)
-    low_stock = stock_result.scalars().all()
+    low_stock = await low_stock_products(db, limit=5)
 
     return {
         "total_sales": total_sales,
         "total_users": total_users,
         "low_stock_products": [p.name for p in low_stock]
     }
+
+
+@router.get("/logins/monthly")
+async def get_monthly_active_logins(
+    months: int = Query(12, ge=1, le=60),
+    db: AsyncSession = Depends(get_db),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    """
+    Monthly Active Logins from the login_monthly_stats rollup (refreshed by
+    the analytics.rollup_logins task), oldest month first.
+    """
+    return await login_history.monthly_active_logins(db, months=months)
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total", pattern="^(total|max|count|slow)$"),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    """
+    Top SQL fingerprints on this API worker, by total time (default), max
+    time, executions or slow executions. Slow samples and EXPLAIN plans are
+    included where captured.
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "queries": slow_query_log.top(limit=limit, order_by=order_by),
+    }
+
+
+@router.delete("/slow-queries")
+async def reset_slow_queries(admin: deps.User = Depends(deps.get_current_admin)):
+    slow_query_log.reset()
+    return {"status": "success"}
@@ -1,14 +1,19 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api import deps
 from app.core import security
 from app.core.config import settings
+from app.core.metrics import timed
 from app.db.session import get_db
 from app.models.all import User
-from app.schemas.all import Token, UserCreate, UserResponse
+from app.schemas.all import RefreshRequest, Token, UserCreate, UserResponse
+from app.services import refresh_tokens
+from app.services.login_history import login_history
+from app.services.token_revocation import get_revocation_list
 
 router = APIRouter()
 
@@ -20,9 +25,11 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
+    with timed("auth"):
+        hashed_password = security.get_password_hash(user_in.password)
     user = User(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         full_name=user_in.full_name,
     )
     db.add(user)
@@ -32,18 +39,79 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
 
 @router.post("/token", response_model=Token)
 async def login_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalars().first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    with timed("auth"):
+        authenticated = user is not None and security.verify_password(form_data.password, user.hashed_password)
+    if not authenticated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token = refresh_tokens.issue_refresh_token(db, user.id)
+    await db.commit()
+    login_history.record(
+        user.id, request.client.host if request.client else None, request.headers.get("user-agent")
+    )
+    return _token_response(user.id, user.email, user.role, refresh_token)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    The presented refresh token is used up; sending it again revokes the session.
+    """
+    try:
+        rotation = await refresh_tokens.rotate_refresh_token(db, body.refresh_token)
+    except refresh_tokens.InvalidRefreshToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _token_response(rotation.user_id, rotation.email, rotation.role, rotation.refresh_token)
+
+@router.post("/logout", status_code=204)
+async def logout(
+    body: Optional[RefreshRequest] = None,
+    everywhere: bool = False,
+    token: str = Depends(deps.oauth2_scheme),
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Revoke this access token (and the refresh token, if sent), or with
+    ?everywhere=true every access and refresh token of the user.
+    """
+    revocations = get_revocation_list()
+    if everywhere:
+        await refresh_tokens.revoke_refresh_tokens(db, user_id=current_user.id)
+        await db.commit()
+        await revocations.revoke_user(str(current_user.id))
+        return Response(status_code=204)
+
+    if body is not None:
+        family_id = await refresh_tokens.family_of(db, body.refresh_token, current_user.id)
+        if family_id is not None:
+            await refresh_tokens.revoke_refresh_tokens(db, family_id=family_id)
+            await db.commit()
+    # Tokens issued before jti claims existed can't be singled out; they just expire
+    claims = security.decode_access_token(token)
+    if "jti" in claims:
+        await revocations.revoke(claims["jti"], claims["exp"])
+    return Response(status_code=204)
+
+def _token_response(user_id, email: str, role: str, refresh_token: str) -> dict:
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email, "uid": str(user_id), "role": role},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
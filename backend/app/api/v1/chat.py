@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+import logging
+import uuid
+from app.api import deps
+from app.schemas.all import ChatRequest
+from app.db.session import get_db
+from app.services import chat as chat_service
+from app.services.llm import get_llm
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream an assistant reply as Server-Sent Events.
+
+    Events: `message` ({"token": ...}) per chunk, then `end` ({"thread_id": ...}),
+    or `error` if the model fails. Pass `thread_id` back to continue a conversation.
+    """
+    user_id = current_user.id
+    # Streams are long-lived: give the DB connection back before the first token
+    await db.close()
+
+    lease = await chat_service.stream_limiter.acquire()
+    if lease is None:
+        raise HTTPException(
+            status_code=429,
+            detail="The assistant is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        thread_id = str(request.thread_id or uuid.uuid4())
+        history = chat_service.get_chat_history()
+        history_key = f"{user_id}:{thread_id}"
+        past = await history.get(history_key)
+
+        # Only opening questions are context-free enough to share across users
+        cached_answer = None
+        cache = flight = None
+        if not past:
+            # Embeddings and numpy load with the first conversation, not at startup
+            from app.services.semantic_cache import get_semantic_cache
+            cache = get_semantic_cache()
+            try:
+                # Waits while the same question is being streamed to someone else
+                cached_answer, flight = await cache.begin(request.message)
+            except Exception:
+                logger.exception("Semantic cache lookup failed")
+    except Exception:
+        lease.release()
+        raise
+
+    async def finish(answer: str = None):
+        """Cache the answer (None: none was produced) and release requests waiting for it."""
+        if flight is None:
+            return
+        try:
+            await cache.finish(flight, answer)
+        except Exception:
+            logger.exception("Semantic cache store failed")
+
+    async def release():
+        lease.release()
+        # No answer: requests waiting on this one call the model themselves
+        await finish()
+
+    async def events():
+        try:
+            async for event in chat_service.stream_reply(
+                get_llm(), history, history_key, thread_id, request.message, past,
+                cached_answer=cached_answer, on_complete=finish,
+            ):
+                yield event
+        finally:
+            await release()
+
+    return chat_service.SSEResponse(
+        events(),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also frees the slot if the client disconnects or stalls before the first event
+        background=BackgroundTask(release),
+    )
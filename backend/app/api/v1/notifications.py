@@ -2,6 +2,7 @@
 Notification API endpoints for BeeManHoney
 Handles email configuration and test endpoints.
 """
+import asyncio
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
@@ -44,7 +45,9 @@ async def test_email(
     Send a test email to verify email configuration.
     Accessible to authenticated users.
     """
-    result = email_service.send_email(
+    # Reports the SMTP result, so it is sent here, on a thread off the event loop
+    result = await asyncio.to_thread(
+        email_service.send_email,
         to_email=request.email,
         template_name="test_email",
         context={}
@@ -115,7 +118,8 @@ async def test_email_config(
         # Try to use the user's email as fallback
         admin_email = current_user.email
     
-    result = email_service.send_email(
+    result = await asyncio.to_thread(
+        email_service.send_email,
         to_email=admin_email,
         template_name="test_email",
         context={}
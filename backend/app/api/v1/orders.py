@@ -1,20 +1,30 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 from app.api import deps
-from app.models.all import Order, OrderItem, Product, PromoCode
+from app.core.metrics import timed
+from app.core.serialization import json_response
+from app.models.all import Order, OrderItem, Product, PromoCode, User
 from app.schemas.all import OrderCreate, OrderResponse
 from app.db.session import get_db
-from app.services.email import email_service
+from app.services.catalog_cache import bump_catalog_version, stock_scopes
+from app.services.low_stock import alert_entry, became_low, record_low_stock
+from app.services.task_queue import enqueue
 
 router = APIRouter()
 
 
-async def send_order_email(order: Order, user, status: str):
-    """Send order status change email to customer."""
+async def send_order_email(db: AsyncSession, order: Order, user, status: str):
+    """Queue the order status change email to the customer."""
+    from app.services.email import email_service
     if not email_service.is_configured():
         return  # Skip if email not configured
+    if not isinstance(user, User):
+        # The token-based user (deps.TokenUser) carries no name: load the row
+        user = await db.get(User, user.id) or user
     
     templates = {
         "pending": "order_confirmation",
@@ -31,18 +41,22 @@ async def send_order_email(order: Order, user, status: str):
     # Note: In production, you'd fetch order items from DB
     
     context = {
-        "customer_name": user.full_name or "Valued Customer",
+        "customer_name": getattr(user, "full_name", None) or "Valued Customer",
         "order_id": str(order.id),
         "total_amount": order.total_amount,
         "status": status,
         "items_text": items_text
     }
     
-    email_service.send_email(
-        to_email=user.email,
-        template_name=template,
-        context=context
-    )
+    with timed("email"):
+        # SMTP runs on the email workers; without a broker, on a thread here
+        if not await enqueue("email.send", user.email, template, context):
+            await asyncio.to_thread(
+                email_service.send_email,
+                to_email=user.email,
+                template_name=template,
+                context=context
+            )
 
 
 @router.post("/", response_model=OrderResponse)
@@ -58,6 +72,8 @@ async def create_order(
     # Calculate subtotal
     subtotal = 0.0
     db_items = []
+    products = []
+    went_low = []
     
     # Calculate Total and Verify Stock
     for item in order_in.items:
@@ -69,7 +85,11 @@ async def create_order(
             raise HTTPException(status_code=400, detail=f"Not enough stock for {product.name}")
         
         # Deduct Stock
+        products.append(product)
+        stock_before = product.stock_quantity
         product.stock_quantity -= item.quantity
+        if became_low(product, stock_before):
+            went_low.append(alert_entry(product))
         
         # Calculate Price
         cost = product.price * item.quantity
@@ -142,10 +162,20 @@ async def create_order(
         db.add(db_item)
         
     await db.commit()
-    await db.refresh(order)
+    # Stock levels changed: only the pages showing these products' stock
+    await bump_catalog_version(*stock_scopes(products))
+    await record_low_stock(went_low)
+    # Load items in the same round trip; lazy loading them during serialization fails under asyncio
+    result = await db.execute(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.id == order.id)
+        .execution_options(populate_existing=True)
+    )
+    order = result.scalars().one()
     
     # Send order confirmation email
-    await send_order_email(order, current_user, "pending")
+    await send_order_email(db, order, current_user, "pending")
     
     return order
 
@@ -155,8 +185,13 @@ async def read_my_orders(
     current_user: deps.User = Depends(deps.get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(Order).where(Order.user_id == current_user.id))
-    return result.scalars().all()
+    result = await db.execute(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc())
+    )
+    return json_response(list[OrderResponse], result.scalars().all())
 
 
 @router.patch("/{order_id}/status")
@@ -167,7 +202,10 @@ async def update_order_status(
     db: AsyncSession = Depends(get_db)
 ):
     """Update order status (admin only) - sends email notification to customer."""
-    valid_statuses = ["pending", "processing", "shipped", "delivered", "cancelled", "returned"]
+    valid_statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
+    if status == "returned":
+        # Set by processing the order's return, which also restocks and refunds it
+        raise HTTPException(status_code=400, detail="Orders are marked returned by processing their return")
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
     
@@ -190,6 +228,6 @@ async def update_order_status(
     
     # Send status change email
     # Note: Need to fetch user for email - simplified here
-    # await send_order_email(order, user, status)
+    # await send_order_email(db, order, user, status)
     
     return {"success": True, "message": f"Order status updated to {status}"}
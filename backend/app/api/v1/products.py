@@ -1,21 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+import sys
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List, Optional
 from app.api import deps
-from app.schemas.all import ProductCreate, ProductResponse
+from app.core.serialization import json_response
+from app.schemas.all import ProductCreate, ProductResponse, ProductDetailResponse
 from app.models.all import Product
-from app.db.session import get_db
+from app.db.session import get_db, get_primary_db
+from app.services.catalog_cache import (
+    bump_catalog_version, catalog_conditional_get, featured_conditional_get, product_conditional_get,
+)
+from app.services.index_version import bump_index_version
+from app.services.low_stock import alert_entry, became_low, record_low_stock
+from app.services.task_queue import enqueue
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ProductResponse])
+# Fields that feed the product embedding; changing any of them invalidates it
+EMBEDDED_FIELDS = ("name", "category", "description")
+
+
+async def _publish_index_change(product_id: int, vector=None) -> None:
+    """
+    Put a committed product change into this worker's vector index (vector
+    None: remove the product) and publish a new index version. Other workers
+    rebuild their copy; this one adopts the version, as it holds the change.
+    """
+    version = await bump_index_version()
+    # Checked through sys.modules: a process that never searched shouldn't load numpy for this
+    module = sys.modules.get("app.services.vector_index")
+    if module is None:
+        return
+    if vector is None:
+        module.product_index.remove([product_id])
+    else:
+        module.product_index.add([product_id], [vector])
+    module.product_index.adopt_version(version)
+
+
+# Catalog GETs read the primary: their ETags come from versions bumped once it has committed
+@router.get("/", response_model=List[ProductResponse], dependencies=[Depends(catalog_conditional_get)])
 async def read_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     active_only: bool = True,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_primary_db)
 ):
     query = select(Product)
     if active_only:
@@ -24,31 +56,50 @@ async def read_products(
         query = query.where(Product.name.ilike(f"%{search}%"))
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return json_response(List[ProductResponse], result.scalars().all(), headers=response.headers)
 
-@router.get("/featured", response_model=List[ProductResponse])
+@router.get("/featured", response_model=List[ProductResponse], dependencies=[Depends(featured_conditional_get)])
 async def read_featured_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_primary_db)
 ):
     query = select(Product).where(
         Product.is_featured == True,
         Product.is_active == True
     ).offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return json_response(List[ProductResponse], result.scalars().all(), headers=response.headers)
 
-@router.get("/{product_id}", response_model=ProductResponse)
+@router.get("/semantic-search", response_model=List[ProductResponse], dependencies=[Depends(catalog_conditional_get)])
+async def semantic_search_products(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_primary_db)
+):
+    """Find products by meaning rather than by name, e.g. "something for a sore throat"."""
+    from app.services import embeddings
+    products = await embeddings.semantic_search(db, q, limit=limit)
+    return json_response(List[ProductResponse], products, headers=response.headers)
+
+@router.get("/{product_id}", response_model=ProductDetailResponse, dependencies=[Depends(product_conditional_get)])
 async def read_product(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_primary_db)
 ):
     result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalars().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    # "Similar honeys" come from the in-process vector index, not the database
+    from app.services.vector_index import product_index
+    await product_index.ensure_loaded(db)
+    detail = ProductDetailResponse.model_validate(product)
+    detail.similar_product_ids = [item_id for item_id, _ in product_index.similar(product.id)]
+    return json_response(ProductDetailResponse, detail, headers=response.headers)
 
 @router.post("/", response_model=ProductResponse)
 async def create_product(
@@ -56,10 +107,13 @@ async def create_product(
     db: AsyncSession = Depends(get_db),
     admin: deps.User = Depends(deps.get_current_admin)
 ):
-    product = Product(**product_in.dict())
+    product = Product(**product_in.model_dump())
     db.add(product)
     await db.commit()
+    await bump_catalog_version()
     await db.refresh(product)
+    # Searchable once the AI worker has embedded it
+    await enqueue("ai.embed_products", [product.id])
     return product
 
 @router.put("/{product_id}", response_model=ProductResponse)
@@ -74,10 +128,31 @@ async def update_product(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    for field, value in product_in.dict(exclude_unset=True).items():
+    updates = product_in.model_dump(exclude_unset=True)
+    stock_before, threshold_before = product.stock_quantity, product.reorder_threshold
+    active_before = product.is_active
+    embedding_changed = any(
+        field in updates and updates[field] != getattr(product, field) for field in EMBEDDED_FIELDS
+    )
+    if embedding_changed:
+        # Re-embedded by the AI worker after the commit
+        product.embedding = None
+    for field, value in updates.items():
         setattr(product, field, value)
+    went_low = became_low(product, stock_before, threshold_before)
     
     await db.commit()
+    await bump_catalog_version()
+    if embedding_changed or product.is_active != active_before:
+        vector = None
+        if product.is_active and not embedding_changed:
+            # Reactivated: its stored vector goes back into the index
+            vector = await db.scalar(select(Product.embedding).where(Product.id == product.id))
+        await _publish_index_change(product.id, vector)
+    if went_low:
+        await record_low_stock([alert_entry(product)])
+    if embedding_changed:
+        await enqueue("ai.embed_products", [product.id])
     await db.refresh(product)
     return product
 
@@ -94,6 +169,7 @@ async def toggle_featured(
     
     product.is_featured = not product.is_featured
     await db.commit()
+    await bump_catalog_version()
     await db.refresh(product)
     return product
 
@@ -110,4 +186,6 @@ async def delete_product(
     
     await db.delete(product)
     await db.commit()
+    await bump_catalog_version()
+    await _publish_index_change(product_id)
     return {"status": "success"}
@@ -0,0 +1,153 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from datetime import datetime
+from typing import List, Optional
+import uuid
+from app.api import deps
+from app.models.all import Order, Return
+from app.schemas.all import ReturnCreate, ReturnResponse, ReturnQueuePage, ReturnProcessRequest
+from app.db.session import get_db
+from app.services import returns as returns_service
+from app.services.catalog_cache import bump_catalog_version
+
+router = APIRouter()
+
+
+async def get_return_or_404(db: AsyncSession, return_id: uuid.UUID) -> Return:
+    result = await db.execute(select(Return).where(Return.id == return_id))
+    ret = result.scalars().first()
+    if not ret:
+        raise HTTPException(status_code=404, detail="Return not found")
+    return ret
+
+
+@router.post("/", response_model=ReturnResponse)
+async def request_return(
+    return_in: ReturnCreate,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Request a return for one of the current user's delivered orders."""
+    result = await db.execute(
+        select(Order).where(Order.id == return_in.order_id, Order.user_id == current_user.id)
+    )
+    order = result.scalars().first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.status not in returns_service.RETURNABLE_ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Orders with status '{order.status}' cannot be returned")
+
+    result = await db.execute(
+        select(Return.id).where(
+            Return.order_id == order.id,
+            Return.status.in_(returns_service.OPEN_RETURN_STATUSES)
+        )
+    )
+    if result.first():
+        raise HTTPException(status_code=400, detail="A return is already open for this order")
+
+    ret = Return(
+        order_id=order.id,
+        reason=return_in.reason,
+        status="pending",
+        requested_at=datetime.utcnow()
+    )
+    order.return_reason = return_in.reason
+    db.add(ret)
+    await db.commit()
+    await db.refresh(ret)
+    return ret
+
+
+@router.get("/me", response_model=List[ReturnResponse])
+async def read_my_returns(
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(Return)
+        .join(Order, Return.order_id == Order.id)
+        .where(Order.user_id == current_user.id)
+        .order_by(Return.requested_at.desc())
+    )
+    return result.scalars().all()
+
+
+@router.get("/queue", response_model=ReturnQueuePage)
+async def read_return_queue(
+    status: str = "pending",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    """Admin returns queue, oldest first. Pass `next_cursor` back as `cursor` for the next page."""
+    limit = max(1, min(limit, 200))
+    try:
+        items, next_cursor = await returns_service.fetch_return_queue(
+            db, status=status, limit=limit, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.patch("/{return_id}/approve", response_model=ReturnResponse)
+async def approve_return(
+    return_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    ret = await get_return_or_404(db, return_id)
+    if ret.status != "pending":
+        raise HTTPException(status_code=400, detail=f"Cannot approve a {ret.status} return")
+    ret.status = "approved"
+    await db.commit()
+    await db.refresh(ret)
+    return ret
+
+
+@router.patch("/{return_id}/reject", response_model=ReturnResponse)
+async def reject_return(
+    return_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    ret = await get_return_or_404(db, return_id)
+    if ret.status not in returns_service.OPEN_RETURN_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Cannot reject a {ret.status} return")
+    ret.status = "rejected"
+    ret.processed_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(ret)
+    return ret
+
+
+@router.post("/process", response_model=List[ReturnResponse])
+async def process_returns(
+    request: ReturnProcessRequest,
+    db: AsyncSession = Depends(get_db),
+    admin: deps.User = Depends(deps.get_current_admin)
+):
+    """Process a batch of approved returns: restock items and record refunds."""
+    return_ids = list(dict.fromkeys(request.return_ids))
+    result = await db.execute(select(Return.id, Return.status).where(Return.id.in_(return_ids)))
+    statuses = dict(result.all())
+
+    missing = [str(rid) for rid in return_ids if rid not in statuses]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Returns not found: {', '.join(missing)}")
+    not_approved = [str(rid) for rid in return_ids if statuses[rid] != "approved"]
+    if not_approved:
+        raise HTTPException(status_code=400, detail=f"Returns not approved: {', '.join(not_approved)}")
+
+    # Only the returns this request claims are restocked and refunded
+    processed = await returns_service.process_returns(db, return_ids)
+    if not processed:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Returns were processed by another request")
+    await db.commit()
+    # Restocked items are visible in the catalog again
+    await bump_catalog_version()
+    return processed
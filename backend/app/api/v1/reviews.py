@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List
+import uuid
+from app.api import deps
+from app.models.all import Product, Review
+from app.schemas.all import ReviewCreate, ReviewResponse, RatingSummary
+from app.db.session import get_db
+from app.services import reviews as reviews_service
+from app.services.catalog_cache import bump_catalog_version
+
+router = APIRouter()
+
+
+@router.post("/", response_model=ReviewResponse)
+async def create_review(
+    review_in: ReviewCreate,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(select(Product.id).where(Product.id == review_in.product_id))
+    if not result.first():
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    review = Review(**review_in.model_dump(), user_id=current_user.id)
+    db.add(review)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # uq_reviews_user_id_product_id: no need to look it up first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="You have already reviewed this product")
+    await reviews_service.apply_rating_delta(db, review.product_id, review.rating, 1)
+    await db.commit()
+    # Product listings show the rating aggregates
+    await bump_catalog_version()
+    await db.refresh(review)
+    return review
+
+
+@router.get("/", response_model=List[ReviewResponse])
+async def read_reviews(
+    product_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db)
+):
+    query = (
+        select(Review)
+        .where(Review.product_id == product_id)
+        .order_by(Review.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get("/summary/{product_id}", response_model=RatingSummary)
+async def read_rating_summary(
+    product_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Rating count, average and star histogram, read straight from the product row."""
+    result = await db.execute(select(Product).where(Product.id == product_id))
+    product = result.scalars().first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {
+        "product_id": product.id,
+        "rating_count": product.rating_count,
+        "rating_average": product.rating_average,
+        "rating_histogram": product.rating_histogram,
+    }
+
+
+@router.delete("/{review_id}")
+async def delete_review(
+    review_id: uuid.UUID,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(select(Review).where(Review.id == review_id))
+    review = result.scalars().first()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if review.user_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    await reviews_service.apply_rating_delta(db, review.product_id, review.rating, -1)
+    await db.delete(review)
+    await db.commit()
+    await bump_catalog_version()
+    return {"status": "success"}
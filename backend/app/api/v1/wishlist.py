@@ -1,62 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from typing import List
-from ..models.all import get_db, Wishlist, Product, User
-from ..schemas.all import WishlistCreate, WishlistResponse
-from ..dependencies import get_current_user
+import uuid
+from app.api import deps
+from app.models.all import Product, Wishlist
+from app.schemas.all import WishlistCreate, WishlistResponse
+from app.db.session import get_db
 
 router = APIRouter()
 
+
 @router.get("/wishlist", response_model=List[WishlistResponse])
-def get_wishlist(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def read_wishlist(
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all items in user's wishlist"""
-    return db.query(Wishlist).filter(Wishlist.user_id == current_user.id).all()
+    result = await db.execute(select(Wishlist).where(Wishlist.user_id == current_user.id))
+    return result.scalars().all()
+
 
 @router.post("/wishlist", response_model=WishlistResponse, status_code=status.HTTP_201_CREATED)
-def add_to_wishlist(
+async def add_to_wishlist(
     item: WishlistCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a product to wishlist"""
-    # Check if already in wishlist
-    existing = db.query(Wishlist).filter(
-        Wishlist.user_id == current_user.id,
-        Wishlist.product_id == item.product_id
-    ).first()
-    
-    if existing:
-        raise HTTPException(status_code=400, detail="Product already in wishlist")
-    
-    # Check if product exists
-    product = db.query(Product).filter(Product.id == item.product_id).first()
-    if not product:
+    result = await db.execute(select(Product.id).where(Product.id == item.product_id))
+    if not result.first():
         raise HTTPException(status_code=404, detail="Product not found")
-    
-    db_item = Wishlist(user_id=current_user.id, product_id=item.product_id)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+
+    wishlist_item = Wishlist(user_id=current_user.id, product_id=item.product_id)
+    db.add(wishlist_item)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # uq_wishlists_user_id_product_id: no need to look it up first
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Product already in wishlist")
+    await db.refresh(wishlist_item)
+    return wishlist_item
+
 
 @router.delete("/wishlist/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_from_wishlist(
-    item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def remove_from_wishlist(
+    item_id: uuid.UUID,
+    current_user: deps.User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Remove a product from wishlist"""
-    db_item = db.query(Wishlist).filter(
-        Wishlist.id == item_id,
-        Wishlist.user_id == current_user.id
-    ).first()
-    
-    if not db_item:
+    result = await db.execute(
+        select(Wishlist).where(Wishlist.id == item_id, Wishlist.user_id == current_user.id)
+    )
+    wishlist_item = result.scalars().first()
+    if not wishlist_item:
         raise HTTPException(status_code=404, detail="Wishlist item not found")
-    
-    db.delete(db_item)
-    db.commit()
-    return None
+    await db.delete(wishlist_item)
+    await db.commit()
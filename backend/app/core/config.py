@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +7,11 @@ class Settings(BaseSettings):
 
     # DATABASE
     DATABASE_URL: str
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replicas for GET requests (app/db/routing.py)
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0  # A replica further behind is skipped until it catches up
+    DB_REPLICA_LAG_CHECK_SECONDS: float = 2.0  # A replica's measured lag is reused this long
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0  # After a user's write request, their reads use the primary
+    DB_STICKINESS_BACKEND: str = "redis"  # redis (shared by all workers), memory (single process, tests)
 
     # REDIS
     REDIS_URL: str
@@ -13,12 +19,125 @@ class Settings(BaseSettings):
     # SECURITY - JWT_SECRET must be set in environment
     JWT_SECRET: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Short: clients renew with their refresh token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # LOGIN HISTORY - login events are buffered and written in batches
+    LOGIN_HISTORY_ENABLED: bool = True
+    LOGIN_HISTORY_BATCH_SIZE: int = 500  # Flush as soon as this many events are waiting
+    LOGIN_HISTORY_FLUSH_SECONDS: float = 5.0  # Otherwise flush this long after the first event
+    LOGIN_HISTORY_MAX_PENDING: int = 10000  # Drop the oldest events beyond this while the DB is down
+    AUTH_REVOCATION_BACKEND: str = "redis"  # redis, memory
+    AUTH_TOKEN_CACHE_SIZE: int = 4096  # Verified tokens remembered per process
 
     # AI
-    OPENAI_API_KEY: str
+    OPENAI_API_KEY: str = ""  # Only needed by the openai providers; checked on first use
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    LLM_PROVIDER: str = "openai"  # openai, stub (deterministic fake for tests)
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_PROVIDER: str = "openai"  # openai, local (deterministic hashing embedder)
+    EMBEDDING_DIM: int = 1536
+    EMBEDDING_BATCH_SIZE: int = 100
+    VECTOR_EF_SEARCH: int = 40  # HNSW search breadth; higher = better recall, slower
+    VECTOR_INDEX_PATH: str = ""  # Directory for the memory-mapped in-process index; empty = rebuild from DB
+    VECTOR_INDEX_VERSION_BACKEND: str = "redis"  # redis (shared by all workers), memory (single process, tests)
+
+    # SEMANTIC CACHE - reuse assistant answers for near-duplicate questions
+    SEMANTIC_CACHE_BACKEND: str = "redis"  # redis, memory
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL_SECONDS: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+
+    # CHAT STREAMING - per worker node limits (see Docs/13_Performance_SLA.md)
+    CHAT_MAX_CONCURRENT_STREAMS: int = 50
+    CHAT_QUEUE_TIMEOUT_SECONDS: float = 2.0  # Wait this long for a free slot, then 429
+    CHAT_STREAM_BUFFER_TOKENS: int = 256  # Tokens buffered ahead of a slow client
+    CHAT_SLOW_CLIENT_TIMEOUT_SECONDS: float = 30.0  # Drop a client that takes this long to accept one event
+    CHAT_HISTORY_BACKEND: str = "redis"  # redis, memory
+    CHAT_HISTORY_MAX_MESSAGES: int = 20
+    CHAT_HISTORY_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # RATE LIMITING - token buckets per client, written as "<requests>/<second|minute|hour>"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "redis"  # redis, memory
+    RATE_LIMIT_DEFAULT_IP: str = "120/minute"  # Anonymous clients, keyed by IP
+    RATE_LIMIT_DEFAULT_USER: str = "300/minute"  # Signed-in clients, keyed by user
+    # Stricter per-route limits; "METHOD /path", a trailing * matches a prefix
+    RATE_LIMIT_RULES: Dict[str, str] = {
+        "POST /api/v1/auth/token": "10/minute",
+        "POST /api/v1/auth/register": "5/minute",
+        "GET /api/v1/products/": "60/minute",
+        "GET /api/v1/products/semantic-search": "30/minute",
+        "POST /api/v1/chat/stream": "20/minute",
+    }
+    RATE_LIMIT_EXEMPT_PATHS: str = "/health,/metrics,/docs,/redoc,/api/v1/openapi.json"
+
+    # CATALOG HTTP CACHE - ETag/Last-Modified on public product GETs
+    CATALOG_CACHE_BACKEND: str = "redis"  # redis, memory
+    CATALOG_CACHE_MAX_AGE: int = 30  # Seconds browsers/CDNs may reuse a response without revalidating
+    CATALOG_CACHE_STALE_WHILE_REVALIDATE: int = 120
+
+    # RESPONSE COMPRESSION - gzip, or brotli when installed and accepted
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies aren't worth the CPU
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; 4 is about gzip speed with smaller output
+
+    # OBSERVABILITY
+    DB_ECHO: bool = False  # Log every SQL statement (development only)
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 500
+    SLOW_QUERY_SAMPLES: int = 5  # Recent slow executions kept per fingerprint
+    SLOW_QUERY_LOG_PARAMETERS: bool = False  # Parameters can contain personal data
+    SLOW_QUERY_EXPLAIN: bool = False  # PostgreSQL: capture EXPLAIN (ANALYZE, BUFFERS) for slow SELECTs
+    SLOW_QUERY_EXPLAIN_SAMPLES: int = 3  # Plans kept per fingerprint (ANALYZE re-runs the query)
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics at /metrics
+    SERVER_TIMING_ENABLED: bool = True  # Per-request db/auth/serialize breakdown header
+
+    # HEALTH PROBES - /health/live and /health/ready
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 1.0  # Per dependency; a hung check counts as failed
+    HEALTH_CACHE_SECONDS: float = 2.0  # Reuse the last readiness result this long
+    HEALTH_POOL_WAIT_THRESHOLD_MS: int = 250  # Not ready if getting a DB connection takes longer
+    HEALTH_CRITICAL_CHECKS: str = "database,redis"  # Others (smtp) only report "degraded"
+
+    # PRODUCTION SERVER - python -m app.server (gunicorn + uvicorn workers)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # Worker processes; 0 = one per CPU core
+    SERVER_MAX_WORKERS: int = 8  # Cap for the automatic count (each worker has its own DB pool)
+    SERVER_PRELOAD: bool = True  # Import the app once in the master; workers share it copy-on-write
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds a worker gets to finish requests and drain on shutdown
+    SERVER_KEEPALIVE: int = 5  # Keep-alive seconds; keep above the load balancer's idle timeout
+    SERVER_MAX_REQUESTS: int = 0  # Recycle a worker after this many requests (0 = never)
+    SERVER_BACKLOG: int = 2048
+
+    # STARTUP WARM-UP - app/core/lifespan.py, before a worker accepts traffic
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 5  # Pool connections opened up front (keep <= the pool size)
+    WARMUP_TIMEOUT_SECONDS: float = 10.0  # Per step; a slow dependency doesn't hold up startup
+
+    # SCHEDULER - periodic jobs inside the API processes (app/services/scheduler.py)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LOCK_BACKEND: str = "redis"  # redis (one leader across replicas), memory (single process, tests)
+    SCHEDULER_LEADER_TTL_SECONDS: float = 30.0  # A dead leader is replaced within this
+    SCHEDULER_TICK_SECONDS: float = 1.0
+    MONTHLY_REPORT_CRON: str = "0 7 1 * *"  # UTC; reports the previous month
+
+    # LOW STOCK ALERTS - app/services/low_stock.py
+    LOW_STOCK_THRESHOLD: int = 10  # Reorder threshold for new products; each product can set its own
+    LOW_STOCK_ALERT_BACKEND: str = "redis"  # redis (shared by all workers), memory (single process, tests)
+    LOW_STOCK_ALERT_DEBOUNCE_SECONDS: int = 60  # Send once no product went low for this long...
+    LOW_STOCK_ALERT_MAX_DELAY_SECONDS: int = 900  # ...or the first one has waited this long
+
+    # CELERY WORKER
+    CELERY_BROKER_URL: str = ""  # Defaults to REDIS_URL
+    CELERY_RESULT_BACKEND: str = ""  # Defaults to REDIS_URL
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # Run tasks inline, no broker (tests)
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = 1  # AI tasks are long; don't hoard them
+    CELERY_WORKER_CONCURRENCY: int = 4
+    CELERY_WORKER_MAX_TASKS_PER_CHILD: int = 200
+    TASK_QUEUE_BACKEND: str = "celery"  # celery (API hands work to the workers), memory (kept in-process, tests)
+    AI_BATCH_MAX_SIZE: int = 64  # Max items coalesced into one embedding request
+    AI_BATCH_MAX_WAIT_MS: int = 20  # How long the first item waits for company
 
     # EMAIL - SMTP Configuration
     SMTP_HOST: str = ""
@@ -0,0 +1,203 @@
+"""
+Application lifespan for BeeManHoney.
+
+`resources` owns what an API process shares between requests: the
+database engine and its pool, the Redis client, buffered writers and
+background tasks that live as long as the process (the job scheduler,
+app/services/scheduler.py). On startup it warms them up before uvicorn
+accepts traffic, so the first requests after a deploy don't pay for
+connection setup, SQL compilation or cache loads. On shutdown it stops
+the background tasks and closes everything in reverse order of
+registration.
+
+Warm-up is best effort: a step that fails or exceeds WARMUP_TIMEOUT_SECONDS
+is logged and skipped, and /health/ready reports the dependency instead.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.db.redis import close_redis, get_redis
+from app.db.session import dispose_engine
+from app.services.login_history import login_history
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Callable[[], Awaitable[Any]]
+
+# Stores that talk to Redis unless switched to their in-memory backend
+_REDIS_BACKENDS = (
+    "RATE_LIMIT_BACKEND", "CATALOG_CACHE_BACKEND", "AUTH_REVOCATION_BACKEND",
+    "SEMANTIC_CACHE_BACKEND", "CHAT_HISTORY_BACKEND", "SCHEDULER_LOCK_BACKEND",
+    "LOW_STOCK_ALERT_BACKEND", "VECTOR_INDEX_VERSION_BACKEND",
+)
+
+
+class Resources:
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine] = None,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        timeout: float = settings.WARMUP_TIMEOUT_SECONDS,
+    ):
+        self._engine = engine
+        self._session_factory = session_factory
+        self.timeout = timeout
+        self._closers: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            from app.db.session import engine
+            self._engine = engine
+        return self._engine
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @property
+    def closers(self) -> List[str]:
+        """Names of the registered closers, in the order close() runs them."""
+        return [name for name, _ in reversed(self._closers)]
+
+    def on_close(self, name: str, closer: Callable[[], Awaitable[Any]]) -> None:
+        """Run `closer` on shutdown; later registrations run first."""
+        self._closers.append((name, closer))
+
+    def spawn(self, coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+        """Run `coro` for the life of the process; it is cancelled on shutdown."""
+        task = asyncio.ensure_future(coro)
+        if name:
+            task.set_name(name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # --- Warm-up ---
+    async def _warm_database(self) -> Dict[str, Any]:
+        """Open pool connections ahead of the first requests, concurrently."""
+        results = await asyncio.gather(
+            *(self.engine.connect() for _ in range(max(1, settings.WARMUP_DB_CONNECTIONS))),
+            return_exceptions=True,
+        )
+        connections = [c for c in results if not isinstance(c, BaseException)]
+        try:
+            await asyncio.gather(*(c.execute(text("SELECT 1")) for c in connections))
+        finally:
+            for connection in connections:
+                await connection.close()
+        if not connections:
+            raise results[0]
+        return {"connections": len(connections)}
+
+    async def _warm_redis(self) -> Dict[str, Any]:
+        if not any(getattr(settings, name) == "redis" for name in _REDIS_BACKENDS):
+            return {"skipped": "no Redis-backed store"}
+        await get_redis().ping()
+        return {}
+
+    async def _warm_catalog(self) -> Dict[str, Any]:
+        """Compile and run the catalog page query and build its serializer."""
+        from sqlalchemy import select
+        from app.core.serialization import dump_json
+        from app.models.all import Product
+        from app.schemas.all import ProductResponse
+        from app.services.catalog_cache import get_catalog_version
+
+        await get_catalog_version().current()
+        async with self.session_factory() as db:
+            result = await db.execute(select(Product).where(Product.is_active == True).limit(20))
+            dump_json(List[ProductResponse], result.scalars().all())
+        return {}
+
+    async def _warm_vector_index(self) -> Dict[str, Any]:
+        """
+        Map the vector index snapshot, if there is one.
+
+        The snapshot is memory-mapped, so every worker on the host shares the
+        same pages. Without one, building the index means NumPy and a scan
+        of every embedding in each worker; that is left to the first request
+        that needs it (semantic search on SQLite, a product page).
+        """
+        if not settings.VECTOR_INDEX_PATH:
+            return {"skipped": "no VECTOR_INDEX_PATH, built on first use"}
+        from app.services.vector_index import product_index
+
+        async with self.session_factory() as db:
+            await product_index.ensure_loaded(db)
+        return {"vectors": len(product_index)}
+
+    def warmup_steps(self) -> Dict[str, WarmupStep]:
+        return {
+            "database": self._warm_database,
+            "redis": self._warm_redis,
+            "catalog": self._warm_catalog,
+            "vector_index": self._warm_vector_index,
+        }
+
+    async def warm_up(self, steps: Optional[Dict[str, WarmupStep]] = None) -> Dict[str, Dict[str, Any]]:
+        """Run each warm-up step in turn; a failure or timeout only skips that step."""
+        for name, step in (steps or self.warmup_steps()).items():
+            start = time.perf_counter()
+            try:
+                outcome = dict(await asyncio.wait_for(step(), timeout=self.timeout) or {})
+            except asyncio.TimeoutError:
+                outcome = {"error": f"timed out after {self.timeout:g}s"}
+            except Exception as e:
+                outcome = {"error": str(e) or type(e).__name__}
+            outcome["ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.warmup[name] = outcome
+            if "error" in outcome:
+                logger.warning("Warm-up step %s failed: %s", name, outcome["error"])
+        logger.info("Warm-up done: %s", self.warmup)
+        return self.warmup
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        if settings.WARMUP_ENABLED:
+            await self.warm_up()
+        if settings.SCHEDULER_ENABLED:
+            from app.services.scheduler import get_scheduler
+            self.spawn(get_scheduler().run(), "scheduler")
+
+    async def close(self) -> None:
+        """Cancel background tasks, then run the closers (newest first). Never raises."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.timeout)
+        for name, closer in reversed(self._closers):
+            try:
+                await closer()
+            except Exception:
+                logger.warning("Closing %s failed", name, exc_info=True)
+
+
+resources = Resources()
+# Closed newest first: buffered login events are written before the pools they need go away
+resources.on_close("database", dispose_engine)
+resources.on_close("redis", close_redis)
+resources.on_close("login_history", login_history.flush)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await resources.start()
+    try:
+        yield
+    finally:
+        await resources.close()
@@ -0,0 +1,310 @@
+"""
+HTTP middleware for BeeManHoney.
+
+Written as plain ASGI middleware (not BaseHTTPMiddleware) so streaming
+responses pass through untouched and each request pays one function call.
+"""
+import logging
+import math
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jose import JWTError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.services.rate_limit import Rate, get_rate_limiter, parse_rate
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitMiddleware:
+    """
+    Token bucket rate limiting in front of every route.
+
+    A client is its user when it sends a valid bearer token, otherwise its IP
+    (run uvicorn with --proxy-headers behind a proxy so this is the real
+    client). The most specific RATE_LIMIT_RULES entry for the request applies,
+    else the user or IP default. Over-limit requests get 429 with Retry-After
+    before any route code or DB work runs. If the limiter backend is down,
+    requests are let through rather than failing the API.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Optional[Dict[str, str]] = None,
+        default_ip: str = settings.RATE_LIMIT_DEFAULT_IP,
+        default_user: str = settings.RATE_LIMIT_DEFAULT_USER,
+        exempt_paths: str = settings.RATE_LIMIT_EXEMPT_PATHS,
+        enabled: bool = settings.RATE_LIMIT_ENABLED,
+    ):
+        self.app = app
+        self.enabled = enabled
+        self.default_ip = parse_rate(default_ip)
+        self.default_user = parse_rate(default_user)
+        self.exempt_paths = tuple(p.strip() for p in exempt_paths.split(",") if p.strip())
+        self._exact: Dict[Tuple[str, str], Tuple[str, Rate]] = {}
+        self._prefixes: List[Tuple[str, str, str, Rate]] = []
+        for spec, value in (settings.RATE_LIMIT_RULES if rules is None else rules).items():
+            method, path = spec.split(" ", 1)
+            rate = parse_rate(value)
+            if path.endswith("*"):
+                self._prefixes.append((method.upper(), path[:-1], spec, rate))
+            else:
+                self._exact[(method.upper(), path)] = (spec, rate)
+        # Longest prefix wins
+        self._prefixes.sort(key=lambda rule: len(rule[1]), reverse=True)
+
+    def _is_exempt(self, path: str) -> bool:
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.exempt_paths)
+
+    def _route_rule(self, method: str, path: str) -> Optional[Tuple[str, Rate]]:
+        rule = self._exact.get((method, path))
+        if rule is not None:
+            return rule
+        for rule_method, prefix, spec, rate in self._prefixes:
+            if rule_method == method and path.startswith(prefix):
+                return spec, rate
+        return None
+
+    def _identify(self, scope: Scope) -> Tuple[str, bool]:
+        """Return (client key, is signed-in user)."""
+        authorization = Headers(scope=scope).get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                payload = decode_access_token(token)
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}", True
+            except JWTError:
+                pass
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled or self._is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        identity, is_user = self._identify(scope)
+        rule = self._route_rule(scope["method"], scope["path"])
+        rule_id, rate = rule if rule else ("default", self.default_user if is_user else self.default_ip)
+
+        try:
+            result = await get_rate_limiter().hit(f"{rule_id}:{identity}", rate)
+        except Exception:
+            logger.warning("Rate limiter unavailable, allowing request", exc_info=True)
+            await self.app(scope, receive, send)
+            return
+
+        if not result.allowed:
+            response = JSONResponse(
+                {"detail": "Too many requests, please slow down"},
+                status_code=429,
+                headers={
+                    "Retry-After": str(max(1, math.ceil(result.retry_after))),
+                    "X-RateLimit-Limit": str(result.limit),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(result.limit)
+                headers["X-RateLimit-Remaining"] = str(result.remaining)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31: gzip container rather than raw zlib
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with brotli (if installed) or gzip.
+
+    Bodies under `minimum_size`, already-encoded responses and Server-Sent
+    Events are passed through untouched. Streamed bodies are compressed
+    chunk by chunk. Strong ETags are made weak, because the encoded bytes
+    differ from the identity representation.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = settings.COMPRESSION_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _negotiate(self, accept_encoding: str) -> Optional[Tuple[str, Callable[[], object]]]:
+        accepted = _accepted_encodings(accept_encoding)
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br", lambda: _BrotliEncoder(self.brotli_quality)
+        if accepted.get("gzip", 0) > 0:
+            return "gzip", lambda: _GzipEncoder(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        negotiated = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if negotiated is None:
+            await self.app(scope, receive, send)
+            return
+        encoding, make_encoder = negotiated
+
+        start: Optional[Message] = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith("text/event-stream")
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the first body chunk shows the size
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                encoder = make_encoder()
+                body = encoder.compress(body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body += encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            else:
+                body = encoder.compress(body)
+                if not more_body:
+                    body += encoder.finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and SQL usage per route, and adds Server-Timing.
+
+    Server-Timing lists SQL time and statement count, any phases recorded
+    with metrics.timed() (auth, serialize) and the total, as measured up to
+    the moment the response headers are sent.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = settings.SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = metrics.RequestTimings()
+        token = metrics._current.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        metrics.http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            method, route = scope["method"], metrics.route_label(scope)
+            metrics.http_requests_in_progress.dec()
+            metrics.http_requests_total.inc(method, route, str(status))
+            metrics.http_request_duration_seconds.observe(elapsed, method, route)
+            metrics.http_request_db_queries.observe(timings.db_queries, method, route)
+            metrics.http_request_db_seconds.observe(timings.db_seconds, method, route)
+            metrics._current.reset(token)
@@ -1,6 +1,11 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import jwt
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import time
+import uuid
+from jose import jwk, jwt
+from jose.exceptions import ExpiredSignatureError
 import bcrypt
 from app.core.config import settings
 
@@ -31,6 +36,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.ALGORITHM)
+    # Fractional iat so a per-user revocation cut-off can't catch a token issued in the same second
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt.encode(to_encode, _signing_key(settings.JWT_SECRET, settings.ALGORITHM), algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+@lru_cache(maxsize=4)
+def _signing_key(secret: str, algorithm: str):
+    """Parsed key; python-jose would otherwise rebuild it on every encode and decode"""
+    return jwk.construct(secret, algorithm)
+
+_verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token and return its claims, raising JWTError if it is invalid.
+
+    Verified claims are remembered per token (bounded LRU), so the rate
+    limiter, the auth dependency and every later request with the same
+    token pay for the signature check once. Expiry is checked on every call.
+    Callers must not modify the returned dict.
+    """
+    claims = _verified.get(token)
+    if claims is not None:
+        if claims.get("exp", float("inf")) <= time.time():
+            _verified.pop(token, None)
+            raise ExpiredSignatureError("Signature has expired.")
+        _verified.move_to_end(token)
+        return claims
+    claims = jwt.decode(token, _signing_key(settings.JWT_SECRET, settings.ALGORITHM), algorithms=[settings.ALGORITHM])
+    _verified[token] = claims
+    if len(_verified) > settings.AUTH_TOKEN_CACHE_SIZE:
+        _verified.popitem(last=False)
+    return claims
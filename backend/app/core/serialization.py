@@ -0,0 +1,48 @@
+"""
+Fast JSON responses for BeeManHoney.
+
+For large list endpoints FastAPI's response_model path validates the return
+value, dumps it to Python dicts and then runs json.dumps over those dicts.
+json_response() validates once and has pydantic-core write JSON bytes
+directly. Keep response_model on the route so the OpenAPI schema is
+unchanged.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core.metrics import timed
+
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def dump_json(tp: Any, content: Any) -> bytes:
+    """Validate `content` (ORM objects, dicts or models) as `tp` and encode it to JSON bytes."""
+    adapter = _adapter(tp)
+    with timed("serialize"):
+        return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(
+    tp: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    Return `content` serialized as `tp`, bypassing FastAPI's response_model pass.
+
+    Headers set on an injected `response: Response` are not merged into a
+    returned Response, so pass them through as `headers=response.headers`.
+    """
+    return Response(
+        dump_json(tp, content),
+        status_code=status_code,
+        headers=dict(headers) if headers else None,
+        media_type="application/json",
+    )
@@ -0,0 +1,170 @@
+"""
+Slow query log for BeeManHoney.
+
+Every SQL statement timed by the engine events in app.core.metrics is
+reduced to a fingerprint, with literals, placeholders and IN-lists
+normalised, and aggregated per fingerprint: count, total and max time.
+Statements slower than SLOW_QUERY_THRESHOLD_MS are also logged and sampled.
+On PostgreSQL, SLOW_QUERY_EXPLAIN captures EXPLAIN (ANALYZE, BUFFERS) plans
+for the first few slow SELECTs of each fingerprint.
+
+Aggregates are per process and kept in memory; see
+GET /api/v1/analytics/slow-queries.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|\?|(?<!:):\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_RE = re.compile(r"(values\s*)\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalise a SQL statement so executions that differ only in values group together."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _WHITESPACE_RE.sub(" ", sql).strip().lower()
+    sql = _IN_LIST_RE.sub("(?)", sql)
+    return _VALUES_RE.sub(r"\1(?)", sql)
+
+
+class QueryStats:
+    __slots__ = ("id", "fingerprint", "count", "total_seconds", "max_seconds",
+                 "slow_count", "last_seen", "samples", "plans")
+
+    def __init__(self, fp: str, samples: int):
+        self.id = hashlib.sha1(fp.encode("utf-8")).hexdigest()[:12]
+        self.fingerprint = fp
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_count = 0
+        self.last_seen = 0.0
+        self.samples: Deque[Dict[str, Any]] = deque(maxlen=samples)
+        self.plans: List[Any] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "slow_count": self.slow_count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "last_seen": self.last_seen,
+            "samples": list(self.samples),
+            "plans": list(self.plans),
+        }
+
+
+class SlowQueryLog:
+    """Per-fingerprint aggregates plus samples of statements over the threshold."""
+
+    ORDER_BY = {
+        "total": lambda s: s.total_seconds,
+        "max": lambda s: s.max_seconds,
+        "count": lambda s: s.count,
+        "slow": lambda s: s.slow_count,
+    }
+
+    def __init__(
+        self,
+        threshold_ms: float = settings.SLOW_QUERY_THRESHOLD_MS,
+        max_fingerprints: int = settings.SLOW_QUERY_MAX_FINGERPRINTS,
+        samples: int = settings.SLOW_QUERY_SAMPLES,
+        log_parameters: bool = settings.SLOW_QUERY_LOG_PARAMETERS,
+        explain: bool = settings.SLOW_QUERY_EXPLAIN,
+        explain_samples: int = settings.SLOW_QUERY_EXPLAIN_SAMPLES,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.samples = samples
+        self.log_parameters = log_parameters
+        self.explain = explain
+        self.explain_samples = explain_samples
+        self._stats: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn, statement: str, parameters: Any, elapsed: float) -> None:
+        fp = fingerprint(statement)
+        slow = elapsed >= self.threshold
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    # Make room by forgetting the cheapest fingerprint
+                    cheapest = min(self._stats.values(), key=lambda s: s.total_seconds)
+                    if cheapest.total_seconds > elapsed:
+                        return
+                    del self._stats[cheapest.fingerprint]
+                stats = self._stats[fp] = QueryStats(fp, self.samples)
+            stats.count += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.last_seen = time.time()
+            if not slow:
+                return
+            stats.slow_count += 1
+            sample = {"duration_ms": round(elapsed * 1000, 3), "at": stats.last_seen}
+            if self.log_parameters:
+                sample["parameters"] = repr(parameters)[:500]
+            stats.samples.append(sample)
+            want_plan = self.explain and len(stats.plans) < self.explain_samples
+
+        logger.warning("Slow query %s (%.1f ms): %s", stats.id, elapsed * 1000, fp[:300])
+        if want_plan:
+            plan = self._explain(conn, statement, parameters)
+            if plan is not None:
+                stats.plans.append(plan)
+
+    def _explain(self, conn, statement: str, parameters: Any) -> Optional[Any]:
+        """Run EXPLAIN (ANALYZE, BUFFERS) for a slow SELECT on PostgreSQL."""
+        if conn.dialect.name != "postgresql" or not statement.lstrip().lower().startswith("select"):
+            return None
+        # Raw DBAPI cursor: no engine events (no recursion), and a savepoint
+        # so a failing EXPLAIN can't abort the caller's transaction
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                plan = cursor.fetchall()[0][0]
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+                return plan
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+        except Exception:
+            logger.warning("Could not capture EXPLAIN for slow query", exc_info=True)
+            return None
+        finally:
+            cursor.close()
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[Dict[str, Any]]:
+        key = self.ORDER_BY[order_by]
+        with self._lock:
+            ranked = sorted(self._stats.values(), key=key, reverse=True)[:limit]
+            return [stats.as_dict() for stats in ranked]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+slow_query_log = SlowQueryLog()
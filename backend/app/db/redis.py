@@ -0,0 +1,20 @@
+from typing import Optional
+from redis.asyncio import Redis
+from app.core.config import settings
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Redis:
+    """Process-wide async Redis client (connection pool is created lazily on first command)."""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,199 @@
+"""
+Read/write session routing for BeeManHoney.
+
+Requests that may write (POST, PUT, PATCH, DELETE) use the primary,
+DATABASE_URL. GET and HEAD requests, which covers the analytics endpoints,
+read from the replicas in DATABASE_REPLICA_URLS in turn, except:
+- the caller made a write request in the last DB_READ_YOUR_WRITES_SECONDS:
+  their reads stay on the primary, so they see their own changes;
+- a replica more than DB_REPLICA_MAX_LAG_SECONDS behind, or unreachable, is
+  skipped until its next lag check. With no replica left, reads go to the
+  primary.
+Without replicas configured everything uses the primary. Endpoints whose
+validators must match the primary (the catalog ETags) take their session
+from get_primary_db instead.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
+from jose import jwt
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AsyncSession]
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+db_read_routing_total = registry.register(Counter(
+    "db_read_routing_total", "Read sessions by target (replica, primary_sticky, primary_lag)", ("target",)))
+
+# 0 when the replica has replayed everything it received, else the age of the last replayed transaction
+_PG_REPLICATION_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+async def replication_lag(engine: AsyncEngine) -> float:
+    """Seconds a replica is behind its primary; 0 where there is nothing to measure (SQLite, a primary)."""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    async with engine.connect() as connection:
+        lag = await connection.scalar(_PG_REPLICATION_LAG)
+    return float(lag or 0.0)
+
+
+class Stickiness:
+    """Base class for read-your-writes stores: who wrote recently."""
+
+    async def mark(self, key: str, seconds: float) -> None:
+        raise NotImplementedError
+
+    async def is_sticky(self, key: str) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryStickiness(Stickiness):
+    """Per-process store for tests and single-worker deployments."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, max_entries: int = 100_000):
+        self._clock = clock
+        self.max_entries = max_entries
+        self._until: Dict[str, float] = {}
+
+    async def mark(self, key: str, seconds: float) -> None:
+        now = self._clock()
+        if len(self._until) >= self.max_entries:
+            self._until = {k: until for k, until in self._until.items() if until > now}
+        self._until[key] = now + seconds
+
+    async def is_sticky(self, key: str) -> bool:
+        return self._until.get(key, 0.0) > self._clock()
+
+
+class RedisStickiness(Stickiness):
+    """Store shared by every API worker: one key per recent writer, expiring by itself."""
+
+    def __init__(self, redis=None, prefix: str = "db:wrote:"):
+        self._redis = redis
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def mark(self, key: str, seconds: float) -> None:
+        await self.redis.set(f"{self.prefix}{key}", 1, px=max(1, int(seconds * 1000)))
+
+    async def is_sticky(self, key: str) -> bool:
+        return bool(await self.redis.exists(f"{self.prefix}{key}"))
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine, session_factory: SessionFactory):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.lag = 0.0
+        self.checked_at = -math.inf
+
+
+class SessionRouter:
+    def __init__(
+        self,
+        primary: SessionFactory,
+        replicas: Sequence[Replica] = (),
+        stickiness: Optional[Stickiness] = None,
+        lag_probe: Callable[[AsyncEngine], Awaitable[float]] = replication_lag,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._stickiness = stickiness
+        self._lag_probe = lag_probe
+        self._clock = clock
+        self._turn = itertools.count()
+
+    @property
+    def stickiness(self) -> Stickiness:
+        if self._stickiness is None:
+            self._stickiness = InMemoryStickiness() if settings.DB_STICKINESS_BACKEND == "memory" else RedisStickiness()
+        return self._stickiness
+
+    async def _in_sync(self, replica: Replica) -> bool:
+        now = self._clock()
+        if now - replica.checked_at >= settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            # Claimed before the probe, so concurrent requests don't all probe at once
+            replica.checked_at = now
+            try:
+                replica.lag = await asyncio.wait_for(
+                    self._lag_probe(replica.engine), timeout=settings.DB_REPLICA_LAG_CHECK_SECONDS
+                )
+            except Exception:
+                logger.warning("Replica %s unavailable, reading from the primary", replica.engine.url, exc_info=True)
+                replica.lag = math.inf
+            if replica.lag > settings.DB_REPLICA_MAX_LAG_SECONDS:
+                logger.warning("Replica %s is %.1fs behind, skipping it", replica.engine.url, replica.lag)
+        return replica.lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+    async def read_factory(self) -> SessionFactory:
+        """Sessions on the next replica that is in sync, else on the primary."""
+        start = next(self._turn)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if await self._in_sync(replica):
+                db_read_routing_total.inc("replica")
+                return replica.session_factory
+        db_read_routing_total.inc("primary_lag")
+        return self.primary
+
+    async def _wrote_recently(self, caller: str) -> bool:
+        try:
+            return await self.stickiness.is_sticky(caller)
+        except Exception:
+            # Can't tell: the primary is always up to date
+            logger.warning("Read-your-writes store unavailable", exc_info=True)
+            return True
+
+    async def factory_for(self, method: str, caller: Optional[str] = None) -> SessionFactory:
+        """Pick the database for a request; a write request makes the caller's reads sticky."""
+        if not self.replicas:
+            return self.primary
+        if method not in READ_METHODS:
+            if caller:
+                try:
+                    await self.stickiness.mark(caller, settings.DB_READ_YOUR_WRITES_SECONDS)
+                except Exception:
+                    logger.warning("Read-your-writes store unavailable", exc_info=True)
+            return self.primary
+        if caller and await self._wrote_recently(caller):
+            db_read_routing_total.inc("primary_sticky")
+            return self.primary
+        return await self.read_factory()
+
+
+def caller_key(authorization: Optional[str]) -> Optional[str]:
+    """
+    The user behind a bearer token, for stickiness only. The token is not
+    verified here (the auth dependency does that), so a forged one can at
+    most send its own reads to the primary.
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        claims = jwt.get_unverified_claims(authorization[7:].strip())
+    except Exception:
+        return None
+    subject = claims.get("uid") or claims.get("sub")
+    return str(subject) if subject else None
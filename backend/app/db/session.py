@@ -1,10 +1,62 @@
+from typing import Optional
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.routing import Replica, SessionRouter, caller_key
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = create_async_engine(settings.DATABASE_URL, echo=settings.DB_ECHO)
+instrument_engine(engine.sync_engine)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
+# Read replicas (DATABASE_REPLICA_URLS); see app/db/routing.py
+replica_engines = [
+    create_async_engine(url.strip(), echo=settings.DB_ECHO)
+    for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+]
+for _replica in replica_engines:
+    instrument_engine(_replica.sync_engine)
+
+_session_router: Optional[SessionRouter] = None
+
+
+def get_session_router() -> SessionRouter:
+    global _session_router
+    if _session_router is None:
+        _session_router = SessionRouter(AsyncSessionLocal, [
+            Replica(e, sessionmaker(e, class_=AsyncSession, expire_on_commit=False)) for e in replica_engines
+        ])
+    return _session_router
+
+
+def set_session_router(router: Optional[SessionRouter]) -> None:
+    """Override the process-wide router (tests). None resets to the default."""
+    global _session_router
+    _session_router = router
+
+
+async def get_db(request: Request):
+    """Session for the request: on a replica for reads, on the primary for writes."""
+    router = get_session_router()
+    caller = caller_key(request.headers.get("authorization")) if router.replicas else None
+    factory = await router.factory_for(request.method, caller)
+    async with factory() as session:
+        yield session
+
+
+async def get_primary_db():
+    """
+    Session on the primary, whatever the method. For GETs validated by the
+    catalog ETags: their versions are bumped right after the primary commits,
+    so a lagging replica would serve an old body under the new ETag.
+    """
+    async with get_session_router().primary() as session:
         yield session
+
+
+async def dispose_engine():
+    """Close pooled connections (shutdown); checked-out ones close when returned."""
+    await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
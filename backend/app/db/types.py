@@ -0,0 +1,42 @@
+"""
+Portable column types.
+"""
+import json
+from sqlalchemy import Text, TypeDecorator
+
+
+class EmbeddingVector(TypeDecorator):
+    """Embedding vector column.
+
+    Uses pgvector's VECTOR(dim) on PostgreSQL so HNSW indexes can be built
+    on it, and a JSON-encoded TEXT column elsewhere (SQLite tests, dev).
+    Values are always plain lists of floats on the Python side.
+    """
+    impl = Text
+
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        super().__init__()
+        self.dim = dim
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            from pgvector.sqlalchemy import Vector
+            return dialect.type_descriptor(Vector(self.dim))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        value = [float(v) for v in value]
+        if dialect.name == 'postgresql':
+            return value
+        return json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        if isinstance(value, str):
+            return json.loads(value)
+        return [float(v) for v in value]
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.core import metrics
 from app.core.config import settings
+from app.core.lifespan import lifespan
+from app.core.middleware import CompressionMiddleware, MetricsMiddleware, RateLimitMiddleware
+from app.services import health
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+    # Warms up the DB/Redis pools and catalog caches before serving; closes them on shutdown
+    lifespan=lifespan,
 )
 
 # CORS
@@ -13,6 +21,8 @@ origins = [
     "http://localhost:3000",
 ]
 
+# Added before CORS so that 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,17 +32,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Wraps rate limiting and CORS, so every response (including errors) is compressed once
+app.add_middleware(CompressionMiddleware)
+
+# Outermost of all: latency covers rate limiting and compression too
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
 
-from app.api.v1 import auth, products, orders, analytics, addresses, wishlist
+@app.get("/health/live")
+def liveness_probe():
+    """The process is up and serving; no dependency is touched."""
+    return ORJSONResponse({"status": "ok"}, headers={"Cache-Control": "no-store"})
+
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """Database, Redis and SMTP reachability with per-dependency latency; 503 when not ready."""
+    ready, body = await health.readiness_probe.run()
+    return ORJSONResponse(body, status_code=200 if ready else 503, headers={"Cache-Control": "no-store"})
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+from app.api.v1 import auth, products, orders, analytics, addresses, wishlist, returns, reviews, chat
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(products.router, prefix="/api/v1/products", tags=["Products"])
 app.include_router(orders.router, prefix="/api/v1/orders", tags=["Orders"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(returns.router, prefix="/api/v1/returns", tags=["Returns"])
+app.include_router(reviews.router, prefix="/api/v1/reviews", tags=["Reviews"])
+app.include_router(chat.router, prefix="/api/v1/chat", tags=["Chat"])
 app.include_router(addresses.router, prefix="/api/v1", tags=["Addresses"])
 app.include_router(wishlist.router, prefix="/api/v1", tags=["Wishlist"])
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Boolean, Float, ForeignKey, Date, DateTime, Text,
+    CheckConstraint, Index, UniqueConstraint, DDL, and_, event,
+)
+from sqlalchemy.dialects.postgresql import INET, UUID
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from app.core.config import settings
 from app.db.base import Base
+from app.db.types import EmbeddingVector
 import uuid
 
 class User(Base):
@@ -19,6 +24,43 @@ class User(Base):
     addresses = relationship("Address", back_populates="user")
     wishlists = relationship("Wishlist", back_populates="user")
 
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    # SHA-256 of the token; the token itself is never stored
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # One login and all its rotations
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True))  # Set when rotated; presenting it again is reuse
+    revoked_at = Column(DateTime(timezone=True))
+
+class LoginHistory(Base):
+    __tablename__ = "login_history"
+
+    # SQLite only auto-increments INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    login_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    ip_address = Column(INET().with_variant(String(45), "sqlite"))
+    device_agent = Column(Text)
+
+    # Range scans by month, counting distinct users from the index alone
+    __table_args__ = (
+        Index("idx_login_history_login_at", "login_at", "user_id"),
+    )
+
+class LoginMonthlyStat(Base):
+    """Monthly Active Logins rollup, rebuilt from login_history."""
+    __tablename__ = "login_monthly_stats"
+
+    month = Column(Date, primary_key=True)  # First day of the month (UTC)
+    active_users = Column(Integer, nullable=False, default=0)
+    login_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -28,16 +70,72 @@ class Product(Base):
     price = Column(Float, nullable=False)
     category = Column(String, index=True)
     stock_quantity = Column(Integer, default=0)
+    # Below this the product is low on stock (app.services.low_stock)
+    reorder_threshold = Column(
+        Integer, default=settings.LOW_STOCK_THRESHOLD, server_default=str(settings.LOW_STOCK_THRESHOLD), nullable=False
+    )
     image_url = Column(String)
     is_featured = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
-    # embedding column requires pgvector, handled via raw SQL or TypeDecorator if needed
-    # For now, we omit the explicit Mapped column for embedding in ORM to avoid complexity if pgvector types aren't installed locally
-    
+    # Denormalized review aggregates, maintained incrementally by app.services.reviews
+    rating_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_sum = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_1_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_2_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_3_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_4_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_5_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # pgvector VECTOR on PostgreSQL, JSON text elsewhere. Deferred so listings never load it.
+    # NULL means "needs (re-)embedding"; see app.services.embeddings.embed_products
+    embedding = deferred(Column(EmbeddingVector(settings.EMBEDDING_DIM), nullable=True))
+
     order_items = relationship("OrderItem", back_populates="product")
     wishlists = relationship("Wishlist", back_populates="product")
     reviews = relationship("Review", back_populates="product")
 
+    __table_args__ = (
+        # The featured shelf; is_featured leads as the selective column (nearly every product is active)
+        Index("ix_products_is_featured_is_active", "is_featured", "is_active"),
+        CheckConstraint("stock_quantity >= 0", name="ck_products_stock_quantity_non_negative"),
+        CheckConstraint("reorder_threshold >= 0", name="ck_products_reorder_threshold_non_negative"),
+    )
+
+    @property
+    def rating_average(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}_count") or 0 for star in range(1, 6)}
+
+# Approximate nearest-neighbour index for semantic search (cosine distance, PostgreSQL only)
+Index(
+    "ix_products_embedding_hnsw",
+    Product.embedding,
+    postgresql_using="hnsw",
+    postgresql_with={"m": 16, "ef_construction": 64},
+    postgresql_ops={"embedding": "vector_cosine_ops"},
+).ddl_if(dialect="postgresql")
+
+# Only the rows that are low on stock: restocked products drop out, so the
+# low-stock list is read without scanning the catalog
+_LOW_STOCK = and_(Product.is_active == True, Product.stock_quantity < Product.reorder_threshold)
+Index(
+    "ix_products_low_stock",
+    Product.stock_quantity,
+    Product.id,
+    postgresql_where=_LOW_STOCK,
+    sqlite_where=_LOW_STOCK,
+)
+
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS vector").execute_if(dialect="postgresql"),
+)
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -62,11 +160,16 @@ class Order(Base):
     shipping = relationship("Shipping", back_populates="order", uselist=False)
     returns = relationship("Return", back_populates="order")
 
+    # A customer's orders, newest first
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"))
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
     price_at_purchase = Column(Float, nullable=False)
@@ -74,11 +177,15 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
+    __table_args__ = (
+        CheckConstraint("quantity > 0", name="ck_order_items_quantity_positive"),
+    )
+
 class Address(Base):
     __tablename__ = "addresses"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     full_name = Column(String, nullable=False)
     phone = Column(String, nullable=False)
     address_line1 = Column(String, nullable=False)
@@ -91,6 +198,15 @@ class Address(Base):
 
     user = relationship("User", back_populates="addresses")
 
+# At most one default address per user
+Index(
+    "uq_addresses_user_id_default",
+    Address.user_id,
+    unique=True,
+    postgresql_where=Address.is_default == True,
+    sqlite_where=Address.is_default == True,
+)
+
 class Shipping(Base):
     __tablename__ = "shippings"
 
@@ -113,9 +229,15 @@ class Return(Base):
     status = Column(String, default="pending")  # pending, approved, rejected, processed
     requested_at = Column(DateTime(timezone=True), server_default=func.now())
     processed_at = Column(DateTime(timezone=True))
+    refund_amount = Column(Float)
 
     order = relationship("Order", back_populates="returns")
 
+    # Admin queue is paged by (status, requested_at, id) keyset
+    __table_args__ = (
+        Index("ix_returns_status_requested_at_id", "status", "requested_at", "id"),
+    )
+
 class PromoCode(Base):
     __tablename__ = "promo_codes"
 
@@ -142,6 +264,11 @@ class Wishlist(Base):
     user = relationship("User", back_populates="wishlists")
     product = relationship("Product", back_populates="wishlists")
 
+    # Also serves the user's wishlist lookups (leading user_id)
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_wishlists_user_id_product_id"),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
 
@@ -154,3 +281,8 @@ class Review(Base):
 
     user = relationship("User")
     product = relationship("Product", back_populates="reviews")
+
+    __table_args__ = (
+        Index("ix_reviews_product_id_created_at", "product_id", "created_at"),
+        UniqueConstraint("user_id", "product_id", name="uq_reviews_user_id_product_id"),
+    )
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 import uuid
+from app.core.config import settings
 
 # --- Users ---
 class UserBase(BaseModel):
@@ -30,13 +31,18 @@ class ProductBase(BaseModel):
     is_active: bool = True
 
 class ProductCreate(ProductBase):
-    pass
+    reorder_threshold: int = Field(default_factory=lambda: settings.LOW_STOCK_THRESHOLD, ge=0)
 
 class ProductResponse(ProductBase):
     id: int
+    rating_count: int = 0
+    rating_average: Optional[float] = None
     class Config:
         from_attributes = True
 
+class ProductDetailResponse(ProductResponse):
+    similar_product_ids: List[int] = []
+
 # --- Addresses ---
 class AddressBase(BaseModel):
     full_name: str
@@ -61,7 +67,7 @@ class AddressResponse(AddressBase):
 # --- Orders ---
 class OrderItemCreate(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
 
 class OrderCreate(BaseModel):
     items: List[OrderItemCreate]
@@ -74,7 +80,7 @@ class OrderCreate(BaseModel):
 
 class OrderItemResponse(BaseModel):
     id: uuid.UUID
-    product_id: uuid.UUID
+    product_id: int
     quantity: int
     price_at_purchase: float
     class Config:
@@ -127,9 +133,17 @@ class ReturnResponse(BaseModel):
     status: str
     requested_at: datetime
     processed_at: Optional[datetime] = None
+    refund_amount: Optional[float] = None
     class Config:
         from_attributes = True
 
+class ReturnQueuePage(BaseModel):
+    items: List[ReturnResponse]
+    next_cursor: Optional[str] = None
+
+class ReturnProcessRequest(BaseModel):
+    return_ids: List[uuid.UUID] = Field(..., min_length=1, max_length=500)
+
 # --- Promo Codes ---
 class PromoCodeBase(BaseModel):
     code: str
@@ -179,7 +193,23 @@ class ReviewResponse(ReviewBase):
     class Config:
         from_attributes = True
 
+class RatingSummary(BaseModel):
+    product_id: int
+    rating_count: int
+    rating_average: Optional[float] = None
+    rating_histogram: Dict[int, int]
+
+# --- Chat ---
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=4000)
+    thread_id: Optional[uuid.UUID] = None
+
 # --- Auth ---
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Seconds until access_token expires
+
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(..., min_length=1, max_length=200)
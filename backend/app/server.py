@@ -0,0 +1,105 @@
+"""
+Production server for BeeManHoney.
+
+Runs the API under gunicorn with uvicorn workers (uvloop event loop,
+httptools HTTP parser), one worker per CPU core unless WEB_CONCURRENCY says
+otherwise:
+    python -m app.server [--workers 4] [--bind 0.0.0.0:8000]
+
+The app is imported once in the master (SERVER_PRELOAD) and workers are
+forked from it, so the imported code and module-level data are shared
+copy-on-write instead of loaded per worker. Nothing in the app connects at
+import time; each worker opens its own database and Redis pools.
+
+Each worker runs the app lifespan (app/core/lifespan.py): connection pools
+and caches are warmed up before it accepts traffic. On SIGTERM every worker
+stops accepting connections, lets in-flight requests finish, then closes
+what the lifespan owns (flush buffered login events, close the Redis and
+database pools) within SERVER_GRACEFUL_TIMEOUT. For development keep using
+`uvicorn --reload`.
+"""
+import argparse
+import gc
+import os
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.core.config import settings
+
+# Of the graceful timeout, what the shutdown handlers get after requests are cut off
+DRAIN_SECONDS = 5
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Stop waiting for slow requests in time for the shutdown handlers to run
+        # before gunicorn kills the worker
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - DRAIN_SECONDS)
+
+
+def worker_count(configured: int = settings.WEB_CONCURRENCY, cpus: Optional[int] = None) -> int:
+    """WEB_CONCURRENCY if set, else one worker per core up to SERVER_MAX_WORKERS."""
+    if configured > 0:
+        return configured
+    return max(1, min(cpus or os.cpu_count() or 1, settings.SERVER_MAX_WORKERS))
+
+
+def when_ready(server) -> None:
+    # Everything the preloaded app allocated is permanent: move it out of the
+    # collector's reach so gc passes in the workers don't touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    # A pool inherited from the master must not be shared with it; start empty
+    from app.db.session import engine, replica_engines
+    for db_engine in (engine, *replica_engines):
+        db_engine.sync_engine.dispose(close=False)
+
+
+def gunicorn_options(workers: Optional[int] = None, bind: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "bind": bind or f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": workers or worker_count(),
+        "worker_class": "app.server.Worker",
+        "preload_app": settings.SERVER_PRELOAD,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10,
+        "backlog": settings.SERVER_BACKLOG,
+        "accesslog": "-",
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the BeeManHoney API (gunicorn + uvicorn workers)")
+    parser.add_argument("--workers", type=int, help="default: WEB_CONCURRENCY or one per CPU core")
+    parser.add_argument("--bind", help=f"default: {settings.SERVER_HOST}:{settings.SERVER_PORT}")
+    args = parser.parse_args(argv)
+    Server(gunicorn_options(args.workers, args.bind)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Batching Service for BeeManHoney
+Coalesces many small concurrent AI calls into one provider request.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.services.embeddings import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently and passes them to `fn` as one list.
+
+    The first item of a batch waits up to `max_wait` seconds for company; the
+    batch is sent early as soon as `max_size` items are queued. `fn(items)`
+    must return one result per item, in order. If it raises, every caller in
+    that batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Awaitable[Sequence[Any]]],
+        max_size: int = settings.AI_BATCH_MAX_SIZE,
+        max_wait: float = settings.AI_BATCH_MAX_WAIT_MS / 1000,
+    ):
+        self.fn = fn
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class BatchingEmbedder(Embedder):
+    """
+    Wraps an embedder so concurrent embed() calls share provider requests.
+
+    Ten coroutines each embedding one question within the batching window
+    cost one embeddings API call instead of ten.
+    """
+
+    def __init__(self, embedder: Embedder, **batch_kwargs):
+        self.inner = embedder
+        self.dim = embedder.dim
+        self._batcher = MicroBatcher(embedder.embed, **batch_kwargs)
+
+    @property
+    def stats(self) -> dict:
+        return {"batches": self._batcher.batches, "items": self._batcher.items}
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        # Callers that already send a full batch go straight to the provider
+        if len(texts) >= self._batcher.max_size:
+            return await self.inner.embed(texts)
+        return await self._batcher.submit_many(texts)
@@ -0,0 +1,209 @@
+"""
+Catalog Cache Service for BeeManHoney
+HTTP validators (ETag / Last-Modified) for public catalog responses.
+
+Catalog GETs tag their response with version counters that are bumped
+after committed writes, and a client or CDN presenting that tag gets 304
+Not Modified without the database being touched. Each response is tagged
+with the counters of what it shows:
+- "catalog": product edits, ratings, embeddings and restocks; every
+  catalog response depends on it;
+- "stock": any checkout, for the product list and search, which show the
+  stock of every product;
+- "stock:featured": checkouts that include a featured product, for the
+  featured list;
+- "stock:<id>": checkouts of that product, for its detail page.
+So a sale only invalidates the pages that show the stock it changed.
+"""
+import logging
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CATALOG = "catalog"
+STOCK = "stock"
+FEATURED_STOCK = "stock:featured"
+
+
+def product_stock_scope(product_id: int) -> str:
+    return f"stock:{product_id}"
+
+
+def stock_scopes(products: Iterable) -> List[str]:
+    """The counters a checkout of these products has to bump."""
+    products = list(products)
+    scopes = [STOCK] + [product_stock_scope(p.id) for p in products]
+    if any(p.is_featured for p in products):
+        scopes.append(FEATURED_STOCK)
+    return scopes
+
+
+class CatalogVersion:
+    """Base class for catalog version stores."""
+
+    async def current(self, scopes: Sequence[str] = (CATALOG,)) -> Tuple[List[int], float]:
+        """Return (version of each scope, unix time of the latest bump among them)."""
+        raise NotImplementedError
+
+    async def bump(self, scopes: Sequence[str] = (CATALOG,)) -> None:
+        raise NotImplementedError
+
+
+class InMemoryCatalogVersion(CatalogVersion):
+    """Per-process counters for tests and single-node development."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # Scopes never bumped date from when the store was created
+        self._created_at = clock()
+        self._versions: Dict[str, Tuple[int, float]] = {}
+
+    async def current(self, scopes: Sequence[str] = (CATALOG,)) -> Tuple[List[int], float]:
+        entries = [self._versions.get(scope, (0, self._created_at)) for scope in scopes]
+        return [version for version, _ in entries], max(updated_at for _, updated_at in entries)
+
+    async def bump(self, scopes: Sequence[str] = (CATALOG,)) -> None:
+        now = self._clock()
+        for scope in scopes:
+            self._versions[scope] = (self._versions.get(scope, (0, now))[0] + 1, now)
+
+
+class RedisCatalogVersion(CatalogVersion):
+    """Counters shared by every API worker, one Redis hash per scope."""
+
+    def __init__(self, redis=None, key: str = "catalog:version", clock: Callable[[], float] = time.time):
+        self._redis = redis
+        self.key = key
+        self._clock = clock
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    def _key(self, scope: str) -> str:
+        return self.key if scope == CATALOG else f"{self.key}:{scope}"
+
+    async def current(self, scopes: Sequence[str] = (CATALOG,)) -> Tuple[List[int], float]:
+        now = self._clock()
+        pipe = self.redis.pipeline(transaction=False)
+        for scope in scopes:
+            # Dates a scope that was never bumped from its first read, not from 1970
+            pipe.hsetnx(self._key(scope), "updated_at", now)
+            pipe.hmget(self._key(scope), "version", "updated_at")
+        replies = await pipe.execute()
+        entries = replies[1::2]
+        versions = [int(version or 0) for version, _ in entries]
+        return versions, max(float(updated_at) for _, updated_at in entries)
+
+    async def bump(self, scopes: Sequence[str] = (CATALOG,)) -> None:
+        now = self._clock()
+        pipe = self.redis.pipeline(transaction=True)
+        for scope in scopes:
+            pipe.hincrby(self._key(scope), "version", 1)
+            pipe.hset(self._key(scope), "updated_at", now)
+        await pipe.execute()
+
+
+_catalog_version: Optional[CatalogVersion] = None
+
+
+def get_catalog_version() -> CatalogVersion:
+    """Return the process-wide version store selected by CATALOG_CACHE_BACKEND."""
+    global _catalog_version
+    if _catalog_version is None:
+        _catalog_version = InMemoryCatalogVersion() if settings.CATALOG_CACHE_BACKEND == "memory" else RedisCatalogVersion()
+    return _catalog_version
+
+
+def set_catalog_version(store: Optional[CatalogVersion]) -> None:
+    """Override the process-wide version store (tests). None resets to the default."""
+    global _catalog_version
+    _catalog_version = store
+
+
+async def bump_catalog_version(*scopes: str) -> None:
+    """
+    Invalidate cached catalog responses (every one, unless given narrower
+    scopes). Call after the write is committed.
+
+    Never raises: a failed bump only means clients may keep a stale copy
+    until max-age runs out, which must not fail the write itself.
+    """
+    try:
+        await get_catalog_version().bump(scopes or (CATALOG,))
+    except Exception:
+        logger.warning("Could not bump catalog version", exc_info=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" match
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in tags
+
+
+def _not_modified_since(if_modified_since: str, updated_at: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(updated_at) <= since
+
+
+async def _conditional_get(request: Request, response: Response, scopes: Sequence[str]) -> None:
+    try:
+        versions, updated_at = await get_catalog_version().current(scopes)
+    except Exception:
+        logger.warning("Catalog version unavailable, serving uncached", exc_info=True)
+        return
+
+    etag = '"c' + ".".join(str(version) for version in versions) + '"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(updated_at, usegmt=True),
+        "Cache-Control": (
+            f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}, "
+            f"stale-while-revalidate={settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE}"
+        ),
+    }
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, updated_at)
+    if not_modified:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+async def catalog_conditional_get(request: Request, response: Response) -> None:
+    """
+    Dependency for public catalog GETs that list products (the list, search).
+
+    Adds ETag, Last-Modified and Cache-Control to the response, or answers
+    304 straight away when the client's copy is current. Declare it before
+    any dependency that queries the database.
+    """
+    await _conditional_get(request, response, (CATALOG, STOCK))
+
+
+async def featured_conditional_get(request: Request, response: Response) -> None:
+    """catalog_conditional_get for the featured list."""
+    await _conditional_get(request, response, (CATALOG, FEATURED_STOCK))
+
+
+async def product_conditional_get(product_id: int, request: Request, response: Response) -> None:
+    """catalog_conditional_get for one product's detail page."""
+    await _conditional_get(request, response, (CATALOG, product_stock_scope(product_id)))
@@ -0,0 +1,272 @@
+"""
+Chat Service for BeeManHoney
+Conversation history, per-node stream limits and SSE token streaming.
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+
+import anyio
+from starlette.responses import StreamingResponse
+from starlette.types import Send
+
+from app.core.config import settings
+from app.services.llm import ASSISTANT_SYSTEM_PROMPT, LLMClient, Message
+
+logger = logging.getLogger(__name__)
+
+
+# --- Concurrency limits ---
+class StreamLease:
+    """One acquired stream slot. release() is idempotent."""
+
+    def __init__(self, limiter: "StreamLimiter"):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release()
+
+
+class StreamLimiter:
+    """
+    Caps concurrent chat streams on this worker node.
+
+    Requests beyond the cap queue for up to `queue_timeout` seconds for a free
+    slot; if none frees up, acquire() returns None and the caller answers 429.
+    """
+
+    def __init__(
+        self,
+        max_streams: int = settings.CHAT_MAX_CONCURRENT_STREAMS,
+        queue_timeout: float = settings.CHAT_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.max_streams = max_streams
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_streams)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self) -> Optional[StreamLease]:
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return StreamLease(self)
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+stream_limiter = StreamLimiter()
+
+
+# --- History ---
+class ChatHistory:
+    """Base class for per-thread conversation history stores."""
+
+    def __init__(
+        self,
+        max_messages: int = settings.CHAT_HISTORY_MAX_MESSAGES,
+        ttl_seconds: int = settings.CHAT_HISTORY_TTL_SECONDS,
+    ):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> List[Message]:
+        raise NotImplementedError
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        raise NotImplementedError
+
+
+class InMemoryChatHistory(ChatHistory):
+    """Per-process history for tests and development (no TTL)."""
+
+    def __init__(self, *args, max_threads: int = 10_000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, List[Message]]" = OrderedDict()
+
+    async def get(self, key: str) -> List[Message]:
+        return list(self._threads.get(key, []))
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        thread = self._threads.setdefault(key, [])
+        thread.extend(messages)
+        del thread[:-self.max_messages]
+        self._threads.move_to_end(key)
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+
+class RedisChatHistory(ChatHistory):
+    """History in a capped Redis list per thread, refreshed TTL on every write."""
+
+    def __init__(self, *args, redis=None, prefix: str = "chat:", **kwargs):
+        super().__init__(*args, **kwargs)
+        self._redis = redis
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def get(self, key: str) -> List[Message]:
+        raw = await self.redis.lrange(f"{self.prefix}{key}", -self.max_messages, -1)
+        return [json.loads(item) for item in raw]
+
+    async def append(self, key: str, messages: List[Message]) -> None:
+        redis_key = f"{self.prefix}{key}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.rpush(redis_key, *[json.dumps(m) for m in messages])
+        pipe.ltrim(redis_key, -self.max_messages, -1)
+        pipe.expire(redis_key, self.ttl_seconds)
+        await pipe.execute()
+
+
+_chat_history: Optional[ChatHistory] = None
+
+
+def get_chat_history() -> ChatHistory:
+    """Return the process-wide history store selected by CHAT_HISTORY_BACKEND."""
+    global _chat_history
+    if _chat_history is None:
+        _chat_history = InMemoryChatHistory() if settings.CHAT_HISTORY_BACKEND == "memory" else RedisChatHistory()
+    return _chat_history
+
+
+def set_chat_history(history: Optional[ChatHistory]) -> None:
+    """Override the process-wide history store (tests). None resets to the default."""
+    global _chat_history
+    _chat_history = history
+
+
+# --- Streaming ---
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SSEResponse(StreamingResponse):
+    """
+    Event stream that drops a client which stops reading.
+
+    The server must accept each event within `send_timeout` seconds. When
+    it can't, because the client's socket buffer is full, the response
+    ends without completing the body, the server closes the connection and
+    the body iterator is closed at once, so its cleanup (the stream slot)
+    runs without waiting for the client.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, *args, send_timeout: float = settings.CHAT_SLOW_CLIENT_TIMEOUT_SECONDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.send_timeout = send_timeout
+
+    async def stream_response(self, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        try:
+            async for chunk in self.body_iterator:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode(self.charset)
+                try:
+                    await asyncio.wait_for(
+                        send({"type": "http.response.body", "body": chunk, "more_body": True}), self.send_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning("Aborting event stream: client too slow")
+                    return
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                # Also runs when a disconnect cancels the stream
+                with anyio.CancelScope(shield=True):
+                    await aclose()
+
+
+_DONE = object()
+
+
+async def stream_reply(
+    llm: LLMClient,
+    history: ChatHistory,
+    history_key: str,
+    thread_id: str,
+    message: str,
+    past: List[Message],
+    cached_answer: Optional[str] = None,
+    on_complete=None,
+    buffer_tokens: int = settings.CHAT_STREAM_BUFFER_TOKENS,
+) -> AsyncIterator[str]:
+    """
+    Yield SSE events for one assistant reply.
+
+    A producer task reads the model into a bounded queue while this generator
+    drains it to the client, so the model is never blocked by a single slow
+    send. Once `buffer_tokens` are waiting, the producer stops reading the
+    model until the client catches up. A client that stops reading is dropped
+    by SSEResponse, which closes this generator and so cancels the producer.
+    History is written once, after the full reply has been produced.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_tokens)
+
+    async def cached_tokens():
+        yield cached_answer
+
+    async def produce():
+        try:
+            if cached_answer is not None:
+                tokens = cached_tokens()
+            else:
+                tokens = llm.stream([
+                    {"role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
+                    *past,
+                    {"role": "user", "content": message},
+                ])
+            async for token in tokens:
+                await queue.put(token)
+            await queue.put(_DONE)
+        except Exception as e:
+            # Queued behind the tokens already read, so none of them is lost
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    parts: List[str] = []
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                logger.exception("Chat stream %s failed", thread_id, exc_info=item)
+                yield sse_event("error", {"detail": "The assistant is unavailable, please try again."})
+                return
+            parts.append(item)
+            yield sse_event("message", {"token": item})
+
+        answer = "".join(parts)
+        await history.append(history_key, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": answer},
+        ])
+        if on_complete is not None:
+            await on_complete(answer)
+        yield sse_event("end", {"thread_id": thread_id})
+    finally:
+        producer.cancel()
@@ -0,0 +1,232 @@
+"""
+Embedding Service for BeeManHoney
+Turns product text into vectors for semantic search, in batches.
+
+Run a backfill of products that have no embedding yet with:
+    python -m app.services.embeddings
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Float, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.all import Product
+from app.services.catalog_cache import bump_catalog_version
+from app.services.index_version import bump_index_version
+from app.services.vector_index import product_index
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class Embedder:
+    """Base class for embedding backends."""
+
+    dim: int
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic local embedder (feature hashing of word unigrams and bigrams).
+
+    Needs no network or API key, produces the same vector for the same text in
+    every process, and puts texts that share words close together. Used in
+    tests and offline development.
+    """
+
+    def __init__(self, dim: int = settings.EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+class OpenAIEmbedder(Embedder):
+    """Embedder backed by the OpenAI embeddings API (one request per batch)."""
+
+    def __init__(self, model: str = settings.EMBEDDING_MODEL, dim: int = settings.EMBEDDING_DIM):
+        self.model = model
+        self.dim = dim
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            if not settings.OPENAI_API_KEY:
+                raise RuntimeError("OPENAI_API_KEY is not set (EMBEDDING_PROVIDER=local runs without it)")
+            from langchain_openai import OpenAIEmbeddings
+            self._client = OpenAIEmbeddings(model=self.model, openai_api_key=settings.OPENAI_API_KEY)
+        return self._client
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return await self._get_client().aembed_documents(list(texts))
+
+
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """Return the process-wide embedder selected by EMBEDDING_PROVIDER."""
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_PROVIDER == "local":
+            _embedder = HashingEmbedder()
+        else:
+            _embedder = OpenAIEmbedder()
+    return _embedder
+
+
+def set_embedder(embedder: Optional[Embedder]) -> None:
+    """Override the process-wide embedder (tests, workers). None resets to the default."""
+    global _embedder
+    _embedder = embedder
+    _query_cache.clear()
+
+
+def product_text(name: str, category: Optional[str], description: Optional[str]) -> str:
+    """The text that represents a product in embedding space."""
+    return " ".join(part for part in (name, category, description) if part)
+
+
+# Small LRU of query embeddings: popular searches skip the embedding round trip
+_QUERY_CACHE_SIZE = 1024
+_query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+async def embed_query(query: str) -> List[float]:
+    """Embed a search query, reusing recent results for identical queries."""
+    key = query.strip().lower()
+    cached = _query_cache.get(key)
+    if cached is not None:
+        _query_cache.move_to_end(key)
+        return cached
+    vector = (await get_embedder().embed([key]))[0]
+    _query_cache[key] = vector
+    if len(_query_cache) > _QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+    return vector
+
+
+async def embed_products(
+    db: AsyncSession,
+    embedder: Optional[Embedder] = None,
+    product_ids: Optional[Sequence[int]] = None,
+    batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+) -> int:
+    """
+    Embed products in chunks and store the vectors.
+
+    By default embeds every product whose embedding is NULL; pass product_ids
+    to (re-)embed specific products. Each chunk costs one embedding request
+    and one executemany UPDATE, and is committed before the next is fetched.
+
+    Returns:
+        Number of products embedded
+    """
+    embedder = embedder or get_embedder()
+    total = 0
+    last_id = 0
+    while True:
+        query = select(Product.id, Product.name, Product.category, Product.description, Product.is_active)
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        else:
+            query = query.where(Product.embedding.is_(None))
+        # Keyset on id so re-reading never skips or repeats rows
+        query = query.where(Product.id > last_id).order_by(Product.id).limit(batch_size)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+
+        vectors = await embedder.embed(
+            [product_text(row.name, row.category, row.description) for row in rows]
+        )
+        await db.execute(
+            update(Product),
+            [{"id": row.id, "embedding": vector} for row, vector in zip(rows, vectors)],
+        )
+        await db.commit()
+        active = [(row.id, vector) for row, vector in zip(rows, vectors) if row.is_active]
+        product_index.add([item_id for item_id, _ in active], [vector for _, vector in active])
+
+        total += len(rows)
+        last_id = rows[-1].id
+        logger.info("Embedded %d products (up to id %d)", total, last_id)
+    if total:
+        # "Similar products" on detail pages may have changed
+        await bump_catalog_version()
+        await bump_index_version()
+    return total
+
+
+def nearest_products_query(query_vector: Sequence[float], limit: int):
+    """Active products ordered by pgvector cosine distance (`<=>`) to the query vector."""
+    distance = Product.embedding.op("<=>", return_type=Float)(query_vector)
+    return (
+        select(Product)
+        .where(Product.embedding.is_not(None), Product.is_active == True)
+        .order_by(distance)
+        .limit(limit)
+    )
+
+
+async def semantic_search(db: AsyncSession, query: str, limit: int = 10) -> List[Product]:
+    """
+    Active products nearest to the query in embedding space, best match first.
+
+    On PostgreSQL this is an approximate nearest-neighbour lookup served by the
+    HNSW index (cosine distance). Other databases fall back to the in-process
+    NumPy index (app.services.vector_index).
+    """
+    query_vector = await embed_query(query)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Bounded search breadth keeps ANN latency predictable under load
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.VECTOR_EF_SEARCH)}"))
+        result = await db.execute(nearest_products_query(query_vector, limit))
+        return list(result.scalars().all())
+
+    # No pgvector: exact top-k from the in-process NumPy index (active products only)
+    await product_index.ensure_loaded(db)
+    top_ids = [item_id for item_id, _ in product_index.search([query_vector], k=limit)[0]]
+    if not top_ids:
+        return []
+    result = await db.execute(select(Product).where(Product.id.in_(top_ids)))
+    by_id = {p.id: p for p in result.scalars().all()}
+    return [by_id[pid] for pid in top_ids if pid in by_id]
+
+
+async def main():
+    from app.db.session import AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        count = await embed_products(db)
+    logger.info("Embedding backfill complete: %d products", count)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Health Service for BeeManHoney
+Liveness and readiness checks for load balancer and orchestrator probes.
+
+Readiness runs every dependency check concurrently, each under a timeout,
+and caches the outcome for HEALTH_CACHE_SECONDS so that frequent probes
+from many balancers never turn into load on the database.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CheckResult = Dict[str, object]
+Check = Callable[[], Awaitable[CheckResult]]
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def pool_status(engine: AsyncEngine) -> Optional[Dict[str, int]]:
+    """Checked-out vs capacity for queue pools; None for pools without limits (e.g. SQLite)."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    return {
+        "checked_out": pool.checkedout(),
+        "capacity": pool.size() + max(getattr(pool, "_max_overflow", 0), 0),
+    }
+
+
+async def check_database(
+    engine: Optional[AsyncEngine] = None,
+    pool_wait_threshold_ms: float = settings.HEALTH_POOL_WAIT_THRESHOLD_MS,
+) -> CheckResult:
+    """
+    Fail fast if every pooled connection is checked out, or if getting one
+    took longer than the threshold; otherwise run SELECT 1.
+    """
+    if engine is None:
+        from app.db.session import engine
+    status = pool_status(engine)
+    if status and status["checked_out"] >= status["capacity"]:
+        raise CheckFailed(f"connection pool exhausted ({status['checked_out']}/{status['capacity']})")
+
+    start = time.perf_counter()
+    async with engine.connect() as conn:
+        pool_wait_ms = (time.perf_counter() - start) * 1000
+        await conn.execute(text("SELECT 1"))
+    if pool_wait_ms > pool_wait_threshold_ms:
+        raise CheckFailed(f"pool wait {pool_wait_ms:.0f} ms over {pool_wait_threshold_ms:.0f} ms")
+    result: CheckResult = {"pool_wait_ms": round(pool_wait_ms, 1)}
+    if status:
+        result["pool"] = status
+    return result
+
+
+async def check_redis(redis=None) -> CheckResult:
+    if redis is None:
+        from app.db.redis import get_redis
+        redis = get_redis()
+    await redis.ping()
+    return {}
+
+
+async def check_smtp(
+    host: str = settings.SMTP_HOST, port: int = settings.SMTP_PORT
+) -> CheckResult:
+    """TCP reachability only; no login, so probes never trip SMTP rate limits."""
+    if not host:
+        return {"status": "skipped", "detail": "SMTP not configured"}
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.close()
+    await writer.wait_closed()
+    return {}
+
+
+async def _run_check(check: Check, timeout: float) -> CheckResult:
+    start = time.perf_counter()
+    try:
+        result = dict(await asyncio.wait_for(check(), timeout))
+        result.setdefault("status", "ok")
+    except asyncio.TimeoutError:
+        result = {"status": "fail", "detail": f"timed out after {timeout:.1f}s"}
+    except Exception as e:
+        result = {"status": "fail", "detail": str(e) or type(e).__name__}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+class ReadinessProbe:
+    """
+    Runs named checks concurrently and caches the combined result.
+
+    The instance is ready when every critical check passes; failing
+    non-critical checks (SMTP by default) only mark it "degraded".
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Check],
+        critical: Iterable[str] = tuple(settings.HEALTH_CRITICAL_CHECKS.split(",")),
+        timeout: float = settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+        cache_seconds: float = settings.HEALTH_CACHE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.checks = checks
+        self.critical = {name.strip() for name in critical if name.strip()}
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._clock = clock
+        self._cached: Optional[Tuple[float, bool, Dict[str, object]]] = None
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> Tuple[bool, Dict[str, object]]:
+        cached = self._cached
+        if cached and self._clock() - cached[0] < self.cache_seconds:
+            return cached[1], cached[2]
+        # One refresh at a time; concurrent probes wait for it and share it
+        async with self._lock:
+            cached = self._cached
+            if cached and self._clock() - cached[0] < self.cache_seconds:
+                return cached[1], cached[2]
+
+            names = list(self.checks)
+            results = await asyncio.gather(*(_run_check(self.checks[n], self.timeout) for n in names))
+            checks = dict(zip(names, results))
+            ready = all(checks[n]["status"] != "fail" for n in names if n in self.critical)
+            degraded = any(r["status"] == "fail" for r in results)
+            body = {
+                "status": "ok" if ready and not degraded else ("degraded" if ready else "fail"),
+                "checks": checks,
+            }
+            if not ready:
+                logger.warning("Readiness check failed: %s", {n: r for n, r in checks.items() if r["status"] == "fail"})
+            self._cached = (self._clock(), ready, body)
+            return ready, body
+
+
+readiness_probe = ReadinessProbe({
+    "database": check_database,
+    "redis": check_redis,
+    "smtp": check_smtp,
+})
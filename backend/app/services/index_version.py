@@ -0,0 +1,96 @@
+"""
+Index Version Service for BeeManHoney
+Published version of the in-process product vector index.
+
+Every API worker holds its own copy of the vector index. The writes that
+change which products or vectors belong in it (product edits, deletes,
+the embeddings backfill) bump one shared counter after they commit. Before
+using its copy, a worker compares the version it was built at with the
+published one and rebuilds when they differ.
+
+This module imports no NumPy, so the product endpoints can bump the
+version without loading the index.
+"""
+import logging
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IndexVersion:
+    """Base class for index version stores."""
+
+    async def current(self) -> int:
+        raise NotImplementedError
+
+    async def bump(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryIndexVersion(IndexVersion):
+    """Per-process counter for tests and single-node development."""
+
+    def __init__(self):
+        self._version = 0
+
+    async def current(self) -> int:
+        return self._version
+
+    async def bump(self) -> int:
+        self._version += 1
+        return self._version
+
+
+class RedisIndexVersion(IndexVersion):
+    """Counter shared by every API worker, stored in one Redis key."""
+
+    def __init__(self, redis=None, key: str = "vector_index:version"):
+        self._redis = redis
+        self.key = key
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def current(self) -> int:
+        return int(await self.redis.get(self.key) or 0)
+
+    async def bump(self) -> int:
+        return await self.redis.incr(self.key)
+
+
+_index_version: Optional[IndexVersion] = None
+
+
+def get_index_version() -> IndexVersion:
+    """Return the process-wide version store selected by VECTOR_INDEX_VERSION_BACKEND."""
+    global _index_version
+    if _index_version is None:
+        _index_version = InMemoryIndexVersion() if settings.VECTOR_INDEX_VERSION_BACKEND == "memory" else RedisIndexVersion()
+    return _index_version
+
+
+def set_index_version(store: Optional[IndexVersion]) -> None:
+    """Override the process-wide version store (tests). None resets to the default."""
+    global _index_version
+    _index_version = store
+
+
+async def bump_index_version() -> Optional[int]:
+    """
+    Tell every worker to rebuild its vector index. Call after the write is committed.
+
+    Returns the new version, or None if it could not be published. Never
+    raises: a failed bump leaves the other workers on their copy until the
+    next write bumps the version, which must not fail this write.
+    """
+    try:
+        return await get_index_version().bump()
+    except Exception:
+        logger.warning("Could not bump vector index version", exc_info=True)
+        return None
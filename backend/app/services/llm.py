@@ -0,0 +1,107 @@
+"""
+LLM Service for BeeManHoney
+Thin, swappable wrapper around the chat model used by the AI assistant.
+"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+
+ASSISTANT_SYSTEM_PROMPT = (
+    'You are "Barnaby", the Senior Apiarist at BeeManHoney. '
+    "Answer questions about honey, its uses and our products warmly and concisely. "
+    "Currency is ALWAYS Indian Rupees (₹). Never invent products."
+)
+
+Message = Dict[str, str]
+
+
+class LLMClient:
+    """Base class for chat model backends."""
+
+    async def complete(self, messages: List[Message]) -> str:
+        raise NotImplementedError
+
+    async def stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        """Yield the reply token by token. Defaults to one chunk from complete()."""
+        yield await self.complete(messages)
+
+
+class OpenAIChatClient(LLMClient):
+    """Chat completions via langchain-openai, created on first use."""
+
+    def __init__(self, model: str = settings.OPENAI_MODEL, temperature: float = 0.4):
+        self.model = model
+        self.temperature = temperature
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            if not settings.OPENAI_API_KEY:
+                raise RuntimeError("OPENAI_API_KEY is not set (LLM_PROVIDER=stub runs without it)")
+            from langchain_openai import ChatOpenAI
+            self._client = ChatOpenAI(
+                model=self.model,
+                temperature=self.temperature,
+                openai_api_key=settings.OPENAI_API_KEY,
+            )
+        return self._client
+
+    async def complete(self, messages: List[Message]) -> str:
+        response = await self._get_client().ainvoke(
+            [(m["role"], m["content"]) for m in messages]
+        )
+        return response.content
+
+    async def stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        async for chunk in self._get_client().astream(
+            [(m["role"], m["content"]) for m in messages]
+        ):
+            if chunk.content:
+                yield chunk.content
+
+
+class StubLLM(LLMClient):
+    """
+    Deterministic stand-in for tests and offline development.
+
+    Answers "Stub answer: <last user message>" and counts calls so tests can
+    assert how often the model was actually hit. stream() yields the answer
+    word by word, sleeping `token_delay` between words.
+    """
+
+    def __init__(self, delay: float = 0.0, token_delay: float = 0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.calls = 0
+
+    async def complete(self, messages: List[Message]) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return f"Stub answer: {messages[-1]['content']}"
+
+    async def stream(self, messages: List[Message]) -> AsyncIterator[str]:
+        answer = await self.complete(messages)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + " "
+
+
+_llm: Optional[LLMClient] = None
+
+
+def get_llm() -> LLMClient:
+    """Return the process-wide LLM client selected by LLM_PROVIDER."""
+    global _llm
+    if _llm is None:
+        _llm = StubLLM() if settings.LLM_PROVIDER == "stub" else OpenAIChatClient()
+    return _llm
+
+
+def set_llm(llm: Optional[LLMClient]) -> None:
+    """Override the process-wide LLM client (tests). None resets to the default."""
+    global _llm
+    _llm = llm
@@ -0,0 +1,161 @@
+"""
+Login History Service for BeeManHoney
+Records successful logins for the Monthly Active Logins chart without
+adding a write to the login request.
+
+Logins are appended to an in-process buffer and written to login_history
+by a background flush, in one multi-row INSERT per batch. A batch goes out
+when LOGIN_HISTORY_BATCH_SIZE events are waiting or LOGIN_HISTORY_FLUSH_SECONDS
+after the first one, whichever comes first. Events still buffered when a
+process is killed are lost; these are analytics, not an audit log.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import date, datetime
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.all import LoginHistory, LoginMonthlyStat
+
+logger = logging.getLogger(__name__)
+
+
+class LoginEvent(NamedTuple):
+    user_id: uuid.UUID
+    login_at: datetime
+    ip_address: Optional[str]
+    device_agent: Optional[str]
+
+
+class LoginHistoryBuffer:
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        batch_size: int = settings.LOGIN_HISTORY_BATCH_SIZE,
+        flush_interval: float = settings.LOGIN_HISTORY_FLUSH_SECONDS,
+        max_pending: int = settings.LOGIN_HISTORY_MAX_PENDING,
+        enabled: bool = settings.LOGIN_HISTORY_ENABLED,
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._pending: Deque[LoginEvent] = deque(maxlen=max_pending)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory: Optional[Callable[[], AsyncSession]]) -> None:
+        self._session_factory = factory
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: uuid.UUID, ip_address: Optional[str] = None, device_agent: Optional[str] = None) -> None:
+        """Queue a login. Never blocks and never raises."""
+        if not self.enabled:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(LoginEvent(user_id, datetime.utcnow(), ip_address, (device_agent or "")[:512] or None))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (sync caller): picked up by the next flush
+        if len(self._pending) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.ensure_future(self.flush())
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def flush(self) -> int:
+        """Write every buffered event; returns how many were written."""
+        async with self._lock:
+            written = 0
+            while self._pending:
+                batch: List[LoginEvent] = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    async with self.session_factory() as db:
+                        await db.execute(insert(LoginHistory), [event._asdict() for event in batch])
+                        await db.commit()
+                except Exception:
+                    logger.warning("Could not write %d login events; will retry", len(batch), exc_info=True)
+                    # Back to the front, in order; if the buffer filled up meanwhile the newest are dropped
+                    self._pending.extendleft(reversed(batch))
+                    if self._timer is None:
+                        self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+                    break
+                written += len(batch)
+            self.written += written
+            return written
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+async def refresh_monthly_rollup(db: AsyncSession, months: int = 2, today: Optional[date] = None) -> List[Dict]:
+    """
+    Recount the last `months` months (the current one included) into
+    login_monthly_stats. Earlier months no longer change, so refreshing the
+    current and previous month is enough once the table is seeded.
+    Commits.
+    """
+    current = _month_start(today or datetime.utcnow().date())
+    month = current
+    for _ in range(months - 1):
+        month = _month_start(date.fromordinal(month.toordinal() - 1))
+
+    rows = []
+    while month <= current:
+        start, end = datetime.combine(month, datetime.min.time()), datetime.combine(_next_month(month), datetime.min.time())
+        logins, users = (await db.execute(
+            select(func.count(LoginHistory.id), func.count(func.distinct(LoginHistory.user_id)))
+            .where(LoginHistory.login_at >= start, LoginHistory.login_at < end)
+        )).one()
+        await db.merge(LoginMonthlyStat(month=month, active_users=users, login_count=logins))
+        rows.append({"month": month.strftime("%Y-%m"), "active_users": users, "login_count": logins})
+        month = _next_month(month)
+    await db.commit()
+    return rows
+
+
+async def monthly_active_logins(db: AsyncSession, months: int = 12) -> List[Dict]:
+    """The rollup for the last `months` months, oldest first."""
+    result = await db.execute(
+        select(LoginMonthlyStat).order_by(LoginMonthlyStat.month.desc()).limit(months)
+    )
+    return [
+        {"month": stat.month.strftime("%Y-%m"), "active_users": stat.active_users, "login_count": stat.login_count}
+        for stat in reversed(result.scalars().all())
+    ]
+
+
+login_history = LoginHistoryBuffer()
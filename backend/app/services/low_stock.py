@@ -0,0 +1,191 @@
+"""
+Low Stock Service for BeeManHoney
+Reorder alerts driven by stock changes instead of catalog scans.
+
+A product is low on stock when it is active and its stock_quantity is
+below its reorder_threshold. A partial index holds exactly those rows, so
+listing them costs the length of the list, not the size of the catalog.
+
+The endpoints that change stock (orders, product updates) check
+became_low() on the rows they already have loaded and record the products
+that just went under their threshold. Recorded products wait in a buffer
+until no new one has arrived for LOW_STOCK_ALERT_DEBOUNCE_SECONDS (or the
+oldest has waited LOW_STOCK_ALERT_MAX_DELAY_SECONDS), then the scheduler's
+low_stock_alerts job sends them to ADMIN_EMAIL in one email.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.all import Product
+
+logger = logging.getLogger(__name__)
+
+
+def is_low(stock: int, threshold: int) -> bool:
+    return stock < threshold
+
+
+def became_low(product: Product, stock_before: int, threshold_before: Optional[int] = None) -> bool:
+    """True if this change took the (active) product under its reorder threshold."""
+    if threshold_before is None:
+        threshold_before = product.reorder_threshold
+    return (
+        bool(product.is_active)
+        and not is_low(stock_before, threshold_before)
+        and is_low(product.stock_quantity, product.reorder_threshold)
+    )
+
+
+def alert_entry(product: Product) -> Dict[str, Any]:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "stock_quantity": product.stock_quantity,
+        "reorder_threshold": product.reorder_threshold,
+    }
+
+
+def low_stock_query(limit: Optional[int] = None) -> Select:
+    """Active products under their threshold, lowest stock first; served by ix_products_low_stock."""
+    query = (
+        select(Product)
+        .where(Product.is_active == True, Product.stock_quantity < Product.reorder_threshold)
+        .order_by(Product.stock_quantity, Product.id)
+    )
+    return query.limit(limit) if limit else query
+
+
+async def low_stock_products(db: AsyncSession, limit: Optional[int] = None) -> List[Product]:
+    result = await db.execute(low_stock_query(limit))
+    return list(result.scalars().all())
+
+
+def _is_due(first: float, last: float, now: float) -> bool:
+    return (
+        now - last >= settings.LOW_STOCK_ALERT_DEBOUNCE_SECONDS
+        or now - first >= settings.LOW_STOCK_ALERT_MAX_DELAY_SECONDS
+    )
+
+
+class AlertBuffer:
+    """Base class for pending low-stock alerts."""
+
+    async def add(self, entries: List[Dict[str, Any]]) -> None:
+        """Queue products that went low; a product queued again replaces its earlier entry."""
+        raise NotImplementedError
+
+    async def take_due(self) -> List[Dict[str, Any]]:
+        """Remove and return the whole batch if it is due, else return nothing."""
+        raise NotImplementedError
+
+
+class InMemoryAlertBuffer(AlertBuffer):
+    """Per-process buffer for tests and single-node development."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._first = self._last = 0.0
+
+    async def add(self, entries: List[Dict[str, Any]]) -> None:
+        now = self._clock()
+        if not self._entries:
+            self._first = now
+        self._last = now
+        for entry in entries:
+            self._entries[entry["id"]] = entry
+
+    async def take_due(self) -> List[Dict[str, Any]]:
+        if not self._entries or not _is_due(self._first, self._last, self._clock()):
+            return []
+        entries, self._entries = list(self._entries.values()), {}
+        return entries
+
+
+class RedisAlertBuffer(AlertBuffer):
+    """
+    Buffer shared by every API worker.
+
+    A hash of product id -> entry plus the times of the first and latest
+    additions; the batch is read and deleted in one transaction, so an
+    entry added meanwhile is either in this batch or starts the next one.
+    """
+
+    def __init__(self, redis=None, prefix: str = "lowstock:"):
+        self._redis = redis
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def add(self, entries: List[Dict[str, Any]]) -> None:
+        now = repr(time.time())
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(f"{self.prefix}pending", mapping={str(e["id"]): json.dumps(e) for e in entries})
+            pipe.set(f"{self.prefix}first", now, nx=True)
+            pipe.set(f"{self.prefix}last", now)
+            await pipe.execute()
+
+    async def take_due(self) -> List[Dict[str, Any]]:
+        first, last = await self.redis.mget(f"{self.prefix}first", f"{self.prefix}last")
+        if first is None or last is None or not _is_due(float(first), float(last), time.time()):
+            return []
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hvals(f"{self.prefix}pending")
+            pipe.delete(f"{self.prefix}pending", f"{self.prefix}first", f"{self.prefix}last")
+            values, _ = await pipe.execute()
+        return [json.loads(value) for value in values]
+
+
+_alert_buffer: Optional[AlertBuffer] = None
+
+
+def get_alert_buffer() -> AlertBuffer:
+    """Return the process-wide buffer selected by LOW_STOCK_ALERT_BACKEND."""
+    global _alert_buffer
+    if _alert_buffer is None:
+        _alert_buffer = InMemoryAlertBuffer() if settings.LOW_STOCK_ALERT_BACKEND == "memory" else RedisAlertBuffer()
+    return _alert_buffer
+
+
+def set_alert_buffer(buffer: Optional[AlertBuffer]) -> None:
+    """Override the process-wide buffer (tests). None resets to the default."""
+    global _alert_buffer
+    _alert_buffer = buffer
+
+
+async def record_low_stock(entries: Iterable[Dict[str, Any]]) -> None:
+    """Queue an alert for products that went low. Never raises: a lost alert must not fail an order."""
+    entries = list(entries)
+    if not entries:
+        return
+    try:
+        await get_alert_buffer().add(entries)
+    except Exception:
+        logger.warning("Could not queue low-stock alert for %s", [e["id"] for e in entries], exc_info=True)
+
+
+async def send_due_alerts() -> List[Dict[str, Any]]:
+    """Email the pending batch to ADMIN_EMAIL once it is due; returns what was sent."""
+    entries = sorted(await get_alert_buffer().take_due(), key=lambda e: (e["stock_quantity"], e["id"]))
+    if not entries:
+        return []
+    if not settings.ADMIN_EMAIL:
+        logger.warning("Low stock: %s (no ADMIN_EMAIL to alert)", ", ".join(e["name"] for e in entries))
+        return entries
+    from app.services.email import email_service
+    result = await asyncio.to_thread(email_service.send_low_stock_alert, settings.ADMIN_EMAIL, entries)
+    if not result.get("success"):
+        logger.warning("Low-stock alert for %d products not sent: %s", len(entries), result.get("message"))
+    return entries
@@ -0,0 +1,165 @@
+"""
+Rate Limit Service for BeeManHoney
+Token buckets that cap how fast one client can call the API.
+
+A bucket holds up to `limit` tokens and refills at limit/period tokens per
+second; each request takes one. Bursts up to the limit are allowed, and a
+client that keeps calling is held to the average rate.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Rate(NamedTuple):
+    limit: int
+    period: int  # seconds
+
+    @property
+    def per_second(self) -> float:
+        return self.limit / self.period
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed
+
+
+def parse_rate(value: str) -> Rate:
+    """Parse "10/minute" (or "10/60" seconds) into a Rate."""
+    try:
+        count, period = value.strip().split("/")
+        seconds = _PERIODS[period] if period in _PERIODS else int(period)
+        rate = Rate(int(count), seconds)
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate {value!r}, expected e.g. '10/minute'")
+    if rate.limit <= 0 or rate.period <= 0:
+        raise ValueError(f"Invalid rate {value!r}, limit and period must be positive")
+    return rate
+
+
+def _take(tokens: float, elapsed: float, rate: Rate, cost: int) -> Tuple[float, RateLimitResult]:
+    """Refill a bucket for `elapsed` seconds and try to take `cost` tokens."""
+    tokens = min(rate.limit, tokens + max(elapsed, 0.0) * rate.per_second)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, RateLimitResult(True, rate.limit, int(tokens), 0.0)
+    return tokens, RateLimitResult(False, rate.limit, 0, (cost - tokens) / rate.per_second)
+
+
+class RateLimiter:
+    """Base class for token bucket stores."""
+
+    async def hit(self, key: str, rate: Rate, cost: int = 1) -> RateLimitResult:
+        raise NotImplementedError
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process buckets for tests and single-node development.
+
+    Least recently used buckets are dropped beyond `max_keys`; a dropped bucket
+    simply starts full again.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, max_keys: int = 100_000):
+        self._clock = clock
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, rate: Rate, cost: int = 1) -> RateLimitResult:
+        now = self._clock()
+        tokens, updated_at = self._buckets.get(key, (rate.limit, now))
+        tokens, result = _take(tokens, now - updated_at, rate, cost)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return result
+
+
+# Refill and take in one atomic step, so concurrent requests from many API
+# workers can never overdraw a bucket. Uses Redis server time so API nodes
+# with skewed clocks agree. Floats are returned as strings (Lua numbers
+# are truncated to integers on the way out).
+_TOKEN_BUCKET_LUA = """
+local limit = tonumber(ARGV[1])
+local per_second = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or limit
+local ts = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * per_second)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / per_second
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(limit / per_second * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets shared by every API worker, updated by a Lua script.
+
+    Each bucket is a hash {tokens, ts} that expires once it would have
+    refilled completely, so idle clients cost no memory.
+    """
+
+    def __init__(self, redis=None, prefix: str = "ratelimit:"):
+        self._redis = redis
+        self.prefix = prefix
+        self._script = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def hit(self, key: str, rate: Rate, cost: int = 1) -> RateLimitResult:
+        if self._script is None:
+            # register_script runs EVALSHA and falls back to EVAL after a flush
+            self._script = self.redis.register_script(_TOKEN_BUCKET_LUA)
+        allowed, tokens, retry_after = await self._script(
+            keys=[f"{self.prefix}{key}"], args=[rate.limit, rate.per_second, cost]
+        )
+        return RateLimitResult(
+            bool(allowed), rate.limit, int(math.floor(float(tokens))), float(retry_after)
+        )
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter selected by RATE_LIMIT_BACKEND."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = InMemoryRateLimiter() if settings.RATE_LIMIT_BACKEND == "memory" else RedisRateLimiter()
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    """Override the process-wide limiter (tests). None resets to the default."""
+    global _rate_limiter
+    _rate_limiter = limiter
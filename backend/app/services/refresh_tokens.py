@@ -0,0 +1,135 @@
+"""
+Refresh Token Service for BeeManHoney
+Long-lived, rotating refresh tokens so clients renew access tokens without
+sending the password again (and the server without running bcrypt again).
+
+Tokens are 256-bit random strings stored only as SHA-256 hashes; with that
+much entropy a fast hash is enough, so a refresh costs one indexed lookup.
+Each refresh consumes the presented token and issues a new one in the same
+family. Presenting a consumed token means it was copied: the whole family
+is revoked and the user's access tokens with it.
+"""
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.all import RefreshToken, User
+from app.services.token_revocation import get_revocation_list
+
+logger = logging.getLogger(__name__)
+
+
+class Rotation(NamedTuple):
+    user_id: uuid.UUID
+    email: str
+    role: str
+    refresh_token: str
+
+
+class InvalidRefreshToken(ValueError):
+    pass
+
+
+class RefreshTokenReused(InvalidRefreshToken):
+    pass
+
+
+def hash_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, user_id: uuid.UUID, family_id: Optional[uuid.UUID] = None) -> str:
+    """Add a new refresh token for `user_id` to the session and return it. The caller commits."""
+    raw = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_token(raw),
+        family_id=family_id or uuid.uuid4(),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return raw
+
+
+async def rotate_refresh_token(db: AsyncSession, raw: str) -> Rotation:
+    """
+    Consume `raw` and issue its successor, committing both.
+
+    Returns the user's current id, email and role (for the new access token)
+    and the new refresh token. Raises InvalidRefreshToken for
+    unknown, expired or revoked tokens, and RefreshTokenReused (after
+    revoking the family) for a token that was already rotated.
+    """
+    now = datetime.utcnow()
+    row = (await db.execute(
+        select(RefreshToken.id, RefreshToken.family_id, RefreshToken.used_at, RefreshToken.revoked_at,
+               User.id, User.email, User.role)
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == hash_token(raw), RefreshToken.expires_at > now)
+    )).first()
+    if row is None:
+        raise InvalidRefreshToken("Unknown or expired refresh token")
+    token_id, family_id, used_at, revoked_at, user_id, email, role = row
+    if revoked_at is not None:
+        raise InvalidRefreshToken("Refresh token revoked")
+
+    # Claim it atomically: of two concurrent refreshes with one token, only one wins
+    claimed = used_at is None and (await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == token_id, RefreshToken.used_at.is_(None), RefreshToken.revoked_at.is_(None))
+        .values(used_at=now)
+    )).rowcount == 1
+    if not claimed:
+        await revoke_refresh_tokens(db, family_id=family_id)
+        await db.commit()
+        logger.warning("Refresh token reuse detected for user %s; family %s revoked", user_id, family_id)
+        try:
+            await get_revocation_list().revoke_user(str(user_id))
+        except Exception:
+            logger.warning("Could not revoke access tokens after refresh token reuse", exc_info=True)
+        raise RefreshTokenReused("Refresh token already used")
+
+    new_raw = issue_refresh_token(db, user_id, family_id)
+    await db.commit()
+    return Rotation(user_id, email, role, new_raw)
+
+
+async def revoke_refresh_tokens(
+    db: AsyncSession,
+    family_id: Optional[uuid.UUID] = None,
+    user_id: Optional[uuid.UUID] = None,
+) -> None:
+    """Revoke one token family or every token of a user. The caller commits."""
+    query = update(RefreshToken).where(RefreshToken.revoked_at.is_(None)).values(revoked_at=datetime.utcnow())
+    if family_id is not None:
+        query = query.where(RefreshToken.family_id == family_id)
+    elif user_id is not None:
+        query = query.where(RefreshToken.user_id == user_id)
+    else:
+        raise ValueError("family_id or user_id is required")
+    await db.execute(query)
+
+
+async def family_of(db: AsyncSession, raw: str, user_id: uuid.UUID) -> Optional[uuid.UUID]:
+    """The family of `raw` if it belongs to `user_id`."""
+    result = await db.execute(
+        select(RefreshToken.family_id)
+        .where(RefreshToken.token_hash == hash_token(raw), RefreshToken.user_id == user_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def purge_expired_refresh_tokens(db: AsyncSession, older_than_days: int = 7) -> int:
+    """Delete tokens that expired or were revoked more than `older_than_days` ago. Commits."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = await db.execute(
+        delete(RefreshToken).where(or_(RefreshToken.expires_at < cutoff, RefreshToken.revoked_at < cutoff))
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,164 @@
+"""
+Returns Service for BeeManHoney
+Set-based restocking, refund calculation and keyset paging for returns.
+"""
+import base64
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.all import Order, OrderItem, Product, Return
+
+# Orders in these states may have a return requested against them
+RETURNABLE_ORDER_STATUSES = ("delivered",)
+
+# Returns in these states block a new request for the same order
+OPEN_RETURN_STATUSES = ("pending", "approved")
+
+
+def encode_cursor(requested_at: datetime, return_id: uuid.UUID) -> str:
+    """Encode the keyset position of a return as an opaque cursor."""
+    raw = f"{requested_at.isoformat()}|{return_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        requested_at, return_id = raw.split("|", 1)
+        return datetime.fromisoformat(requested_at), uuid.UUID(return_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def fetch_return_queue(
+    db: AsyncSession,
+    status: str = "pending",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Return], Optional[str]]:
+    """
+    Fetch one page of the admin returns queue, oldest first.
+
+    Uses keyset pagination on (requested_at, id) so every page costs the same
+    index range scan regardless of how deep into the queue the admin is.
+
+    Returns:
+        Tuple of (returns on this page, cursor for the next page or None)
+    """
+    query = select(Return).where(Return.status == status)
+    if cursor:
+        after_requested_at, after_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Return.requested_at > after_requested_at,
+                and_(Return.requested_at == after_requested_at, Return.id > after_id),
+            )
+        )
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(Return.requested_at, Return.id).limit(limit + 1)
+    result = await db.execute(query)
+    rows = list(result.scalars().all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.requested_at, last.id)
+    return rows, next_cursor
+
+
+async def compute_refunds(db: AsyncSession, order_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, float]:
+    """
+    Compute the refund owed per order in a single grouped query.
+
+    Refunds are based on what the customer actually paid per item
+    (OrderItem.price_at_purchase), not the current catalog price.
+    """
+    if not order_ids:
+        return {}
+    query = (
+        select(
+            OrderItem.order_id,
+            func.sum(OrderItem.quantity * OrderItem.price_at_purchase),
+        )
+        .where(OrderItem.order_id.in_(order_ids))
+        .group_by(OrderItem.order_id)
+    )
+    result = await db.execute(query)
+    return {order_id: round(total or 0.0, 2) for order_id, total in result.all()}
+
+
+async def restock_orders(db: AsyncSession, order_ids: Sequence[uuid.UUID]) -> None:
+    """
+    Put the items of the given orders back into stock with one UPDATE.
+
+    Quantities are summed per product first, so a product appearing in many
+    returned orders is updated exactly once.
+    """
+    if not order_ids:
+        return
+    restock = (
+        select(
+            OrderItem.product_id.label("product_id"),
+            func.sum(OrderItem.quantity).label("quantity"),
+        )
+        .where(OrderItem.order_id.in_(order_ids))
+        .group_by(OrderItem.product_id)
+        .subquery()
+    )
+    await db.execute(
+        update(Product)
+        .where(Product.id == restock.c.product_id)
+        .values(stock_quantity=func.coalesce(Product.stock_quantity, 0) + restock.c.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_returns(db: AsyncSession, return_ids: Sequence[uuid.UUID]) -> List[Return]:
+    """
+    Atomically move approved returns to "processed" and return the ones moved.
+
+    The status check is part of the UPDATE, so when two requests race for the
+    same return only one of them gets it back; the other sees it already taken.
+    """
+    if not return_ids:
+        return []
+    result = await db.execute(
+        update(Return)
+        .where(Return.id.in_(return_ids), Return.status == "approved")
+        .values(status="processed", processed_at=datetime.utcnow())
+        .returning(Return)
+        .execution_options(populate_existing=True)
+    )
+    return list(result.scalars().all())
+
+
+async def process_returns(db: AsyncSession, return_ids: Sequence[uuid.UUID]) -> List[Return]:
+    """
+    Process approved returns as one batch.
+
+    Claims the returns, then restocks the items, records the refund on each
+    return and marks the parent orders as returned - for the claimed returns
+    only, so a return processed concurrently is never restocked or refunded
+    twice. The caller is responsible for committing.
+    """
+    returns = await claim_returns(db, return_ids)
+    order_ids = list({r.order_id for r in returns})
+    refunds = await compute_refunds(db, order_ids)
+    await restock_orders(db, order_ids)
+
+    for ret in returns:
+        ret.refund_amount = refunds.get(ret.order_id, 0.0)
+    if order_ids:
+        await db.execute(
+            update(Order)
+            .where(Order.id.in_(order_ids))
+            .values(status="returned")
+            .execution_options(synchronize_session=False)
+        )
+    return returns
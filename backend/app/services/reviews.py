@@ -0,0 +1,75 @@
+"""
+Reviews Service for BeeManHoney
+Keeps the denormalized per-product rating aggregates in step with reviews.
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.all import Product, Review
+
+
+def _histogram_column(rating: int):
+    return getattr(Product, f"rating_{rating}_count")
+
+
+async def apply_rating_delta(db: AsyncSession, product_id: int, rating: int, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one rating from a product's aggregates.
+
+    Done as a single relative UPDATE so concurrent reviews on the same product
+    never lose increments and no aggregate query is ever needed on read.
+    """
+    column = _histogram_column(rating)
+    await db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values({
+            Product.rating_count: Product.rating_count + sign,
+            Product.rating_sum: Product.rating_sum + sign * rating,
+            column: column + sign,
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def recompute_rating_aggregates(
+    db: AsyncSession, product_ids: Optional[Sequence[int]] = None
+) -> None:
+    """
+    Rebuild rating aggregates from the reviews table.
+
+    Only needed for backfills or repairs; normal writes go through
+    apply_rating_delta. Products without reviews are reset to zero.
+    """
+    counts = [
+        func.count(case((Review.rating == star, 1))).label(f"rating_{star}_count")
+        for star in range(1, 6)
+    ]
+    query = select(
+        Review.product_id,
+        func.count(Review.id).label("rating_count"),
+        func.coalesce(func.sum(Review.rating), 0).label("rating_sum"),
+        *counts,
+    ).group_by(Review.product_id)
+    if product_ids is not None:
+        query = query.where(Review.product_id.in_(product_ids))
+    rows = (await db.execute(query)).mappings().all()
+
+    reset = update(Product).values(
+        rating_count=0, rating_sum=0,
+        **{f"rating_{star}_count": 0 for star in range(1, 6)}
+    )
+    if product_ids is not None:
+        reset = reset.where(Product.id.in_(product_ids))
+    await db.execute(reset.execution_options(synchronize_session=False))
+
+    for row in rows:
+        values = {key: row[key] for key in row.keys() if key != "product_id"}
+        await db.execute(
+            update(Product)
+            .where(Product.id == row["product_id"])
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
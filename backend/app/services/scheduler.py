@@ -0,0 +1,465 @@
+"""
+Scheduler Service for BeeManHoney
+Periodic background jobs run inside the API processes.
+
+Every API worker runs a Scheduler on its event loop. Leader election goes
+through a lock with a lease (Redis SET NX PX, renewed while held): one
+process across all replicas holds it and runs the shared jobs (low-stock
+alerts, rollups, reports), the others stand by and take over within the lease if
+the leader dies. Jobs marked per_process (local cache refresh) run in
+every process.
+
+Jobs share the loop with request handling, so they must not block it:
+database work is async and blocking calls (SMTP) go through
+asyncio.to_thread. A job never overlaps with itself and is cancelled
+after its timeout.
+"""
+import asyncio
+import logging
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+from app.models.all import Order, OrderItem, Product, User
+from app.services.low_stock import low_stock_products, send_due_alerts
+
+logger = logging.getLogger(__name__)
+
+JOB_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+scheduler_job_runs_total = registry.register(Counter(
+    "scheduler_job_runs_total", "Scheduled job runs by outcome (ok, error, timeout, skipped)", ("job", "status")))
+scheduler_job_duration_seconds = registry.register(Histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time", ("job",), buckets=JOB_DURATION_BUCKETS))
+scheduler_is_leader = registry.register(Gauge(
+    "scheduler_is_leader", "1 while this process holds the scheduler leader lock"))
+
+
+# --- Schedules ---
+class Every:
+    """Run every `seconds` seconds."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, now: float) -> float:
+        return now + self.seconds
+
+
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))  # minute hour day month weekday
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """Parse one cron field: "*", "5", "1-5", "*/15", "10-40/10" or a comma list of those."""
+    values = set()
+    for part in field.split(","):
+        span, _, step = part.partition("/")
+        try:
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(v) for v in span.split("-", 1))
+            else:
+                start = int(span)
+                end = high if step else start
+            step_size = int(step) if step else 1
+        except ValueError:
+            raise ValueError(f"Invalid cron field {field!r}")
+        if not low <= start <= end <= high or step_size < 1:
+            raise ValueError(f"Invalid cron field {field!r}, values must be within {low}-{high}")
+        values.update(range(start, end + 1, step_size))
+    return frozenset(values)
+
+
+class Cron:
+    """
+    Run on a five-field cron expression ("minute hour day month weekday",
+    UTC; weekday 0 or 7 is Sunday). As in cron, when both day and weekday
+    are restricted a time matching either one runs.
+    """
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression {expression!r}, expected 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(part, low, high) for part, (low, high) in zip(parts, _CRON_FIELDS)
+        )
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, now: float) -> float:
+        moment = datetime.fromtimestamp(now, timezone.utc).replace(second=0, microsecond=0)
+        moment += timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)  # Long enough for "0 0 29 2 *"
+        while moment < limit:
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+
+class Job:
+    """
+    A coroutine function run on a schedule.
+
+    jitter: up to this many seconds are added to every run time at random,
+        so replicas and jobs on the same schedule don't all fire at once.
+    per_process: run in every process instead of only on the leader.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        schedule,
+        timeout: float = 300.0,
+        jitter: float = 0.0,
+        per_process: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.timeout = timeout
+        self.jitter = jitter
+        self.per_process = per_process
+
+
+# --- Leader lock ---
+class LeaderLock:
+    """Base class for leader locks: held by one owner until released or its lease runs out."""
+
+    async def acquire(self, lease: float) -> bool:
+        """Take the lock for `lease` seconds if nobody holds it."""
+        raise NotImplementedError
+
+    async def renew(self, lease: float) -> bool:
+        """Extend the lease; False if this owner no longer holds the lock."""
+        raise NotImplementedError
+
+    async def release(self) -> None:
+        """Give the lock up, if this owner holds it."""
+        raise NotImplementedError
+
+
+_memory_locks: Dict[str, tuple] = {}  # name -> (owner token, expires at)
+
+
+class InMemoryLeaderLock(LeaderLock):
+    """Per-process lock for tests and single-node development; instances sharing a store compete."""
+
+    def __init__(self, name: str = "scheduler", store: Optional[Dict[str, tuple]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.token = uuid.uuid4().hex
+        self._store = _memory_locks if store is None else store
+        self._clock = clock
+
+    def _held_by(self) -> Optional[str]:
+        entry = self._store.get(self.name)
+        return entry[0] if entry and entry[1] > self._clock() else None
+
+    async def acquire(self, lease: float) -> bool:
+        if self._held_by() not in (None, self.token):
+            return False
+        self._store[self.name] = (self.token, self._clock() + lease)
+        return True
+
+    async def renew(self, lease: float) -> bool:
+        if self._held_by() != self.token:
+            return False
+        self._store[self.name] = (self.token, self._clock() + lease)
+        return True
+
+    async def release(self) -> None:
+        if self._held_by() == self.token:
+            del self._store[self.name]
+
+
+# Only the owner may extend or delete the key: compare the token first
+_RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeaderLock(LeaderLock):
+    """Lock shared by every process on every replica: a key holding the owner's token, with a TTL."""
+
+    def __init__(self, redis=None, key: str = "scheduler:leader"):
+        self._redis = redis
+        self.key = key
+        self.token = uuid.uuid4().hex
+        self._renew = None
+        self._release = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def acquire(self, lease: float) -> bool:
+        return bool(await self.redis.set(self.key, self.token, nx=True, px=int(lease * 1000)))
+
+    async def renew(self, lease: float) -> bool:
+        if self._renew is None:
+            self._renew = self.redis.register_script(_RENEW_LUA)
+        return bool(await self._renew(keys=[self.key], args=[self.token, int(lease * 1000)]))
+
+    async def release(self) -> None:
+        if self._release is None:
+            self._release = self.redis.register_script(_RELEASE_LUA)
+        await self._release(keys=[self.key], args=[self.token])
+
+
+# --- Scheduler ---
+class Scheduler:
+    def __init__(
+        self,
+        lock: Optional[LeaderLock] = None,
+        lease: float = settings.SCHEDULER_LEADER_TTL_SECONDS,
+        tick: float = settings.SCHEDULER_TICK_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.lock = lock or (InMemoryLeaderLock() if settings.SCHEDULER_LOCK_BACKEND == "memory" else RedisLeaderLock())
+        self.lease = lease
+        self.tick = tick
+        self._clock = clock
+        self.jobs: Dict[str, Job] = {}
+        self.next_run: Dict[str, float] = {}
+        self.last_status: Dict[str, str] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._leader_until = 0.0  # Leadership is trusted until the lease last confirmed runs out
+        self._next_election = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._clock() < self._leader_until
+
+    def add(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        self._schedule(job, self._clock())
+        return job
+
+    def _schedule(self, job: Job, after: float) -> None:
+        self.next_run[job.name] = job.schedule.next_after(after) + random.uniform(0, job.jitter)
+
+    async def elect(self) -> bool:
+        """Take or keep the leader lock. A lock backend error counts as not leading."""
+        was_leader = self.is_leader
+        now = self._clock()
+        try:
+            held = await (self.lock.renew(self.lease) if was_leader else self.lock.acquire(self.lease))
+        except Exception:
+            logger.warning("Scheduler leader election failed", exc_info=True)
+            held = False
+        self._leader_until = now + self.lease if held else 0.0
+        if held != was_leader:
+            logger.info("Scheduler %s leadership", "took" if held else "lost")
+            (scheduler_is_leader.inc if held else scheduler_is_leader.dec)()
+        return held
+
+    async def run_pending(self) -> List[str]:
+        """Start every due job this process should run; returns their names."""
+        now = self._clock()
+        if now >= self._next_election:
+            await self.elect()
+            self._next_election = now + self.lease / 3
+        started = []
+        for job in self.jobs.values():
+            if now < self.next_run[job.name]:
+                continue
+            # Not ours to run: just move on to the next slot, so a process
+            # that becomes leader later doesn't fire a backlog of missed runs
+            self._schedule(job, now)
+            if not (job.per_process or self.is_leader):
+                continue
+            if job.name in self._running:
+                logger.warning("Job %s is still running, skipping this run", job.name)
+                scheduler_job_runs_total.inc(job.name, "skipped")
+                continue
+            task = asyncio.ensure_future(self.run_job(job.name))
+            task.set_name(f"job:{job.name}")
+            self._running[job.name] = task
+            task.add_done_callback(lambda _, name=job.name: self._running.pop(name, None))
+            started.append(job.name)
+        return started
+
+    async def run_job(self, name: str) -> str:
+        """Run one job now, whatever its schedule; returns ok, error or timeout."""
+        job = self.jobs[name]
+        status = "cancelled"
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logger.warning("Job %s timed out after %gs", name, job.timeout)
+        except Exception:
+            status = "error"
+            logger.exception("Job %s failed", name)
+        finally:
+            self.last_status[name] = status
+            scheduler_job_runs_total.inc(name, status)
+            scheduler_job_duration_seconds.observe(time.perf_counter() - start, name)
+        return status
+
+    async def run(self) -> None:
+        """Run jobs until cancelled; then stop running jobs and give up leadership."""
+        try:
+            while True:
+                await self.run_pending()
+                await asyncio.sleep(self.tick)
+        finally:
+            running = list(self._running.values())
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            if self.is_leader:
+                self._leader_until = 0.0
+                scheduler_is_leader.dec()
+                try:
+                    await self.lock.release()
+                except Exception:
+                    logger.warning("Releasing the scheduler lock failed", exc_info=True)
+
+
+# --- Jobs ---
+async def send_monthly_report(db: AsyncSession, today: Optional[date] = None) -> Dict[str, Any]:
+    """Email ADMIN_EMAIL the KPIs of the previous calendar month; returns them."""
+    first = (today or datetime.utcnow().date()).replace(day=1)
+    end = datetime(first.year, first.month, 1)
+    start = (end - timedelta(days=1)).replace(day=1)
+    in_month = (Order.created_at >= start, Order.created_at < end, Order.status != "cancelled")
+
+    total_orders, total_revenue = (await db.execute(
+        select(func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0.0)).where(*in_month)
+    )).one()
+    top = await db.execute(
+        select(Product.name, func.sum(OrderItem.quantity).label("units"))
+        .join(OrderItem.product).join(OrderItem.order)
+        .where(*in_month)
+        .group_by(Product.id, Product.name)
+        .order_by(desc("units"))
+        .limit(5)
+    )
+    low_stock = await low_stock_products(db, limit=10)
+    new_customers = await db.scalar(
+        select(func.count(User.id)).where(User.role == "customer", User.created_at >= start, User.created_at < end)
+    )
+    report = {
+        "month": start.strftime("%B %Y"),
+        "total_orders": total_orders,
+        "total_revenue": round(float(total_revenue), 2),
+        "avg_order_value": round(float(total_revenue) / total_orders, 2) if total_orders else 0.0,
+        "top_products": "\n".join(f"- {row.name}: {row.units} sold" for row in top) or "-",
+        "low_stock_items": "\n".join(f"- {row.name}: {row.stock_quantity} left" for row in low_stock) or "-",
+        "new_customers": new_customers or 0,
+    }
+    if settings.ADMIN_EMAIL:
+        from app.services.email import email_service
+        await asyncio.to_thread(email_service.send_monthly_report, settings.ADMIN_EMAIL, **report)
+    return report
+
+
+async def refresh_vector_index(db: AsyncSession) -> None:
+    """
+    Rebuild this process's copy of the product vector index if it was ever
+    loaded and another worker has published a newer version since.
+    """
+    # Checked through sys.modules: a process that never searched shouldn't load numpy for this
+    module = sys.modules.get("app.services.vector_index")
+    if module is not None and module.product_index.loaded:
+        await module.product_index.ensure_loaded(db)
+
+
+async def enqueue_missing_embeddings(db: AsyncSession) -> bool:
+    """Have the AI worker embed products left without an embedding; True if any were."""
+    missing = await db.scalar(select(Product.id).where(Product.embedding.is_(None)).limit(1))
+    if missing is None:
+        return False
+    from app.services.task_queue import enqueue
+    # No ids: the task embeds every product whose embedding is NULL
+    return await enqueue("ai.embed_products")
+
+
+def _with_session(func: Callable[[AsyncSession], Awaitable[Any]], read_only: bool = False) -> Callable[[], Awaitable[Any]]:
+    async def run():
+        from app.db.session import AsyncSessionLocal, get_session_router
+        # Reports only read: a replica in sync will do
+        factory = await get_session_router().read_factory() if read_only else AsyncSessionLocal
+        async with factory() as db:
+            return await func(db)
+    return run
+
+
+def default_jobs() -> List[Job]:
+    from app.services.login_history import refresh_monthly_rollup
+    from app.services.refresh_tokens import purge_expired_refresh_tokens
+
+    return [
+        Job("low_stock_alerts", send_due_alerts, Every(15), timeout=60),
+        Job("monthly_report", _with_session(send_monthly_report, read_only=True), Cron(settings.MONTHLY_REPORT_CRON),
+            timeout=300, jitter=60),
+        Job("login_rollup", _with_session(refresh_monthly_rollup), Every(900), timeout=120, jitter=60),
+        Job("refresh_token_purge", _with_session(purge_expired_refresh_tokens), Cron("30 3 * * *"),
+            timeout=300, jitter=300),
+        Job("embedding_backfill", _with_session(enqueue_missing_embeddings), Every(900), timeout=60, jitter=60),
+        Job("vector_index_refresh", _with_session(refresh_vector_index), Every(300),
+            timeout=120, jitter=60, per_process=True),
+    ]
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler with the default jobs, its lock selected by SCHEDULER_LOCK_BACKEND."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+        for job in default_jobs():
+            _scheduler.add(job)
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[Scheduler]) -> None:
+    """Override the process-wide scheduler (tests). None resets to the default."""
+    global _scheduler
+    _scheduler = scheduler
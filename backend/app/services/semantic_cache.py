@@ -0,0 +1,398 @@
+"""
+Semantic Cache for BeeManHoney
+Answers repeated or near-duplicate assistant questions without calling the LLM.
+
+A question is embedded, the nearest cached question is looked up, and its
+answer is returned when the cosine similarity clears SEMANTIC_CACHE_THRESHOLD.
+Entries expire after SEMANTIC_CACHE_TTL_SECONDS and the least recently used
+are evicted beyond SEMANTIC_CACHE_MAX_ENTRIES.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import Embedder, get_embedder
+from app.services.llm import ASSISTANT_SYSTEM_PROMPT, LLMClient, get_llm
+from app.services.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# How many nearest cached questions to consider per lookup (covers expired neighbours)
+_CANDIDATES = 4
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class Flight:
+    """
+    A cache miss the caller answers itself (a streamed reply).
+
+    Requests for the same question wait on `future` instead of calling the
+    LLM again. It resolves to the answer, or to None if none was produced.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.vector: Optional[List[float]] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class SemanticCache:
+    """
+    Base class: embedding, single-flight LLM calls and hit-rate metrics.
+
+    Subclasses provide storage through _find and _put.
+    """
+
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: int = settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        embedder: Optional[Embedder] = None,
+        llm: Optional[LLMClient] = None,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._embedder = embedder
+        self._llm = llm
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.evictions = 0
+
+    @property
+    def embedder(self) -> Embedder:
+        return self._embedder or get_embedder()
+
+    @property
+    def llm(self) -> LLMClient:
+        return self._llm or get_llm()
+
+    async def _embed(self, question: str) -> List[float]:
+        return (await self.embedder.embed([normalize_question(question)]))[0]
+
+    async def _find(self, vector: List[float]) -> Optional[Tuple[str, float]]:
+        raise NotImplementedError
+
+    async def _put(self, question: str, vector: List[float], answer: str) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def lookup(self, question: str) -> Optional[str]:
+        """Cached answer for a semantically equivalent question, or None."""
+        hit = await self._find(await self._embed(question))
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return hit[0]
+
+    async def store(self, question: str, answer: str) -> None:
+        await self._put(normalize_question(question), await self._embed(question), answer)
+
+    async def _answer(self, question: str) -> str:
+        vector = await self._embed(question)
+        hit = await self._find(vector)
+        if hit is not None:
+            self.hits += 1
+            return hit[0]
+        self.misses += 1
+        self.llm_calls += 1
+        answer = await self.llm.complete([
+            {"role": "system", "content": ASSISTANT_SYSTEM_PROMPT},
+            {"role": "user", "content": question},
+        ])
+        await self._put(normalize_question(question), vector, answer)
+        return answer
+
+    async def ask(self, question: str) -> str:
+        """
+        Answer a question from the cache, falling back to the LLM.
+
+        Concurrent identical questions share one in-flight lookup/LLM call,
+        so a burst of the same question costs at most one model request.
+        """
+        key = normalize_question(question)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._answer(question))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        answer = await asyncio.shield(task)
+        if answer is None:
+            # The streamed reply we waited on was abandoned
+            return await self._answer(question)
+        return answer
+
+    async def begin(self, question: str) -> Tuple[Optional[str], Optional[Flight]]:
+        """
+        Streaming counterpart of ask(): a cached answer, or the job of producing one.
+
+        Returns (answer, None) on a hit, including when the same question is
+        already being answered and that answer arrives. Returns (None, flight)
+        on a miss: the caller streams from the LLM and must then call
+        finish(flight, answer), with None if it gave up, so that the requests
+        waiting on it are released. Concurrent identical questions therefore
+        cost one model request, as with ask().
+        """
+        key = normalize_question(question)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            answer = await asyncio.shield(pending)
+            if answer is not None:
+                self.hits += 1
+                return answer, None
+
+        flight = Flight(key)
+        self._inflight[key] = flight.future
+        try:
+            flight.vector = await self._embed(question)
+            hit = await self._find(flight.vector)
+        except BaseException:
+            await self.finish(flight, None)
+            raise
+        if hit is not None:
+            self.hits += 1
+            await self.finish(flight, hit[0], store=False)
+            return hit[0], None
+        self.misses += 1
+        self.llm_calls += 1
+        return None, flight
+
+    async def finish(self, flight: Flight, answer: Optional[str], store: bool = True) -> None:
+        """Cache the streamed answer and release the requests waiting on it. Safe to call twice."""
+        if flight.future.done():
+            return
+        try:
+            if answer is not None and store:
+                await self._put(flight.key, flight.vector, answer)
+        finally:
+            if self._inflight.get(flight.key) is flight.future:
+                del self._inflight[flight.key]
+            flight.future.set_result(answer)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "llm_calls": self.llm_calls,
+            "evictions": self.evictions,
+        }
+
+
+class InMemorySemanticCache(SemanticCache):
+    """Per-process cache: LRU-ordered entries plus an in-memory vector index."""
+
+    def __init__(self, *args, clock: Callable[[], float] = time.monotonic, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._clock = clock
+        self._entries: "OrderedDict[int, Tuple[str, str, float]]" = OrderedDict()
+        self._index: Optional[VectorIndex] = None
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, entry_id: int) -> None:
+        self._entries.pop(entry_id, None)
+        if self._index is not None:
+            self._index.remove([entry_id])
+
+    async def _find(self, vector: List[float]) -> Optional[Tuple[str, float]]:
+        if self._index is None:
+            return None
+        now = self._clock()
+        for entry_id, score in self._index.search([vector], k=_CANDIDATES)[0]:
+            if score < self.threshold:
+                break
+            _, answer, expires_at = self._entries[entry_id]
+            if expires_at <= now:
+                self._drop(entry_id)
+                continue
+            self._entries.move_to_end(entry_id)
+            return answer, score
+        return None
+
+    async def _put(self, question: str, vector: List[float], answer: str) -> None:
+        if self._index is None:
+            self._index = VectorIndex(dim=len(vector))
+        self._next_id += 1
+        self._entries[self._next_id] = (question, answer, self._clock() + self.ttl_seconds)
+        self._index.add([self._next_id], [vector])
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._index = None
+
+
+class RedisSemanticCache(SemanticCache):
+    """
+    Cache shared by every worker through Redis.
+
+    Layout (all keys under `prefix`):
+      entry:<id>  hash {question, answer}, expires after the TTL
+      vectors     hash id -> float32 embedding bytes
+      lru         zset id -> last access time (eviction order)
+      events      stream of "+"/"-" changes so workers sync incrementally
+
+    Each worker mirrors the vectors in a local VectorIndex, so a lookup is one
+    XRANGE for new events, a NumPy top-k, and one HGET for the answer.
+    """
+
+    # Full resync at least this often, bounding drift if events were trimmed
+    RESYNC_SECONDS = 300
+    EVENTS_MAXLEN = 100_000
+
+    def __init__(self, *args, redis=None, prefix: str = "semcache:", **kwargs):
+        super().__init__(*args, **kwargs)
+        self._redis = redis
+        self.prefix = prefix
+        self._index: Optional[VectorIndex] = None
+        self._last_event: Optional[str] = None
+        self._synced_at = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def _ensure_index(self, dim: int) -> VectorIndex:
+        if self._index is None or self._index.dim != dim:
+            self._index = VectorIndex(dim=dim)
+        return self._index
+
+    async def _full_sync(self) -> None:
+        latest = await self.redis.xrevrange(self._key("events"), count=1)
+        raw = await self.redis.hgetall(self._key("vectors"))
+        self._index = None
+        if raw:
+            ids = [int(k) for k in raw]
+            vectors = [np.frombuffer(v, dtype=np.float32) for v in raw.values()]
+            self._ensure_index(len(vectors[0])).add(ids, vectors)
+        self._last_event = latest[0][0].decode() if latest else "0-0"
+        self._synced_at = time.monotonic()
+
+    async def _sync(self) -> None:
+        async with self._sync_lock:
+            if self._last_event is None or time.monotonic() - self._synced_at > self.RESYNC_SECONDS:
+                await self._full_sync()
+                return
+            events = await self.redis.xrange(self._key("events"), min=f"({self._last_event}", count=1000)
+            if not events:
+                return
+            added, removed = [], []
+            for event_id, fields in events:
+                entry_id = int(fields[b"id"])
+                (added if fields[b"op"] == b"+" else removed).append(entry_id)
+            if removed and self._index is not None:
+                self._index.remove(removed)
+            added = [i for i in added if i not in removed]
+            if added:
+                raw = await self.redis.hmget(self._key("vectors"), [str(i) for i in added])
+                pairs = [(i, np.frombuffer(v, dtype=np.float32)) for i, v in zip(added, raw) if v]
+                if pairs:
+                    self._ensure_index(len(pairs[0][1])).add(
+                        [i for i, _ in pairs], [v for _, v in pairs]
+                    )
+            self._last_event = events[-1][0].decode()
+
+    async def _remove(self, entry_ids: List[int]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.delete(self._key(f"entry:{entry_id}"))
+            pipe.hdel(self._key("vectors"), str(entry_id))
+            pipe.zrem(self._key("lru"), str(entry_id))
+            pipe.xadd(self._key("events"), {"op": "-", "id": entry_id},
+                      maxlen=self.EVENTS_MAXLEN, approximate=True)
+        await pipe.execute()
+        if self._index is not None:
+            self._index.remove(entry_ids)
+
+    async def _find(self, vector: List[float]) -> Optional[Tuple[str, float]]:
+        await self._sync()
+        if self._index is None:
+            return None
+        for entry_id, score in self._index.search([vector], k=_CANDIDATES)[0]:
+            if score < self.threshold:
+                break
+            answer = await self.redis.hget(self._key(f"entry:{entry_id}"), "answer")
+            if answer is None:
+                # Entry hash expired: drop the orphaned vector for every worker
+                await self._remove([entry_id])
+                continue
+            await self.redis.zadd(self._key("lru"), {str(entry_id): time.time()})
+            return answer.decode(), score
+        return None
+
+    async def _put(self, question: str, vector: List[float], answer: str) -> None:
+        entry_id = await self.redis.incr(self._key("next_id"))
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self._key(f"entry:{entry_id}"), mapping={"question": question, "answer": answer})
+        pipe.expire(self._key(f"entry:{entry_id}"), self.ttl_seconds)
+        pipe.hset(self._key("vectors"), str(entry_id), np.asarray(vector, dtype=np.float32).tobytes())
+        pipe.zadd(self._key("lru"), {str(entry_id): time.time()})
+        pipe.xadd(self._key("events"), {"op": "+", "id": entry_id},
+                  maxlen=self.EVENTS_MAXLEN, approximate=True)
+        pipe.zcard(self._key("lru"))
+        size = (await pipe.execute())[-1]
+        # Visible to this worker immediately; other workers pick it up from the event stream
+        self._ensure_index(len(vector)).add([entry_id], [vector])
+
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = await self.redis.zpopmin(self._key("lru"), overflow)
+            if evicted:
+                await self._remove([int(member) for member, _ in evicted])
+                self.evictions += len(evicted)
+
+    async def clear(self) -> None:
+        keys = [self._key(name) for name in ("vectors", "lru", "events", "next_id")]
+        async for key in self.redis.scan_iter(match=self._key("entry:*")):
+            keys.append(key)
+        await self.redis.delete(*keys)
+        self._index = None
+        self._last_event = None
+
+
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache selected by SEMANTIC_CACHE_BACKEND."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        if settings.SEMANTIC_CACHE_BACKEND == "memory":
+            _semantic_cache = InMemorySemanticCache()
+        else:
+            _semantic_cache = RedisSemanticCache()
+    return _semantic_cache
+
+
+def set_semantic_cache(cache: Optional[SemanticCache]) -> None:
+    """Override the process-wide semantic cache (tests). None resets to the default."""
+    global _semantic_cache
+    _semantic_cache = cache
@@ -0,0 +1,78 @@
+"""
+Task Queue Service for BeeManHoney
+Hands heavy work (SMTP, embedding calls) from the API to the Celery workers.
+
+Tasks are sent by name (see app/worker/tasks.py), so the API process never
+imports the task modules or their dependencies. Publishing is a blocking
+call on the broker connection and runs on a thread, off the event loop.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    """Base class for task queues."""
+
+    async def enqueue(self, name: str, *args: Any) -> None:
+        raise NotImplementedError
+
+
+class InMemoryTaskQueue(TaskQueue):
+    """Keeps the most recent tasks instead of sending them (tests, benchmarks)."""
+
+    def __init__(self, maxlen: int = 1000):
+        self.sent: Deque[Tuple[str, tuple]] = deque(maxlen=maxlen)
+
+    async def enqueue(self, name: str, *args: Any) -> None:
+        self.sent.append((name, args))
+
+
+class CeleryTaskQueue(TaskQueue):
+    """Publishes onto the Celery queues; the task name picks the queue."""
+
+    async def enqueue(self, name: str, *args: Any) -> None:
+        from app.worker.celery_app import celery_app
+        if celery_app.conf.task_always_eager:
+            # No broker: run it here, as .delay() would
+            import app.worker.tasks  # noqa: F401  (registers the tasks)
+            celery_app.tasks[name].apply(args)
+            return
+        await asyncio.to_thread(celery_app.send_task, name, args=args)
+
+
+_task_queue: Optional[TaskQueue] = None
+
+
+def get_task_queue() -> TaskQueue:
+    """Return the process-wide task queue selected by TASK_QUEUE_BACKEND."""
+    global _task_queue
+    if _task_queue is None:
+        _task_queue = InMemoryTaskQueue() if settings.TASK_QUEUE_BACKEND == "memory" else CeleryTaskQueue()
+    return _task_queue
+
+
+def set_task_queue(queue: Optional[TaskQueue]) -> None:
+    """Override the process-wide task queue (tests). None resets to the default."""
+    global _task_queue
+    _task_queue = queue
+
+
+async def enqueue(name: str, *args: Any) -> bool:
+    """
+    Send a task to the workers. Call after the write it depends on is committed.
+
+    Never raises: returns False when the broker can't be reached, and the
+    caller decides whether to do the work itself or leave it to a backfill.
+    """
+    try:
+        await get_task_queue().enqueue(name, *args)
+    except Exception:
+        logger.warning("Could not enqueue task %s", name, exc_info=True)
+        return False
+    return True
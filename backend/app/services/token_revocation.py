@@ -0,0 +1,120 @@
+"""
+Token Revocation Service for BeeManHoney
+Makes logout real for stateless access tokens.
+
+Two kinds of entry, both checked in O(1) on every authenticated request:
+- a revoked token id (jti), kept only until that token would have expired
+  anyway, so the list stays as small as the number of recent logouts;
+- a per-user cut-off time: every token issued to the user before it is
+  rejected (sign out everywhere, refresh token reuse).
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from app.core.config import settings
+
+def _access_token_lifetime() -> int:
+    # A user cut-off only has to outlive the tokens issued before it
+    return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1
+
+
+class RevocationList:
+    """Base class for revocation stores."""
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """Reject the token `jti` until `expires_at` (unix time), when it expires anyway."""
+        raise NotImplementedError
+
+    async def revoke_user(self, user_id: str) -> None:
+        """Reject every access token issued to `user_id` up to now."""
+        raise NotImplementedError
+
+    async def is_revoked(self, jti: Optional[str], user_id: Optional[str], issued_at: float) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryRevocationList(RevocationList):
+    """Per-process store for tests and single-node development."""
+
+    def __init__(self, clock: Callable[[], float] = time.time, max_entries: int = 100_000):
+        self._clock = clock
+        self.max_entries = max_entries
+        self._tokens: "OrderedDict[str, float]" = OrderedDict()  # jti -> expires at
+        self._users: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # user id -> (cut-off, expires at)
+
+    def _purge(self, entries: OrderedDict, expires_at: Callable) -> None:
+        now = self._clock()
+        for key in [k for k, v in entries.items() if expires_at(v) <= now]:
+            del entries[key]
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        self._tokens[jti] = expires_at
+        self._purge(self._tokens, lambda expires: expires)
+
+    async def revoke_user(self, user_id: str) -> None:
+        now = self._clock()
+        self._users[str(user_id)] = (now, now + _access_token_lifetime())
+        self._purge(self._users, lambda entry: entry[1])
+
+    async def is_revoked(self, jti: Optional[str], user_id: Optional[str], issued_at: float) -> bool:
+        now = self._clock()
+        if jti is not None and self._tokens.get(jti, 0) > now:
+            return True
+        entry = self._users.get(str(user_id)) if user_id is not None else None
+        return entry is not None and entry[1] > now and issued_at <= entry[0]
+
+
+class RedisRevocationList(RevocationList):
+    """
+    Store shared by every API worker.
+
+    One key per entry with a TTL, so Redis drops entries by itself; a check
+    is a single MGET of the token key and the user key.
+    """
+
+    def __init__(self, redis=None, prefix: str = "auth:revoked:"):
+        self._redis = redis
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from app.db.redis import get_redis
+            self._redis = get_redis()
+        return self._redis
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        ttl = int(expires_at - time.time()) + 1
+        if ttl > 0:
+            await self.redis.set(f"{self.prefix}jti:{jti}", 1, ex=ttl)
+
+    async def revoke_user(self, user_id: str) -> None:
+        await self.redis.set(f"{self.prefix}user:{user_id}", repr(time.time()), ex=_access_token_lifetime())
+
+    async def is_revoked(self, jti: Optional[str], user_id: Optional[str], issued_at: float) -> bool:
+        token_flag, cutoff = await self.redis.mget(
+            f"{self.prefix}jti:{jti}", f"{self.prefix}user:{user_id}"
+        )
+        if jti is not None and token_flag is not None:
+            return True
+        return user_id is not None and cutoff is not None and issued_at <= float(cutoff)
+
+
+_revocation_list: Optional[RevocationList] = None
+
+
+def get_revocation_list() -> RevocationList:
+    """Return the process-wide store selected by AUTH_REVOCATION_BACKEND."""
+    global _revocation_list
+    if _revocation_list is None:
+        _revocation_list = InMemoryRevocationList() if settings.AUTH_REVOCATION_BACKEND == "memory" else RedisRevocationList()
+    return _revocation_list
+
+
+def set_revocation_list(store: Optional[RevocationList]) -> None:
+    """Override the process-wide store (tests). None resets to the default."""
+    global _revocation_list
+    _revocation_list = store
@@ -0,0 +1,282 @@
+"""
+In-process Vector Index for BeeManHoney
+Brute-force cosine top-k over product embeddings held in one float32 matrix.
+
+Used where pgvector is not available (SQLite tests, dev laptops) and for
+"similar honeys" on the product page, which needs no database round trip
+once the index is loaded. Only active products are indexed. Each worker
+process holds its own copy. A product write updates the copy of the
+worker that served it and bumps the published index version
+(app.services.index_version); that worker adopts the new version, and
+every other worker rebuilds its copy from the database the next time it
+finds its version stale.
+
+Snapshot the index for memory-mapped startup with:
+    VECTOR_INDEX_PATH=/data/vector_index python -m app.services.vector_index
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.all import Product
+from app.services.index_version import get_index_version
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a contiguous (n, dim) float32 matrix.
+
+    Rows are L2-normalised on insert so a search is a single matrix-vector
+    (or matrix-matrix for batched queries) product followed by argpartition.
+    Capacity grows geometrically so incremental adds are amortised O(dim).
+    """
+
+    def __init__(self, dim: int = settings.EMBEDDING_DIM):
+        self.dim = dim
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self.loaded = False
+        # Published index version this copy was built at; None = unknown
+        self.version: Optional[int] = None
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._row_of
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        writable = self._vectors.flags.writeable
+        if needed <= capacity and writable:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        vectors = np.empty((new_capacity, self.dim), dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        # Copying also detaches from a read-only memory map on first write
+        vectors[:self._size] = self._vectors[:self._size]
+        ids[:self._size] = self._ids[:self._size]
+        self._vectors, self._ids = vectors, ids
+
+    def clear(self) -> None:
+        self._vectors = np.empty((0, self.dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of = {}
+        self.loaded = False
+        self.version = None
+
+    def add(self, ids: Sequence[int], vectors: Sequence[Sequence[float]]) -> None:
+        """Insert or replace vectors for the given ids."""
+        if len(ids) == 0:
+            return
+        matrix = self._normalise(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        new_ids = [i for i in ids if i not in self._row_of]
+        self._ensure_capacity(self._size + len(new_ids))
+        for item_id, vector in zip(ids, matrix):
+            row = self._row_of.get(item_id)
+            if row is None:
+                row = self._size
+                self._row_of[item_id] = row
+                self._ids[row] = item_id
+                self._size += 1
+            self._vectors[row] = vector
+
+    def remove(self, ids: Iterable[int]) -> None:
+        """Remove ids from the index; unknown ids are ignored."""
+        for item_id in ids:
+            row = self._row_of.pop(item_id, None)
+            if row is None:
+                continue
+            self._ensure_capacity(self._size)
+            last = self._size - 1
+            if row != last:
+                # Move the last row into the hole to keep the matrix contiguous
+                moved_id = int(self._ids[last])
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved_id
+                self._row_of[moved_id] = row
+            self._size -= 1
+
+    def search(
+        self,
+        queries: Sequence[Sequence[float]],
+        k: int = 10,
+        exclude: Optional[Sequence[Iterable[int]]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k (id, cosine similarity) pairs for each query, best first.
+
+        All queries are scored in one matrix product. `exclude` optionally
+        gives, per query, ids to leave out of that query's results.
+        """
+        queries = self._normalise(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if self._size == 0:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self._vectors[:self._size].T
+        if exclude is not None:
+            for q, excluded in enumerate(exclude):
+                rows = [self._row_of[i] for i in excluded if i in self._row_of]
+                scores[q, rows] = -np.inf
+
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for q in range(len(queries)):
+            rows = top[q][np.argsort(-scores[q, top[q]])]
+            results.append([
+                (int(self._ids[r]), float(scores[q, r]))
+                for r in rows if scores[q, r] != -np.inf
+            ])
+        return results
+
+    def similar(self, item_id: int, k: int = 4) -> List[Tuple[int, float]]:
+        """Items most similar to an indexed item, excluding the item itself."""
+        row = self._row_of.get(item_id)
+        if row is None:
+            return []
+        return self.search([self._vectors[row]], k=k, exclude=[[item_id]])[0]
+
+    def adopt_version(self, version: Optional[int]) -> None:
+        """
+        Mark this copy current at `version`, just published by this worker's
+        bump after it applied its own change here. Only taken when the copy
+        was current right before that bump; otherwise another worker's change
+        is missing and the copy still rebuilds.
+        """
+        if self.loaded and version is not None and self.version == version - 1:
+            self.version = version
+
+    def save(self, path: str) -> None:
+        """Write the index under `path`: two .npy files and the version they were built at."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self._vectors[:self._size])
+        np.save(os.path.join(path, "ids.npy"), self._ids[:self._size])
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"version": self.version}, f)
+
+    def load(self, path: str, mmap: bool = True) -> bool:
+        """
+        Load an index saved with save(), at the version it was saved at.
+        Returns False if nothing is saved there.
+
+        With mmap=True the vectors are memory-mapped read-only, so startup does
+        not read the whole matrix and forked workers share the same pages. The
+        first write copies the matrix into private memory.
+        """
+        vectors_path = os.path.join(path, "vectors.npy")
+        ids_path = os.path.join(path, "ids.npy")
+        if not (os.path.exists(vectors_path) and os.path.exists(ids_path)):
+            return False
+        vectors = np.load(vectors_path, mmap_mode="r" if mmap else None)
+        if vectors.shape[1] != self.dim:
+            logger.warning("Ignoring vector index at %s: dim %d != %d", path, vectors.shape[1], self.dim)
+            return False
+        ids = np.load(ids_path)
+        meta_path = os.path.join(path, "meta.json")
+        version = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                version = json.load(f).get("version")
+        self._vectors = vectors
+        self._ids = ids.astype(np.int64, copy=False)
+        self._size = len(ids)
+        self._row_of = {int(item_id): row for row, item_id in enumerate(ids)}
+        self.loaded = True
+        self.version = version
+        return True
+
+    async def load_from_db(self, db: AsyncSession, version: Optional[int] = None) -> None:
+        """(Re)build the index from every active product that has an embedding."""
+        result = await db.execute(
+            select(Product.id, Product.embedding).where(
+                Product.embedding.is_not(None), Product.is_active == True
+            )
+        )
+        rows = result.all()
+        self.clear()
+        self.add([row.id for row in rows], [row.embedding for row in rows])
+        self.loaded = True
+        self.version = version
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Rebuild from the database now, at the currently published version."""
+        await self.load_from_db(db, version=await self._published_version())
+
+    async def _published_version(self) -> Optional[int]:
+        try:
+            return await get_index_version().current()
+        except Exception:
+            logger.warning("Vector index version unavailable, keeping the loaded index", exc_info=True)
+            return None
+
+    def _is_current(self, published: Optional[int]) -> bool:
+        return self.loaded and (published is None or published == self.version)
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """
+        Load on first use, and rebuild from the database when another worker
+        has published a newer index version.
+
+        The first load reads VECTOR_INDEX_PATH if a snapshot is there and
+        was saved at the published version, else the database. The version
+        is read before the rows, so a write that lands during the rebuild
+        still leaves this copy stale.
+        """
+        published = await self._published_version()
+        if self._is_current(published):
+            return
+        async with self._load_lock:
+            if self._is_current(published):
+                return
+            if not self.loaded and settings.VECTOR_INDEX_PATH and self.load(settings.VECTOR_INDEX_PATH):
+                if self._is_current(published):
+                    logger.info("Loaded %d product vectors from %s", len(self), settings.VECTOR_INDEX_PATH)
+                    return
+                logger.info(
+                    "Vector index snapshot at %s is version %s, %s is published: rebuilding",
+                    settings.VECTOR_INDEX_PATH, self.version, published,
+                )
+            await self.load_from_db(db, version=published)
+            logger.info("Loaded %d product vectors from the database (version %s)", len(self), published)
+
+
+# Singleton instance
+product_index = VectorIndex()
+
+
+async def main():
+    """Snapshot product embeddings to VECTOR_INDEX_PATH for fast worker startup."""
+    from app.db.session import AsyncSessionLocal
+    if not settings.VECTOR_INDEX_PATH:
+        raise SystemExit("VECTOR_INDEX_PATH is not set")
+    async with AsyncSessionLocal() as db:
+        await product_index.refresh(db)
+    product_index.save(settings.VECTOR_INDEX_PATH)
+    logger.info(
+        "Saved %d product vectors to %s (version %s)",
+        len(product_index), settings.VECTOR_INDEX_PATH, product_index.version,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,6 @@
+"""
+Background worker for BeeManHoney.
+
+Start with:
+    celery -A app.worker.celery_app worker -Q ai,email,analytics --loglevel=info
+"""
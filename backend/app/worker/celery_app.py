@@ -0,0 +1,44 @@
+"""
+Celery application for BeeManHoney.
+
+Tasks are routed by name prefix onto separate queues so slow AI work can't
+starve emails or analytics:
+    ai.*         -> "ai"         (LLM and embedding calls)
+    email.*      -> "email"      (transactional email)
+    analytics.*  -> "analytics"  (aggregate rebuilds)
+
+Set CELERY_TASK_ALWAYS_EAGER=true to run tasks inline without a broker.
+"""
+from celery import Celery
+from kombu import Queue
+
+from app.core.config import settings
+
+QUEUES = ("ai", "email", "analytics")
+
+celery_app = Celery(
+    "beemanhoney",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND or settings.REDIS_URL,
+    include=["app.worker.tasks"],
+)
+
+celery_app.conf.update(
+    task_queues=[Queue(name) for name in QUEUES],
+    task_default_queue="ai",
+    task_routes={f"{name}.*": {"queue": name} for name in QUEUES},
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=3600,
+    # Long AI tasks: take one at a time and ack only once done, so a crashed
+    # worker's task is redelivered instead of lost
+    worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
+    worker_max_tasks_per_child=settings.CELERY_WORKER_MAX_TASKS_PER_CHILD,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    broker_connection_retry_on_startup=True,
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_eager_propagates=True,
+)
@@ -0,0 +1,102 @@
+"""
+Celery tasks for BeeManHoney.
+
+Task bodies are synchronous, so the async services run through run_async()
+on one event loop per worker process; the DB engine and HTTP clients stay
+bound to that loop from task to task.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from celery.signals import worker_process_init
+
+from app.db.session import AsyncSessionLocal
+from app.services import embeddings, login_history, reviews as reviews_service
+from app.services.batching import BatchingEmbedder
+from app.services.catalog_cache import bump_catalog_version
+from app.services.email import email_service
+from app.services.semantic_cache import get_semantic_cache
+from app.worker.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro):
+    """Run a coroutine to completion from a task body."""
+    global _loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+        return _loop.run_until_complete(coro)
+    # Eager call from inside a running loop (API handler, async test): that
+    # loop can't be re-entered, so run the coroutine on a helper thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+@worker_process_init.connect
+def _init_worker_process(**_):
+    # Concurrent embedding calls inside a worker share provider requests
+    embeddings.set_embedder(BatchingEmbedder(embeddings.get_embedder()))
+
+
+# --- AI ---
+@celery_app.task(name="ai.embed_products", acks_late=True)
+def embed_products(product_ids: Optional[List[int]] = None) -> int:
+    """Embed the given products, or every product still missing an embedding."""
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await embeddings.embed_products(db, product_ids=product_ids)
+    return run_async(run())
+
+
+@celery_app.task(name="ai.answer_questions", acks_late=True)
+def answer_questions(questions: List[str]) -> List[str]:
+    """
+    Answer a batch of assistant questions concurrently.
+
+    Each question goes through the semantic cache, so duplicates in the batch
+    cost one LLM call and the question embeddings go out as one request.
+    """
+    async def run():
+        cache = get_semantic_cache()
+        return list(await asyncio.gather(*(cache.ask(q) for q in questions)))
+    return run_async(run())
+
+
+# --- Email ---
+@celery_app.task(name="email.send", bind=True, max_retries=5, default_retry_delay=60)
+def send_email(self, to_email: str, template_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Send a templated email, retrying SMTP failures with a delay."""
+    result = email_service.send_email(to_email, template_name, context)
+    if not result["success"] and email_service.is_configured():
+        logger.warning("Email to %s failed: %s", to_email, result["message"])
+        raise self.retry()
+    return result
+
+
+# --- Analytics ---
+@celery_app.task(name="analytics.recompute_ratings")
+def recompute_ratings(product_ids: Optional[List[int]] = None) -> None:
+    """Rebuild product rating aggregates from the reviews table."""
+    async def run():
+        async with AsyncSessionLocal() as db:
+            await reviews_service.recompute_rating_aggregates(db, product_ids)
+            await db.commit()
+        await bump_catalog_version()
+    run_async(run())
+
+
+@celery_app.task(name="analytics.rollup_logins")
+def rollup_logins(months: int = 2) -> List[Dict[str, Any]]:
+    """Recount Monthly Active Logins for the last `months` months from login_history."""
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await login_history.refresh_monthly_rollup(db, months=months)
+    return run_async(run())
@@ -1,10 +1,15 @@
 import asyncio
 import logging
+from pathlib import Path
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
 from app.db.session import engine
 from app.db.base import Base
 from app.models.all import User, Product, Order, OrderItem
 from app.db.session import AsyncSessionLocal
 from app.core import security
+from sqlalchemy import inspect
 from sqlalchemy.future import select
 
 logging.basicConfig(level=logging.INFO)
@@ -45,11 +50,26 @@ INITIAL_PRODUCTS = [
     }
 ]
 
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+
+
+def _stamp_head(connection):
+    """Record freshly created tables as fully migrated, so `alembic upgrade head` starts from here."""
+    script = ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+    MigrationContext.configure(connection).stamp(script, "head")
+
+
 async def create_tables():
     """Create all database tables"""
     async with engine.begin() as conn:
+        fresh = not await conn.run_sync(lambda c: inspect(c).has_table("users"))
         logger.info("Creating database tables...")
         await conn.run_sync(Base.metadata.create_all)
+        if fresh:
+            await conn.run_sync(_stamp_head)
+        elif not await conn.run_sync(lambda c: inspect(c).has_table("alembic_version")):
+            # create_all adds missing tables but never changes existing ones
+            logger.warning("Existing schema is not under migrations: stamp its revision, then `alembic upgrade head` (see the deployment playbook)")
         logger.info("Database tables created successfully!")
 
 async def seed_database():
@@ -0,0 +1,139 @@
+"""
+Import-time report for process startup, from `python -X importtime`.
+
+Imports a module (app.main by default) in fresh interpreters, takes the
+median of several runs, and reports the total, the time per top-level
+package (sum of self times) and the slowest modules by cumulative time.
+
+Startup must not pull in the AI stack or other subsystems that load on
+first use (numpy, langchain, smtplib, ...); the run fails with exit status
+1 if the imported module drags any of them in, or if --max-ms is exceeded.
+
+Run from backend/:
+    python -m benchmarks.importtime [--module app.main] [--runs 5] [--top 20] [--max-ms 1500]
+    python -m benchmarks.importtime --module app.worker.tasks --allow-deferred
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+# Imported on first use (see the routers and services), never at API startup
+DEFERRED_MODULES = (
+    "numpy",
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langgraph",
+    "openai",
+    "smtplib",
+    "app.services.embeddings",
+    "app.services.vector_index",
+    "app.services.semantic_cache",
+    "app.services.email",
+)
+
+# Only the settings without defaults; nothing is connected to at import time
+ENVIRONMENT = {
+    "DATABASE_URL": "sqlite+aiosqlite://",
+    "REDIS_URL": "redis://localhost",
+    "JWT_SECRET": "importtime",
+}
+
+
+class ImportRecord(NamedTuple):
+    name: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse(stderr: str) -> List[ImportRecord]:
+    """Parse `-X importtime` lines: "import time: self [us] | cumulative | imported package"."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        stripped = name.lstrip()
+        records.append(ImportRecord(
+            stripped.strip(), (len(name) - len(stripped) - 1) // 2, int(self_us), int(cumulative_us)
+        ))
+    return records
+
+
+def run_once(module: str) -> List[ImportRecord]:
+    env = dict(ENVIRONMENT, **os.environ)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse(result.stderr)
+
+
+def by_package(records: List[ImportRecord]) -> Dict[str, int]:
+    totals: Dict[str, int] = defaultdict(int)
+    for record in records:
+        parts = record.name.split(".")
+        # Split the app by subpackage (app.api, app.services, ...), everything else by distribution
+        key = ".".join(parts[:2]) if parts[0] == "app" else parts[0]
+        totals[key] += record.self_us
+    return totals
+
+
+def report(module: str, runs: List[List[ImportRecord]], top: int) -> float:
+    """Print the report; returns the median total in milliseconds."""
+    totals = [next(r.cumulative_us for r in records if r.name == module) for records in runs]
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    total_ms = statistics.median(totals) / 1000
+
+    print(f"import {module}: median {total_ms:.0f} ms over {len(runs)} runs "
+          f"(min {min(totals) / 1000:.0f}, max {max(totals) / 1000:.0f})\n")
+    print(f"  {'package':<36}{'ms':>8}{'share':>8}")
+    packages = sorted(by_package(median_run).items(), key=lambda item: -item[1])
+    for name, self_us in packages[:top]:
+        print(f"  {name:<36}{self_us / 1000:>8.1f}{self_us / 1000 / total_ms:>8.0%}")
+
+    print(f"\n  {'slowest modules (cumulative)':<56}{'ms':>8}")
+    slowest = sorted(median_run, key=lambda r: -r.cumulative_us)
+    for record in [r for r in slowest if r.name != module][:top]:
+        print(f"  {'  ' * min(record.depth, 6)}{record.name:<{56 - 2 * min(record.depth, 6)}}"
+              f"{record.cumulative_us / 1000:>8.1f}")
+    return total_ms
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, help="fail if the median import takes longer")
+    parser.add_argument("--allow-deferred", action="store_true",
+                        help="don't fail on deferred modules (for processes that need them, e.g. the worker)")
+    args = parser.parse_args(argv)
+
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    total_ms = report(args.module, runs, args.top)
+
+    failures = []
+    imported = {record.name for record in runs[0]}
+    deferred = [name for name in DEFERRED_MODULES if name in imported]
+    if deferred and not args.allow_deferred:
+        failures.append(f"imported at startup, should load on first use: {', '.join(deferred)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        failures.append(f"median import {total_ms:.0f} ms > {args.max_ms:.0f} ms")
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Load benchmark for the core API flows.
+
+Drives the ASGI app in-process through httpx.AsyncClient (no server, no
+network) with concurrent virtual users, and reports per-step p50/p95/p99
+latency, errors and requests per second for:
+
+- shopper: browse catalog -> product page -> checkout -> order history
+- login: password logins followed by a token refresh (bcrypt storms)
+- admin: dashboard stats, monthly active logins, returns queue
+
+Each step's p95 is checked against its budget in Docs/13_Performance_SLA.md
+and against a stored baseline. A step whose p95 (or a scenario whose RPS)
+is more than --tolerance worse than the baseline fails the run with exit
+status 1; with --strict-sla, so does a missed SLA budget. Baselines are
+machine-specific: record one with --update-baseline on the box that runs
+the comparison.
+
+Redis, the task queue, SMTP and the LLM are replaced by their in-memory or
+stub backends; the database is a throwaway SQLite file unless
+--database-url points at a PostgreSQL scratch database (all tables in it
+are dropped and recreated).
+
+Run from backend/:
+    python -m benchmarks.load [--scenario shopper] [--users 10] [--iterations 10]
+        [--database-url postgresql+asyncpg://...] [--update-baseline]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+# Settings are read at import time: point every external dependency at an
+# in-process stand-in before the app is imported
+for name, value in {
+    "DATABASE_URL": "sqlite+aiosqlite://", "REDIS_URL": "redis://localhost",
+    "JWT_SECRET": "bench", "OPENAI_API_KEY": "bench",
+    "LLM_PROVIDER": "stub", "EMBEDDING_PROVIDER": "local",
+    "RATE_LIMIT_ENABLED": "false", "SMTP_HOST": "",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core.config import settings  # noqa: E402
+
+# Every store selected by a *_BACKEND setting (Redis, the Celery queue) runs
+# in-process unless the environment names one, including stores added later.
+# CELERY_RESULT_BACKEND is a URL, not a store selector.
+for name in type(settings).model_fields:
+    if name.endswith("_BACKEND") and name != "CELERY_RESULT_BACKEND" and name not in os.environ:
+        setattr(settings, name, "memory")
+
+import httpx
+from sqlalchemy import Uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import security
+from app.db.base import Base
+from app.db.session import get_db, get_primary_db
+from app.main import app
+from app.models.all import Product, User
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# P95 targets from Docs/13_Performance_SLA.md, in milliseconds
+SLA_BUDGETS_MS = {"read": 100, "write": 200}
+
+# Differences below this are noise on an in-process run, whatever the ratio
+NOISE_FLOOR_MS = 5.0
+
+PASSWORD = "BenchPassword123!"
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StepStats:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "kind": self.kind,
+            "count": len(ordered),
+            "errors": self.errors,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        }
+
+
+class Recorder:
+    """Times every request of a scenario, per named step."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.steps: Dict[str, StepStats] = {}
+
+    async def request(
+        self, step: str, kind: str, method: str, url: str, expect: int = 200, **kwargs
+    ) -> Optional[httpx.Response]:
+        stats = self.steps.setdefault(step, StepStats(kind))
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            stats.errors += 1
+            stats.latencies.append(time.perf_counter() - start)
+            return None
+        stats.latencies.append(time.perf_counter() - start)
+        if response.status_code != expect:
+            stats.errors += 1
+        return response
+
+
+class BenchContext(NamedTuple):
+    client: httpx.AsyncClient
+    product_ids: List[int]
+    user_emails: List[str]
+    admin_email: str
+
+
+@asynccontextmanager
+async def bench_app(database_url: Optional[str] = None, products: int = 200, users: int = 10) -> AsyncIterator[BenchContext]:
+    """Fresh, seeded database wired into the app, plus a client for it."""
+    from app.services.login_history import login_history
+
+    tmpdir = None
+    if database_url is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="bench-")
+        database_url = f"sqlite+aiosqlite:///{tmpdir.name}/bench.db"
+    sqlite = database_url.startswith("sqlite")
+    # SQLite takes one writer at a time; wait for the lock instead of failing the request
+    engine = create_async_engine(database_url, connect_args={"timeout": 30} if sqlite else {})
+    if sqlite:
+        for table in Base.metadata.tables.values():
+            for column in table.columns.values():
+                if isinstance(column.type, UUID):
+                    column.type = Uuid(as_uuid=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    # One bcrypt hash for everyone: seeding stays fast, logins cost the real amount
+    hashed = security.get_password_hash(PASSWORD)
+    user_emails = [f"shopper{i}@bench.local" for i in range(users)]
+    admin_email = "admin@bench.local"
+    async with session_factory() as db:
+        db.add_all(User(email=email, hashed_password=hashed, full_name="Bench User") for email in user_emails)
+        db.add(User(email=admin_email, hashed_password=hashed, full_name="Bench Admin", role="admin"))
+        catalog = [
+            Product(
+                name=f"Wildflower Honey {i}",
+                description="Raw, unfiltered honey gathered from spring wildflowers. " * 3,
+                price=299.0 + i,
+                category=("Raw Honey", "Infused Honey", "Comb Honey", "Gift Packs")[i % 4],
+                image_url=f"https://cdn.beemanhoney.com/products/{i}.webp",
+                stock_quantity=1_000_000,
+                is_featured=i % 10 == 0,
+            )
+            for i in range(products)
+        ]
+        db.add_all(catalog)
+        await db.commit()
+        product_ids = [product.id for product in catalog]
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_db] = override_get_db
+    login_history.session_factory = session_factory
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            yield BenchContext(client, product_ids, user_emails, admin_email)
+    finally:
+        await login_history.flush()
+        login_history.session_factory = None
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_primary_db, None)
+        await engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post("/api/v1/auth/token", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()
+
+
+def bearer(tokens: Dict[str, str]) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+# --- Scenarios: one coroutine per virtual user ---
+async def shopper(ctx: BenchContext, rec: Recorder, user: int, iterations: int) -> None:
+    headers = bearer(await login(ctx.client, ctx.user_emails[user % len(ctx.user_emails)]))
+    rng = random.Random(user)
+    for _ in range(iterations):
+        skip = rng.randrange(0, max(1, len(ctx.product_ids) - 20))
+        await rec.request("browse", "read", "GET", "/api/v1/products/", params={"skip": skip, "limit": 20})
+        product_id = rng.choice(ctx.product_ids)
+        await rec.request("product", "read", "GET", f"/api/v1/products/{product_id}")
+        await rec.request(
+            "checkout", "write", "POST", "/api/v1/orders/", headers=headers,
+            json={"items": [{"product_id": product_id, "quantity": 1}], "shipping_address": "12 Hive Lane"},
+        )
+        await rec.request("order_history", "read", "GET", "/api/v1/orders/me", headers=headers)
+
+
+async def login_storm(ctx: BenchContext, rec: Recorder, user: int, iterations: int) -> None:
+    email = ctx.user_emails[user % len(ctx.user_emails)]
+    for _ in range(iterations):
+        response = await rec.request(
+            "login", "write", "POST", "/api/v1/auth/token", data={"username": email, "password": PASSWORD}
+        )
+        if response is None or response.status_code != 200:
+            continue
+        await rec.request(
+            "refresh", "write", "POST", "/api/v1/auth/refresh",
+            json={"refresh_token": response.json()["refresh_token"]},
+        )
+
+
+async def admin_dashboard(ctx: BenchContext, rec: Recorder, user: int, iterations: int) -> None:
+    headers = bearer(await login(ctx.client, ctx.admin_email))
+    for _ in range(iterations):
+        await rec.request("stats", "read", "GET", "/api/v1/analytics/stats", headers=headers)
+        await rec.request("monthly_logins", "read", "GET", "/api/v1/analytics/logins/monthly", headers=headers)
+        await rec.request("returns_queue", "read", "GET", "/api/v1/returns/queue", headers=headers)
+
+
+Scenario = Callable[[BenchContext, Recorder, int, int], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "shopper": shopper,
+    "login": login_storm,
+    "admin": admin_dashboard,
+}
+
+
+async def run_scenario(ctx: BenchContext, scenario: Scenario, users: int, iterations: int) -> Dict[str, Any]:
+    rec = Recorder(ctx.client)
+    start = time.perf_counter()
+    await asyncio.gather(*(scenario(ctx, rec, user, iterations) for user in range(users)))
+    elapsed = time.perf_counter() - start
+    requests = sum(len(stats.latencies) for stats in rec.steps.values())
+    return {
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "steps": {name: stats.summary() for name, stats in rec.steps.items()},
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float, strict_sla: bool) -> List[str]:
+    """Print a report and return the list of failures."""
+    failures = []
+    for name, result in results.items():
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        line = f"\n{name}: {result['rps']} req/s ({result['requests']} requests in {result['seconds']} s)"
+        if base:
+            change = result["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+            line += f", baseline {base['rps']} req/s ({change:+.0%})"
+            if change < -tolerance:
+                failures.append(f"{name}: throughput {change:+.0%} vs baseline")
+        print(line)
+        print(f"  {'step':<16}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'budget':>9}  vs baseline")
+        for step, stats in result["steps"].items():
+            budget = SLA_BUDGETS_MS[stats["kind"]]
+            sla = "" if stats["p95_ms"] <= budget else "  MISSED SLA"
+            if sla and strict_sla:
+                failures.append(f"{name}/{step}: p95 {stats['p95_ms']} ms over the {budget} ms SLA")
+            if stats["errors"]:
+                failures.append(f"{name}/{step}: {stats['errors']} failed requests")
+            versus = ""
+            base_step = (base or {}).get("steps", {}).get(step)
+            if base_step:
+                delta = stats["p95_ms"] - base_step["p95_ms"]
+                ratio = stats["p95_ms"] / base_step["p95_ms"] - 1 if base_step["p95_ms"] else 0.0
+                versus = f"{ratio:+.0%}"
+                if ratio > tolerance and delta > NOISE_FLOOR_MS:
+                    failures.append(f"{name}/{step}: p95 {ratio:+.0%} vs baseline")
+                    versus += " REGRESSION"
+            print(
+                f"  {step:<16}{stats['count']:>7}{stats['errors']:>8}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{budget:>9}  {versus}{sla}"
+            )
+    return failures
+
+
+async def main_async(args) -> int:
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results: Dict[str, Any] = {}
+    async with bench_app(args.database_url, products=args.products, users=args.users) as ctx:
+        for name in names:
+            results[name] = await run_scenario(ctx, SCENARIOS[name], args.users, args.iterations)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    failures = compare(results, baseline, args.tolerance, args.strict_sla)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "database": "sqlite" if args.database_url is None else args.database_url.split(":", 1)[0],
+            "users": args.users,
+            "iterations": args.iterations,
+            "products": args.products,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=10, help="Flow repetitions per user")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--database-url", help="Scratch database (dropped and recreated); default: temp SQLite file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95/RPS regression (0.25 = 25%%)")
+    parser.add_argument("--strict-sla", action="store_true", help="Fail when a step misses its SLA budget")
+    parser.add_argument("--output", help="Also write the results as JSON here")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
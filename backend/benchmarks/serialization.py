@@ -0,0 +1,103 @@
+"""
+Serialization benchmark for a 100-product catalog page.
+
+Compares FastAPI's default response_model path (validate, dump to Python,
+json.dumps) with ORJSONResponse and with json_response(), which
+validates once and has pydantic-core write the bytes. Also reports the
+bytes on the wire with and without compression.
+
+Run from backend/:
+    python -m benchmarks.serialization [--products 100] [--repeat 200]
+"""
+import argparse
+import gzip
+import json
+import os
+import timeit
+from typing import List
+
+# Settings are required at import time; the benchmark never connects anywhere
+for name, value in {
+    "DATABASE_URL": "sqlite+aiosqlite://", "REDIS_URL": "redis://localhost",
+    "JWT_SECRET": "bench", "OPENAI_API_KEY": "bench",
+}.items():
+    os.environ.setdefault(name, value)
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.serialization import dump_json
+from app.models.all import Product
+from app.schemas.all import ProductResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_products(count: int) -> List[Product]:
+    return [
+        Product(
+            id=i,
+            name=f"Wildflower Honey {i}",
+            description="Raw, unfiltered honey gathered from spring wildflowers in the Nilgiri hills. " * 3,
+            price=349.0 + i,
+            category="Raw Honey",
+            image_url=f"https://cdn.beemanhoney.com/products/{i}.webp",
+            stock_quantity=100 + i,
+            is_active=True,
+            is_featured=i % 10 == 0,
+            rating_count=i,
+            rating_sum=i * 4,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    adapter = TypeAdapter(List[ProductResponse])
+
+    def fastapi_default() -> bytes:
+        content = adapter.dump_python(adapter.validate_python(products, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    def orjson_response() -> bytes:
+        content = adapter.dump_python(adapter.validate_python(products, from_attributes=True), mode="json")
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+    def typeadapter_json() -> bytes:
+        return dump_json(List[ProductResponse], products)
+
+    print(f"Serializing {args.products} products, best of 5 x {args.repeat} runs")
+    baseline = None
+    for label, fn in [
+        ("response_model + json.dumps", fastapi_default),
+        ("response_model + ORJSONResponse", orjson_response),
+        ("json_response (TypeAdapter.dump_json)", typeadapter_json),
+    ]:
+        per_call = min(timeit.repeat(fn, number=args.repeat, repeat=5)) / args.repeat
+        baseline = baseline or per_call
+        print(f"  {label:<40} {per_call * 1e3:7.3f} ms  ({baseline / per_call:4.1f}x)")
+
+    body = typeadapter_json()
+    print("\nBytes on the wire")
+    print(f"  {'identity':<40} {len(body):>8,}")
+    gzipped = gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+    print(f"  {f'gzip (level {settings.COMPRESSION_GZIP_LEVEL})':<40} {len(gzipped):>8,}  ({len(gzipped) / len(body):.0%})")
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        print(f"  {f'brotli (quality {settings.COMPRESSION_BROTLI_QUALITY})':<40} {len(compressed):>8,}  ({len(compressed) / len(body):.0%})")
+    else:
+        print(f"  {'brotli':<40} {'(not installed)':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Throughput of the production server (app.server) by worker count.
+
+Starts `python -m app.server` with each --workers value in turn against the
+same seeded SQLite file, drives it over real HTTP from concurrent clients for
+a fixed time, and reports requests per second and latency for:
+
+- live: /health/live (no I/O; framework, event loop and HTTP parsing)
+- product: /api/v1/products/{id} (one indexed read and serialization)
+
+The load generator runs on the same machine and competes with the workers
+for CPU; compare worker counts on a box with at least workers + 1 cores.
+
+Run from backend/:
+    python -m benchmarks.server [--workers 1 4] [--concurrency 64] [--seconds 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.load import bench_app, percentile  # sets up the environment
+
+import httpx
+
+ENDPOINTS = ("live", "product")
+
+
+async def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/health/live")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server at {base_url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+async def drive(base_url: str, endpoint: str, product_ids: List[int], concurrency: int, seconds: float) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def client_loop(client: httpx.AsyncClient, rng: random.Random, deadline: float) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            url = "/health/live" if endpoint == "live" else f"/api/v1/products/{rng.choice(product_ids)}"
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, random.Random(n), start + seconds) for n in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+async def run(worker_counts: List[int], concurrency: int, seconds: float, port: int) -> Dict[int, Dict[str, Dict]]:
+    results: Dict[int, Dict[str, Dict]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-server-") as tmpdir:
+        database_url = f"sqlite+aiosqlite:///{tmpdir}/bench.db"
+        async with bench_app(database_url=database_url, users=1) as ctx:
+            env = dict(os.environ, DATABASE_URL=database_url)
+            base_url = f"http://127.0.0.1:{port}"
+            for workers in worker_counts:
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "app.server", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+                    env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                try:
+                    await wait_until_up(base_url)
+                    results[workers] = {
+                        endpoint: await drive(base_url, endpoint, ctx.product_ids, concurrency, seconds)
+                        for endpoint in ENDPOINTS
+                    }
+                finally:
+                    server.send_signal(signal.SIGTERM)
+                    server.wait(timeout=60)
+    return results
+
+
+def report(results: Dict[int, Dict[str, Dict]]) -> None:
+    print(f"{'workers':>8}  {'endpoint':<10}{'requests':>9}{'errors':>8}{'rps':>9}{'p50':>8}{'p95':>8}  speedup")
+    base = min(results)
+    for workers, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            speedup = stats["rps"] / results[base][endpoint]["rps"] if results[base][endpoint]["rps"] else 0
+            print(
+                f"{workers:>8}  {endpoint:<10}{stats['requests']:>9}{stats['errors']:>8}"
+                f"{stats['rps']:>9.1f}{stats['p50_ms']:>8.1f}{stats['p95_ms']:>8.1f}  x{speedup:.2f}"
+            )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--seconds", type=float, default=10.0, help="per worker count and endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    report(asyncio.run(run(sorted(set(args.workers)), args.concurrency, args.seconds, args.port)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Micro-benchmarks for per-request hot paths, with pytest-benchmark.
+
+Not part of the test suite (pytest.ini only collects tests/). Run from
+backend/ and compare against a saved run:
+    pytest benchmarks/ --benchmark-autosave
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+import asyncio
+from datetime import timedelta
+from typing import List
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.load import BenchContext, bench_app, login  # noqa: E402  (sets up the environment)
+
+
+@pytest.fixture(scope="module")
+def bench():
+    """A seeded app and a private event loop to drive it from sync benchmarks."""
+    loop = asyncio.new_event_loop()
+    context = bench_app(products=200, users=2)
+    ctx: BenchContext = loop.run_until_complete(context.__aenter__())
+    try:
+        yield loop, ctx
+    finally:
+        loop.run_until_complete(context.__aexit__(None, None, None))
+        loop.close()
+
+
+class TestTokens:
+    """Access token verification on every authenticated request."""
+
+    def test_decode_cached(self, benchmark):
+        from app.core import security
+
+        token = security.create_access_token({"sub": "a@bench.local"}, timedelta(minutes=15))
+        security.decode_access_token(token)
+        benchmark(security.decode_access_token, token)
+
+    def test_decode_uncached(self, benchmark):
+        from app.core import security
+
+        token = security.create_access_token({"sub": "a@bench.local"}, timedelta(minutes=15))
+
+        def decode():
+            security._verified.pop(token, None)
+            return security.decode_access_token(token)
+
+        benchmark(decode)
+
+
+class TestSql:
+    def test_fingerprint(self, benchmark):
+        from app.core.slow_queries import fingerprint
+
+        statement = (
+            "SELECT products.id, products.name FROM products "
+            "WHERE products.id IN (1, 2, 3, 4, 5) AND products.price > 10.5 LIMIT 20"
+        )
+        benchmark(fingerprint.__wrapped__, statement)
+
+
+class TestSerialization:
+    def test_catalog_page(self, benchmark):
+        from app.core.serialization import dump_json
+        from app.schemas.all import ProductResponse
+        from benchmarks.serialization import make_products
+
+        products = make_products(100)
+        benchmark(dump_json, List[ProductResponse], products)
+
+
+class TestRequests:
+    """Whole requests through the ASGI app, middleware included."""
+
+    def test_product_page(self, benchmark, bench):
+        loop, ctx = bench
+        url = f"/api/v1/products/{ctx.product_ids[0]}"
+        response = benchmark(lambda: loop.run_until_complete(ctx.client.get(url)))
+        assert response.status_code == 200
+
+    def test_catalog_not_modified(self, benchmark, bench):
+        loop, ctx = bench
+        etag = loop.run_until_complete(ctx.client.get("/api/v1/products/")).headers["etag"]
+        response = benchmark(
+            lambda: loop.run_until_complete(ctx.client.get("/api/v1/products/", headers={"If-None-Match": etag}))
+        )
+        assert response.status_code == 304
+
+    def test_order_history(self, benchmark, bench):
+        loop, ctx = bench
+        tokens = loop.run_until_complete(login(ctx.client, ctx.user_emails[0]))
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        response = benchmark(
+            lambda: loop.run_until_complete(ctx.client.get("/api/v1/orders/me", headers=headers))
+        )
+        assert response.status_code == 200
@@ -1,15 +1,19 @@
 """
 Pytest configuration and shared fixtures for BeeManHoney backend tests.
+
+The schema is created once per session (per xdist worker); every test runs in
+a transaction rolled back at teardown, so tests never see each other's rows.
 """
 import asyncio
+import functools
 import os
 import pytest
 import pytest_asyncio
 from typing import Generator, AsyncGenerator
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
-from sqlalchemy import TypeDecorator
+from sqlalchemy import TypeDecorator, event
 from sqlalchemy.dialects.sqlite import VARCHAR
 
 from app.main import app
@@ -18,8 +22,24 @@ from app.core.config import settings
 from app.core import security
 
 
-# Test database URL (in-memory SQLite for fast tests)
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# Test database URL (in-memory SQLite for fast tests). Point TEST_DATABASE_URL at
+# a SQLite file to inspect the data; under pytest-xdist (pytest -n auto) each
+# worker then gets its own file.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+
+def _worker_database_url(url: str) -> str:
+    worker = os.getenv("PYTEST_XDIST_WORKER")
+    if not worker or ":memory:" in url or not url.startswith("sqlite"):
+        return url
+    root, ext = os.path.splitext(url)
+    return f"{root}-{worker}{ext or '.db'}"
+
+
+@functools.lru_cache(maxsize=None)
+def password_hash(password: str) -> str:
+    """bcrypt is slow on purpose; hash each fixture password once per session."""
+    return security.get_password_hash(password)
 
 
 # UUID type decorator for SQLite compatibility
@@ -63,18 +83,30 @@ def event_loop() -> Generator:
     loop.close()
 
 
-@pytest_asyncio.fixture(scope="function")
-async def test_db() -> AsyncGenerator[AsyncSession, None]:
+@pytest_asyncio.fixture(scope="session")
+async def test_engine() -> AsyncGenerator[AsyncEngine, None]:
     """
-    Create a test database session.
-    Uses in-memory SQLite for fast, isolated tests.
+    Create the test database and its schema once per session.
     """
-    # Create async engine
-    engine = create_async_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    url = _worker_database_url(TEST_DATABASE_URL)
+    if ":memory:" in url:
+        engine = create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_async_engine(url)
+
+    if engine.dialect.name == "sqlite":
+        # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+        @event.listens_for(engine.sync_engine, "connect")
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine.sync_engine, "begin")
+        def do_begin(conn):
+            conn.exec_driver_sql("BEGIN")
 
     # Replace UUID columns with StringUUID for SQLite compatibility
     from sqlalchemy.dialects.postgresql import UUID
@@ -83,13 +115,37 @@ async def test_db() -> AsyncGenerator[AsyncSession, None]:
             if isinstance(column.type, UUID):
                 column.type = StringUUID()
 
-    # Create all tables
+    # Count and time SQL like the app engine does
+    from app.core.metrics import instrument_engine
+    instrument_engine(engine.sync_engine)
+
     async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
+    yield engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def test_db(test_engine: AsyncEngine) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create a test database session.
+    Each test runs inside a transaction that is rolled back afterwards; commits
+    made by the test or the app only release a SAVEPOINT within it.
+    """
+    connection = await test_engine.connect()
+    transaction = await connection.begin()
+
     # Create session
     async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
+        bind=connection,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
 
     session = async_session()
@@ -102,17 +158,54 @@ async def test_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
     app.dependency_overrides[db_session.get_db] = override_get_db
+    app.dependency_overrides[db_session.get_primary_db] = override_get_db
+
+    # The in-process vector index must not leak products between tests
+    from app.services.vector_index import product_index
+    product_index.clear()
+
+    # Fresh, in-process rate limit buckets for every test
+    from app.services.rate_limit import InMemoryRateLimiter, set_rate_limiter
+    set_rate_limiter(InMemoryRateLimiter())
+    from app.services.catalog_cache import InMemoryCatalogVersion, set_catalog_version
+    set_catalog_version(InMemoryCatalogVersion())
+    from app.services.index_version import InMemoryIndexVersion, set_index_version
+    set_index_version(InMemoryIndexVersion())
+    from app.services.token_revocation import InMemoryRevocationList, set_revocation_list
+    set_revocation_list(InMemoryRevocationList())
+    from app.services.low_stock import InMemoryAlertBuffer, set_alert_buffer
+    set_alert_buffer(InMemoryAlertBuffer())
+    from app.services.task_queue import InMemoryTaskQueue, set_task_queue
+    set_task_queue(InMemoryTaskQueue())
+    # Buffered login events go to the test database. The background flush must not
+    # take its own SAVEPOINT: it would interleave with the request session's ones.
+    from app.services.login_history import login_history
+    login_history.session_factory = async_sessionmaker(
+        bind=connection,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="rollback_only",
+    )
 
     yield session
 
     # Cleanup
+    await login_history.flush()
+    login_history.session_factory = None
     await session.close()
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-    await engine.dispose()
+    if transaction.is_active:
+        await transaction.rollback()
+    await connection.close()
 
     # Restore original dependency
     app.dependency_overrides[db_session.get_db] = original_get_db
+    app.dependency_overrides.pop(db_session.get_primary_db, None)
+    set_rate_limiter(None)
+    set_catalog_version(None)
+    set_index_version(None)
+    set_revocation_list(None)
+    set_alert_buffer(None)
+    set_task_queue(None)
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -136,7 +229,7 @@ async def test_user(test_db: AsyncSession) -> dict:
 
     user = User(
         email="test@example.com",
-        hashed_password=security.get_password_hash("testpassword123"),
+        hashed_password=password_hash("testpassword123"),
         full_name="Test User",
         role="customer"
     )
@@ -162,7 +255,7 @@ async def test_admin(test_db: AsyncSession) -> dict:
 
     admin = User(
         email="admin@test.com",
-        hashed_password=security.get_password_hash("adminpassword123"),
+        hashed_password=password_hash("adminpassword123"),
         full_name="Test Admin",
         role="admin"
     )
@@ -248,4 +341,23 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "products: tests for product endpoints")
     config.addinivalue_line("markers", "orders: tests for order endpoints")
     config.addinivalue_line("markers", "analytics: tests for analytics endpoints")
+    config.addinivalue_line("markers", "returns: tests for return endpoints")
+    config.addinivalue_line("markers", "reviews: tests for review endpoints")
+    config.addinivalue_line("markers", "chat: tests for chat endpoints")
+    config.addinivalue_line("markers", "addresses: tests for address and wishlist endpoints")
+    config.addinivalue_line("markers", "worker: tests for background worker tasks")
+    config.addinivalue_line("markers", "rate_limit: tests for rate limiting")
+    config.addinivalue_line("markers", "http_cache: tests for conditional GETs and cache headers")
+    config.addinivalue_line("markers", "compression: tests for response compression and serialization")
+    config.addinivalue_line("markers", "metrics: tests for request metrics and Server-Timing")
+    config.addinivalue_line("markers", "slow_queries: tests for the slow query log")
+    config.addinivalue_line("markers", "health: tests for liveness and readiness probes")
+    config.addinivalue_line("markers", "login_history: tests for login history and the active logins rollup")
+    config.addinivalue_line("markers", "server: tests for the production server launcher")
+    config.addinivalue_line("markers", "startup: tests for import-time startup cost")
+    config.addinivalue_line("markers", "lifespan: tests for startup warm-up and shutdown")
+    config.addinivalue_line("markers", "scheduler: tests for the background job scheduler")
+    config.addinivalue_line("markers", "low_stock: tests for reorder thresholds and low-stock alerts")
+    config.addinivalue_line("markers", "routing: tests for read replica session routing")
+    config.addinivalue_line("markers", "migrations: tests for schema migrations, hot-path indexes and constraints")
     config.addinivalue_line("markers", "integration: integration tests")
@@ -0,0 +1,83 @@
+"""
+Address and wishlist tests.
+Tests that the address book and wishlist endpoints keep their public paths.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.addresses
+
+ADDRESS = {
+    "full_name": "Test User", "phone": "5550100", "address_line1": "1 Hive Lane",
+    "city": "Springfield", "state": "IL", "pincode": "62701", "is_default": True,
+}
+
+
+class TestRoutes:
+    """Tests for the mounted paths."""
+
+    @pytest.mark.parametrize("tag, routes", [
+        ("Addresses", {
+            ("GET", "/api/v1/addresses"),
+            ("POST", "/api/v1/addresses"),
+            ("PUT", "/api/v1/addresses/{address_id}"),
+            ("DELETE", "/api/v1/addresses/{address_id}"),
+        }),
+        ("Wishlist", {
+            ("GET", "/api/v1/wishlist"),
+            ("POST", "/api/v1/wishlist"),
+            ("DELETE", "/api/v1/wishlist/{item_id}"),
+        }),
+    ])
+    def test_paths(self, tag: str, routes: set):
+        """Test that the router serves exactly the paths clients already call."""
+        from app.main import app
+
+        mounted = {
+            (method, route.path)
+            for route in app.routes if tag in getattr(route, "tags", [])
+            for method in route.methods
+        }
+        assert mounted == routes
+
+
+class TestAddresses:
+    """Tests for /api/v1/addresses."""
+
+    async def test_create_update_delete(self, async_client: AsyncClient, auth_headers: dict):
+        """Test the address lifecycle through the exact URLs."""
+        created = await async_client.post("/api/v1/addresses", headers=auth_headers, json=ADDRESS)
+        assert created.status_code == 201
+        address_id = created.json()["id"]
+
+        updated = await async_client.put(
+            f"/api/v1/addresses/{address_id}", headers=auth_headers, json={**ADDRESS, "city": "Shelbyville"}
+        )
+        assert updated.status_code == 200
+        assert updated.json()["city"] == "Shelbyville"
+
+        listed = await async_client.get("/api/v1/addresses", headers=auth_headers)
+        assert [a["id"] for a in listed.json()] == [address_id]
+
+        deleted = await async_client.delete(f"/api/v1/addresses/{address_id}", headers=auth_headers)
+        assert deleted.status_code == 204
+        assert (await async_client.get("/api/v1/addresses", headers=auth_headers)).json() == []
+
+
+class TestWishlist:
+    """Tests for /api/v1/wishlist."""
+
+    async def test_add_and_remove(self, async_client: AsyncClient, auth_headers: dict, test_product: dict):
+        """Test adding and removing a product through the exact URLs."""
+        added = await async_client.post(
+            "/api/v1/wishlist", headers=auth_headers, json={"product_id": test_product["id"]}
+        )
+        assert added.status_code == 201
+
+        listed = await async_client.get("/api/v1/wishlist", headers=auth_headers)
+        assert [item["product_id"] for item in listed.json()] == [test_product["id"]]
+
+        removed = await async_client.delete(f"/api/v1/wishlist/{added.json()['id']}", headers=auth_headers)
+        assert removed.status_code == 204
+        assert (await async_client.get("/api/v1/wishlist", headers=auth_headers)).json() == []
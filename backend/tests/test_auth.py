@@ -168,3 +168,279 @@ class TestTokenValidation:
         response = await async_client.get("/api/v1/analytics/stats", headers=admin_headers)
         # Should return 200 or empty data, but not 401/403
         assert response.status_code in [200, 404]
+
+
+class TestStatelessTokens:
+    """Tests for the claims-based fast path and token revocation."""
+
+    async def test_token_carries_identity_claims(
+        self, async_client: AsyncClient, test_user: dict, auth_headers: dict
+    ):
+        """Test that access tokens embed user id, role and a token id."""
+        from app.core.security import decode_access_token
+
+        claims = decode_access_token(auth_headers["Authorization"].split()[1])
+        assert claims["sub"] == test_user["email"]
+        assert claims["uid"] == str(test_user["id"])
+        assert claims["role"] == "customer"
+        assert claims["jti"]
+
+    async def test_authenticated_request_skips_user_query(
+        self, async_client: AsyncClient, auth_headers: dict
+    ):
+        """Test that a token with claims authenticates without loading the user."""
+        response = await async_client.get("/api/v1/orders/me", headers=auth_headers)
+        assert response.status_code == 200
+        timing = dict(
+            entry.split(";", 1) for entry in response.headers["server-timing"].split(", ")
+        )
+        # Only the orders query itself runs
+        assert 'desc="1 queries"' in timing["db"]
+
+    async def test_legacy_token_falls_back_to_database(
+        self, async_client: AsyncClient, test_user: dict
+    ):
+        """Test that tokens without uid/role claims still work."""
+        from app.core.security import create_access_token
+
+        token = create_access_token({"sub": test_user["email"]})
+        response = await async_client.get(
+            "/api/v1/orders/me", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+
+    async def test_expired_token_rejected_even_when_cached(self, async_client: AsyncClient):
+        """Test that a verified token stops working once it expires."""
+        from datetime import timedelta
+        from jose import JWTError
+        from app.core import security
+
+        token = security.create_access_token({"sub": "a@example.com"}, timedelta(seconds=60))
+        claims = security.decode_access_token(token)
+        security._verified[token] = {**claims, "exp": 0}
+        with pytest.raises(JWTError):
+            security.decode_access_token(token)
+
+    async def test_logout_revokes_token(self, async_client: AsyncClient, auth_headers: dict):
+        """Test that a token is rejected after logout."""
+        response = await async_client.post("/api/v1/auth/logout", headers=auth_headers)
+        assert response.status_code == 204
+
+        response = await async_client.get("/api/v1/orders/me", headers=auth_headers)
+        assert response.status_code == 401
+
+    async def test_logout_keeps_other_sessions(
+        self, async_client: AsyncClient, test_user: dict, auth_headers: dict
+    ):
+        """Test that logging out one token leaves the user's other tokens valid."""
+        other = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["email"], "password": test_user["password"]}
+        )
+        other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+
+        await async_client.post("/api/v1/auth/logout", headers=auth_headers)
+        response = await async_client.get("/api/v1/orders/me", headers=other_headers)
+        assert response.status_code == 200
+
+    async def test_logout_everywhere(
+        self, async_client: AsyncClient, test_user: dict, auth_headers: dict
+    ):
+        """Test that logging out everywhere revokes all earlier tokens but not new logins."""
+        other = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["email"], "password": test_user["password"]}
+        )
+        other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+
+        response = await async_client.post(
+            "/api/v1/auth/logout", params={"everywhere": "true"}, headers=auth_headers
+        )
+        assert response.status_code == 204
+        for headers in (auth_headers, other_headers):
+            assert (await async_client.get("/api/v1/orders/me", headers=headers)).status_code == 401
+
+        again = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["email"], "password": test_user["password"]}
+        )
+        new_headers = {"Authorization": f"Bearer {again.json()['access_token']}"}
+        assert (await async_client.get("/api/v1/orders/me", headers=new_headers)).status_code == 200
+
+    async def test_revocation_store_outage_accepts_token(
+        self, async_client: AsyncClient, auth_headers: dict
+    ):
+        """Test that requests still authenticate when the revocation store is down."""
+        from app.services.token_revocation import RevocationList, set_revocation_list
+
+        class Down(RevocationList):
+            async def is_revoked(self, jti, user_id, issued_at):
+                raise ConnectionError("redis down")
+
+        set_revocation_list(Down())
+        response = await async_client.get("/api/v1/orders/me", headers=auth_headers)
+        assert response.status_code == 200
+
+
+class TestRevocationList:
+    """Tests for the in-memory revocation list."""
+
+    async def test_entries_expire_with_the_token(self):
+        """Test that a revoked token id is forgotten once the token would have expired."""
+        from app.services.token_revocation import InMemoryRevocationList
+
+        now = [1000.0]
+        revocations = InMemoryRevocationList(clock=lambda: now[0])
+        await revocations.revoke("abc", expires_at=1060.0)
+        assert await revocations.is_revoked("abc", None, 990.0)
+        now[0] = 1061.0
+        assert not await revocations.is_revoked("abc", None, 990.0)
+        await revocations.revoke("def", expires_at=2000.0)
+        assert "abc" not in revocations._tokens
+
+    async def test_user_cutoff(self):
+        """Test that revoking a user rejects only tokens issued before the cut-off."""
+        from app.services.token_revocation import InMemoryRevocationList
+
+        revocations = InMemoryRevocationList(clock=lambda: 1000.0)
+        await revocations.revoke_user("u1")
+        assert await revocations.is_revoked("t1", "u1", 999.5)
+        assert not await revocations.is_revoked("t2", "u1", 1000.5)
+        assert not await revocations.is_revoked("t3", "u2", 999.5)
+
+
+class TestRefreshTokens:
+    """Tests for refresh token rotation."""
+
+    async def login(self, async_client: AsyncClient, user: dict) -> dict:
+        response = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": user["email"], "password": user["password"]}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_login_returns_refresh_token(self, async_client: AsyncClient, test_user: dict):
+        """Test that login issues a refresh token next to the access token."""
+        from app.core.config import settings
+
+        tokens = await self.login(async_client, test_user)
+        assert tokens["refresh_token"]
+        assert tokens["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    async def test_refresh_rotates(self, async_client: AsyncClient, test_user: dict):
+        """Test that refreshing returns a working access token and a new refresh token."""
+        tokens = await self.login(async_client, test_user)
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 200
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != tokens["refresh_token"]
+
+        headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+        assert (await async_client.get("/api/v1/orders/me", headers=headers)).status_code == 200
+
+    async def test_refresh_skips_bcrypt(self, async_client: AsyncClient, test_user: dict, monkeypatch):
+        """Test that refreshing never verifies a password."""
+        from app.core import security
+
+        tokens = await self.login(async_client, test_user)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("bcrypt must not run on refresh")
+
+        monkeypatch.setattr(security, "verify_password", fail)
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 200
+
+    async def test_only_hash_is_stored(self, async_client: AsyncClient, test_db, test_user: dict):
+        """Test that the raw refresh token is never written to the database."""
+        from sqlalchemy import select
+        from app.models.all import RefreshToken
+        from app.services.refresh_tokens import hash_token
+
+        tokens = await self.login(async_client, test_user)
+        stored = (await test_db.execute(select(RefreshToken.token_hash))).scalars().all()
+        assert stored == [hash_token(tokens["refresh_token"])]
+
+    async def test_unknown_refresh_token(self, async_client: AsyncClient):
+        """Test that an unknown refresh token is rejected."""
+        response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": "nope"})
+        assert response.status_code == 401
+
+    async def test_reuse_revokes_family(self, async_client: AsyncClient, test_user: dict):
+        """Test that replaying a used refresh token revokes its successor and access tokens."""
+        tokens = await self.login(async_client, test_user)
+        first = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        successor = first.json()
+
+        replay = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert replay.status_code == 401
+
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": successor["refresh_token"]}
+        )
+        assert response.status_code == 401
+        headers = {"Authorization": f"Bearer {successor['access_token']}"}
+        assert (await async_client.get("/api/v1/orders/me", headers=headers)).status_code == 401
+
+    async def test_reuse_leaves_other_logins(self, async_client: AsyncClient, test_user: dict):
+        """Test that reuse in one session does not revoke another session's refresh token."""
+        stolen = await self.login(async_client, test_user)
+        other = await self.login(async_client, test_user)
+        await async_client.post("/api/v1/auth/refresh", json={"refresh_token": stolen["refresh_token"]})
+        await async_client.post("/api/v1/auth/refresh", json={"refresh_token": stolen["refresh_token"]})
+
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": other["refresh_token"]}
+        )
+        assert response.status_code == 200
+
+    async def test_expired_refresh_token(self, async_client: AsyncClient, test_db, test_user: dict):
+        """Test that an expired refresh token is rejected."""
+        from datetime import datetime, timedelta
+        from sqlalchemy import update
+        from app.models.all import RefreshToken
+
+        tokens = await self.login(async_client, test_user)
+        await test_db.execute(
+            update(RefreshToken).values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+        )
+        await test_db.commit()
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+
+    async def test_logout_revokes_refresh_token(self, async_client: AsyncClient, test_user: dict):
+        """Test that logging out with the refresh token ends the session."""
+        tokens = await self.login(async_client, test_user)
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        response = await async_client.post(
+            "/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers
+        )
+        assert response.status_code == 204
+        response = await async_client.post(
+            "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert response.status_code == 401
+
+    async def test_logout_everywhere_revokes_refresh_tokens(self, async_client: AsyncClient, test_user: dict):
+        """Test that logging out everywhere ends every session's refresh token."""
+        first = await self.login(async_client, test_user)
+        second = await self.login(async_client, test_user)
+        headers = {"Authorization": f"Bearer {first['access_token']}"}
+        await async_client.post("/api/v1/auth/logout", params={"everywhere": "true"}, headers=headers)
+
+        for tokens in (first, second):
+            response = await async_client.post(
+                "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+            )
+            assert response.status_code == 401
@@ -0,0 +1,211 @@
+"""
+Chat streaming tests.
+Tests for SSE token delivery, thread history, stream limits and the semantic cache.
+"""
+import asyncio
+import json
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.chat
+
+
+def parse_events(body: str) -> list:
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def stub_llm():
+    """Swap in a stub model, fresh history and a fresh semantic cache."""
+    from app.services.chat import InMemoryChatHistory, set_chat_history
+    from app.services.embeddings import HashingEmbedder
+    from app.services.llm import StubLLM, set_llm
+    from app.services.semantic_cache import InMemorySemanticCache, set_semantic_cache
+
+    llm = StubLLM()
+    set_llm(llm)
+    set_chat_history(InMemoryChatHistory())
+    set_semantic_cache(InMemorySemanticCache(embedder=HashingEmbedder(dim=256), llm=llm))
+    yield llm
+    set_llm(None)
+    set_chat_history(None)
+    set_semantic_cache(None)
+
+
+class TestChatStream:
+    """Tests for POST /chat/stream."""
+
+    async def test_stream_tokens_then_end(
+        self, async_client: AsyncClient, auth_headers: dict, stub_llm
+    ):
+        """Test that the reply arrives as message events followed by an end event."""
+        response = await async_client.post(
+            "/api/v1/chat/stream",
+            headers=auth_headers,
+            json={"message": "which honey suits tea"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_events(response.text)
+        assert [e for e, _ in events[:-1]] == ["message"] * (len(events) - 1)
+        assert "".join(d["token"] for _, d in events[:-1]) == "Stub answer: which honey suits tea"
+        assert events[-1][0] == "end"
+        assert events[-1][1]["thread_id"]
+
+    async def test_thread_history_is_persisted(
+        self, async_client: AsyncClient, auth_headers: dict, test_user: dict, stub_llm
+    ):
+        """Test that a follow-up on the same thread sees the earlier turn."""
+        from app.services.chat import get_chat_history
+
+        response = await async_client.post(
+            "/api/v1/chat/stream", headers=auth_headers, json={"message": "hello"}
+        )
+        thread_id = parse_events(response.text)[-1][1]["thread_id"]
+        await async_client.post(
+            "/api/v1/chat/stream",
+            headers=auth_headers,
+            json={"message": "and raw honey?", "thread_id": thread_id}
+        )
+
+        history = await get_chat_history().get(f"{test_user['id']}:{thread_id}")
+        assert [m["role"] for m in history] == ["user", "assistant", "user", "assistant"]
+        assert history[2]["content"] == "and raw honey?"
+
+    async def test_repeated_opening_question_served_from_cache(
+        self, async_client: AsyncClient, auth_headers: dict, stub_llm
+    ):
+        """Test that a repeated first question streams without another model call."""
+        for _ in range(2):
+            response = await async_client.post(
+                "/api/v1/chat/stream",
+                headers=auth_headers,
+                json={"message": "Is honey good for a sore throat?"}
+            )
+            assert parse_events(response.text)[-1][0] == "end"
+        assert stub_llm.calls == 1
+
+    async def test_concurrent_opening_questions_share_one_call(
+        self, async_client: AsyncClient, auth_headers: dict, stub_llm
+    ):
+        """Test that identical first questions streamed at once cost one model call."""
+        stub_llm.token_delay = 0.01
+
+        async def ask():
+            response = await async_client.post(
+                "/api/v1/chat/stream",
+                headers=auth_headers,
+                json={"message": "Does honey ever go off?"}
+            )
+            return parse_events(response.text)
+
+        streams = await asyncio.gather(*[ask() for _ in range(3)])
+        assert stub_llm.calls == 1
+        answers = {"".join(data["token"] for event, data in events if event == "message") for events in streams}
+        assert answers == {"Stub answer: Does honey ever go off?"}
+
+    async def test_stream_requires_auth(self, async_client: AsyncClient, stub_llm):
+        """Test that anonymous users cannot chat."""
+        response = await async_client.post("/api/v1/chat/stream", json={"message": "hi"})
+        assert response.status_code == 401
+
+    async def test_saturated_node_returns_429(
+        self, async_client: AsyncClient, auth_headers: dict, stub_llm, monkeypatch
+    ):
+        """Test that requests beyond the stream cap are rejected after the queue timeout."""
+        from app.services import chat as chat_service
+
+        limiter = chat_service.StreamLimiter(max_streams=1, queue_timeout=0.01)
+        monkeypatch.setattr(chat_service, "stream_limiter", limiter)
+        lease = await limiter.acquire()
+
+        response = await async_client.post(
+            "/api/v1/chat/stream", headers=auth_headers, json={"message": "hi"}
+        )
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert limiter.rejected == 1
+
+        lease.release()
+        response = await async_client.post(
+            "/api/v1/chat/stream", headers=auth_headers, json={"message": "hi"}
+        )
+        assert response.status_code == 200
+        assert limiter.active == 0
+
+
+class TestStreamReply:
+    """Tests for the streaming generator itself."""
+
+    async def test_stalled_client_aborts_stream(self):
+        """Test that a client that stops reading is dropped and the stream cleaned up at once."""
+        from app.services.chat import InMemoryChatHistory, SSEResponse, stream_reply
+        from app.services.llm import StubLLM
+
+        history = InMemoryChatHistory()
+        cleaned_up = []
+
+        async def events():
+            try:
+                async for event in stream_reply(
+                    StubLLM(), history, "k", "t", "one two three four five six", [], buffer_tokens=1
+                ):
+                    yield event
+            finally:
+                cleaned_up.append(True)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) > 2:
+                await asyncio.Event().wait()  # The client's socket buffer is full
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        response = SSEResponse(events(), send_timeout=0.05)
+        await asyncio.wait_for(response({"type": "http"}, receive, send), 1)
+
+        assert cleaned_up == [True]
+        assert sent[-1]["more_body"] is True
+        assert await history.get("k") == []
+
+    async def test_model_failure_keeps_buffered_tokens(self):
+        """Test that tokens read before a model error all reach the client before the error."""
+        from app.services.chat import InMemoryChatHistory, stream_reply
+        from app.services.llm import StubLLM
+
+        class FailingLLM(StubLLM):
+            async def stream(self, messages):
+                for token in ("a ", "b ", "c "):
+                    yield token
+                raise RuntimeError("connection reset")
+
+        stream = stream_reply(FailingLLM(), InMemoryChatHistory(), "k", "t", "hi", [], buffer_tokens=1)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05)  # The producer runs into the full buffer, then the error
+        events = [first] + [e async for e in stream]
+
+        assert [json.loads(e.split("data: ")[1])["token"] for e in events[:-1]] == ["a ", "b ", "c "]
+        assert events[-1].startswith("event: error")
+
+    async def test_model_failure_emits_error_event(self):
+        """Test that a model error is reported as an SSE error event."""
+        from app.services.chat import InMemoryChatHistory, stream_reply
+        from app.services.llm import StubLLM
+
+        class BrokenLLM(StubLLM):
+            async def complete(self, messages):
+                raise RuntimeError("upstream down")
+
+        events = [e async for e in stream_reply(BrokenLLM(), InMemoryChatHistory(), "k", "t", "hi", [])]
+        assert len(events) == 1
+        assert events[0].startswith("event: error")
@@ -0,0 +1,115 @@
+"""
+Response compression and serialization tests.
+Tests for gzip/brotli negotiation, size thresholds and fast JSON responses.
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+pytestmark = pytest.mark.compression
+
+
+@pytest.fixture
+async def big_catalog(test_db: AsyncSession) -> int:
+    """Enough products for the listing to pass the compression threshold."""
+    from app.models.all import Product
+
+    test_db.add_all([
+        Product(name=f"Acacia Honey {i}", description="Light and floral " * 5, price=299.0, stock_quantity=10)
+        for i in range(30)
+    ])
+    await test_db.commit()
+    return 30
+
+
+class TestCompression:
+    """Tests for the compression middleware."""
+
+    async def test_large_list_is_gzipped(self, async_client: AsyncClient, big_catalog: int):
+        """Test that a large listing is compressed and still decodes to the same JSON."""
+        response = await async_client.get(
+            "/api/v1/products/", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert len(response.json()) == big_catalog
+
+    async def test_small_response_is_not_compressed(self, async_client: AsyncClient):
+        """Test that bodies below the threshold are sent as-is."""
+        response = await async_client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    async def test_identity_when_not_accepted(self, async_client: AsyncClient, big_catalog: int):
+        """Test that clients that don't ask for compression don't get it."""
+        response = await async_client.get(
+            "/api/v1/products/", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in response.headers
+
+    async def test_brotli_preferred_when_available(self, async_client: AsyncClient, big_catalog: int):
+        """Test that brotli is chosen over gzip when installed."""
+        pytest.importorskip("brotli")
+        response = await async_client.get(
+            "/api/v1/products/", headers={"Accept-Encoding": "gzip, br"}
+        )
+        assert response.headers["content-encoding"] == "br"
+
+    async def test_compressed_etag_still_revalidates(
+        self, async_client: AsyncClient, big_catalog: int
+    ):
+        """Test that the weakened ETag of a compressed response still yields 304."""
+        response = await async_client.get(
+            "/api/v1/products/", headers={"Accept-Encoding": "gzip"}
+        )
+        etag = response.headers["etag"]
+        assert etag.startswith("W/")
+        response = await async_client.get(
+            "/api/v1/products/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+    async def test_streamed_body_is_compressed_in_chunks(self):
+        """Test that multi-chunk responses are compressed as one gzip stream."""
+        from fastapi import FastAPI
+        from fastapi.responses import StreamingResponse
+        from httpx import ASGITransport
+        from app.core.middleware import CompressionMiddleware
+
+        app = FastAPI()
+
+        @app.get("/export")
+        def export():
+            return StreamingResponse((b"line of csv data\n" * 100 for _ in range(5)), media_type="text/csv")
+
+        @app.get("/events")
+        def events():
+            return StreamingResponse(iter([b"data: x\n\n"] * 200), media_type="text/event-stream")
+
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/export", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.content == b"line of csv data\n" * 500
+
+            response = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+            assert "content-encoding" not in response.headers
+
+
+class TestJsonResponse:
+    """Tests for the fast serialization path."""
+
+    async def test_matches_response_model_output(self, async_client: AsyncClient, big_catalog: int):
+        """Test that json_response produces the same JSON as FastAPI's response_model."""
+        import json
+        from typing import List
+        from app.core.serialization import dump_json
+        from app.schemas.all import ProductResponse
+
+        response = await async_client.get("/api/v1/products/")
+        products = [ProductResponse(**p) for p in response.json()]
+        expected = [p.model_dump(mode="json") for p in products]
+        assert json.loads(dump_json(List[ProductResponse], products)) == expected
+        assert response.json() == expected
@@ -0,0 +1,192 @@
+"""
+Read replica routing tests.
+Tests for sending reads to replicas, writes and recent writers to the primary.
+"""
+import pytest
+import pytest_asyncio
+
+
+pytestmark = pytest.mark.routing
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest_asyncio.fixture
+async def databases(tmp_path):
+    """A primary and two replicas: SQLite files that each know their own name."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    engines, factories = {}, {}
+    for name in ("primary", "replica1", "replica2"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE node (name TEXT)"))
+            await connection.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+        engines[name] = engine
+        factories[name] = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    yield engines, factories
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def _make_router(databases, replicas=("replica1", "replica2"), **kwargs):
+    from app.db.routing import InMemoryStickiness, Replica, SessionRouter
+
+    engines, factories = databases
+    kwargs.setdefault("stickiness", InMemoryStickiness(clock=kwargs.get("clock", FakeClock())))
+    return SessionRouter(
+        factories["primary"], [Replica(engines[name], factories[name]) for name in replicas], **kwargs
+    )
+
+
+@pytest_asyncio.fixture
+async def routed_client(databases):
+    """An app whose endpoints report which database served them, using the real get_db."""
+    from fastapi import Depends, FastAPI
+    from httpx import AsyncClient
+    from sqlalchemy import text
+    from app.db.session import get_db, get_primary_db, set_session_router
+
+    app = FastAPI()
+
+    @app.get("/node/validated")
+    async def read_validated_node(db=Depends(get_primary_db)):
+        return await db.scalar(text("SELECT name FROM node"))
+
+    @app.get("/node")
+    async def read_node(db=Depends(get_db)):
+        return await db.scalar(text("SELECT name FROM node"))
+
+    @app.post("/node")
+    async def write_node(db=Depends(get_db)):
+        return await db.scalar(text("SELECT name FROM node"))
+
+    clock = FakeClock()
+    router = _make_router(databases, replicas=("replica1",), clock=clock)
+    set_session_router(router)
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client, clock
+    set_session_router(None)
+
+
+def _bearer(uid: str) -> dict:
+    from app.core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': f'{uid}@example.com', 'uid': uid})}"}
+
+
+class TestRequestRouting:
+    """Tests for routing requests through get_db."""
+
+    async def test_reads_use_replica_and_writes_primary(self, routed_client):
+        """Test that GET reads a replica and POST the primary."""
+        client, _ = routed_client
+
+        assert (await client.get("/node")).json() == "replica1"
+        assert (await client.post("/node")).json() == "primary"
+
+    async def test_validated_reads_use_primary(self, routed_client):
+        """Test that GETs whose ETag comes from the primary's writes also read the primary."""
+        client, _ = routed_client
+        assert (await client.get("/node")).json() == "replica1"
+        assert (await client.get("/node/validated")).json() == "primary"
+
+    async def test_read_your_writes(self, routed_client):
+        """Test that a user's reads follow their write to the primary, for a while."""
+        from app.core.config import settings
+
+        client, clock = routed_client
+        alice, bob = _bearer("alice"), _bearer("bob")
+
+        await client.post("/node", headers=alice)
+        assert (await client.get("/node", headers=alice)).json() == "primary"
+        assert (await client.get("/node", headers=bob)).json() == "replica1"
+        assert (await client.get("/node")).json() == "replica1"
+
+        clock.now += settings.DB_READ_YOUR_WRITES_SECONDS
+        assert (await client.get("/node", headers=alice)).json() == "replica1"
+
+    def test_caller_key(self):
+        """Test that the caller comes from the token's user id, and junk is ignored."""
+        from app.db.routing import caller_key
+
+        assert caller_key(_bearer("alice")["Authorization"]) == "alice"
+        assert caller_key("Bearer not-a-jwt") is None
+        assert caller_key(None) is None
+
+
+class TestReplicaSelection:
+    """Tests for choosing among replicas."""
+
+    async def test_round_robin(self, databases):
+        """Test that reads alternate between replicas."""
+        _, factories = databases
+        router = _make_router(databases)
+
+        picked = [await router.factory_for("GET") for _ in range(4)]
+        assert picked == [factories[n] for n in ("replica1", "replica2", "replica1", "replica2")]
+
+    async def test_lagging_replica_is_skipped(self, databases, monkeypatch):
+        """Test that a replica behind by more than the limit is skipped until it catches up."""
+        from app.core.config import settings
+
+        engines, factories = databases
+        monkeypatch.setattr(settings, "DB_REPLICA_MAX_LAG_SECONDS", 5.0)
+        monkeypatch.setattr(settings, "DB_REPLICA_LAG_CHECK_SECONDS", 2.0)
+        lag = {engines["replica1"]: 30.0, engines["replica2"]: 30.0}
+        clock = FakeClock()
+
+        async def probe(engine):
+            return lag[engine]
+
+        router = _make_router(databases, lag_probe=probe, clock=clock)
+        assert await router.factory_for("GET") is factories["primary"]
+
+        lag[engines["replica2"]] = 0.5
+        assert await router.factory_for("GET") is factories["primary"]  # Lag measured 0 s ago
+        clock.now += 2
+        assert {await router.factory_for("GET") for _ in range(3)} == {factories["replica2"]}
+
+    async def test_unreachable_replica_falls_back(self, databases):
+        """Test that a replica that can't be probed sends reads to the primary."""
+        _, factories = databases
+
+        async def probe(engine):
+            raise ConnectionError("replica down")
+
+        router = _make_router(databases, lag_probe=probe)
+        assert await router.factory_for("GET") is factories["primary"]
+
+    async def test_without_replicas_everything_uses_primary(self, databases):
+        """Test that with no replicas configured there is nothing to route."""
+        _, factories = databases
+        router = _make_router(databases, replicas=())
+
+        assert await router.factory_for("GET", "alice") is factories["primary"]
+        assert await router.factory_for("POST", "alice") is factories["primary"]
+
+    async def test_stickiness_outage_reads_primary(self, databases):
+        """Test that when recent writers can't be looked up, their reads stay correct."""
+        from app.db.routing import Stickiness
+
+        class BrokenStickiness(Stickiness):
+            async def mark(self, key, seconds):
+                raise ConnectionError("redis down")
+
+            async def is_sticky(self, key):
+                raise ConnectionError("redis down")
+
+        _, factories = databases
+        router = _make_router(databases, stickiness=BrokenStickiness())
+
+        assert await router.factory_for("POST", "alice") is factories["primary"]
+        assert await router.factory_for("GET", "alice") is factories["primary"]
+        assert await router.factory_for("GET") is factories["replica1"]
@@ -0,0 +1,170 @@
+"""
+Health probe tests.
+Tests for /health/live, /health/ready and the readiness check runner.
+"""
+import asyncio
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.health
+
+
+def make_check(result=None, delay: float = 0.0, error: Exception = None):
+    """Return a fake check and a list recording each call."""
+    calls = []
+
+    async def check():
+        calls.append(1)
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return dict(result or {})
+
+    return check, calls
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestReadinessProbe:
+    """Tests for ReadinessProbe."""
+
+    async def test_all_checks_pass(self):
+        """Test that passing checks report ok with a latency each."""
+        from app.services.health import ReadinessProbe
+
+        db, _ = make_check({"pool_wait_ms": 0.1})
+        redis, _ = make_check()
+        probe = ReadinessProbe({"database": db, "redis": redis}, critical=["database", "redis"])
+        ready, body = await probe.run()
+        assert ready is True
+        assert body["status"] == "ok"
+        assert body["checks"]["database"]["status"] == "ok"
+        assert body["checks"]["database"]["pool_wait_ms"] == 0.1
+        assert "latency_ms" in body["checks"]["redis"]
+
+    async def test_checks_run_concurrently_with_timeout(self):
+        """Test that a hung check fails at the timeout without delaying the others."""
+        from app.services.health import ReadinessProbe
+
+        slow, _ = make_check(delay=5)
+        fast, _ = make_check()
+        probe = ReadinessProbe({"database": slow, "redis": fast}, critical=["database"], timeout=0.05)
+        ready, body = await asyncio.wait_for(probe.run(), 1)
+        assert ready is False
+        assert body["status"] == "fail"
+        assert "timed out" in body["checks"]["database"]["detail"]
+        assert body["checks"]["redis"]["status"] == "ok"
+
+    async def test_non_critical_failure_is_degraded(self):
+        """Test that a failing non-critical check keeps the instance ready."""
+        from app.services.health import ReadinessProbe
+
+        db, _ = make_check()
+        smtp, _ = make_check(error=ConnectionRefusedError("refused"))
+        probe = ReadinessProbe({"database": db, "smtp": smtp}, critical=["database"])
+        ready, body = await probe.run()
+        assert ready is True
+        assert body["status"] == "degraded"
+        assert body["checks"]["smtp"] == {"status": "fail", "detail": "refused", "latency_ms": body["checks"]["smtp"]["latency_ms"]}
+
+    async def test_results_are_cached(self):
+        """Test that probes within the cache window don't rerun the checks."""
+        from app.services.health import ReadinessProbe
+
+        clock = FakeClock()
+        db, calls = make_check()
+        probe = ReadinessProbe({"database": db}, critical=["database"], cache_seconds=2, clock=clock)
+        await probe.run()
+        await asyncio.gather(*(probe.run() for _ in range(10)))
+        assert len(calls) == 1
+
+        clock.now = 2.5
+        await probe.run()
+        assert len(calls) == 2
+
+
+class TestChecks:
+    """Tests for the individual dependency checks."""
+
+    async def test_database_check(self, test_engine):
+        """Test that the database check runs SELECT 1 and reports the pool wait."""
+        from app.services.health import check_database
+
+        result = await check_database(test_engine)
+        assert result["pool_wait_ms"] >= 0
+
+    async def test_database_fails_fast_when_pool_exhausted(self):
+        """Test that a saturated pool fails without waiting for a connection."""
+        from app.services.health import CheckFailed, check_database
+
+        class FullPool:
+            _max_overflow = 2
+
+            def checkedout(self):
+                return 7
+
+            def size(self):
+                return 5
+
+        class Engine:
+            pool = FullPool()
+
+            def connect(self):
+                raise AssertionError("must not wait for a connection")
+
+        with pytest.raises(CheckFailed, match="exhausted"):
+            await check_database(Engine())
+
+    async def test_database_fails_on_slow_pool_wait(self, test_engine):
+        """Test that a pool wait over the threshold fails readiness."""
+        from app.services.health import CheckFailed, check_database
+
+        with pytest.raises(CheckFailed, match="pool wait"):
+            await check_database(test_engine, pool_wait_threshold_ms=-1)
+
+    async def test_smtp_skipped_when_not_configured(self):
+        """Test that SMTP is not probed without a host."""
+        from app.services.health import check_smtp
+
+        assert (await check_smtp(host=""))["status"] == "skipped"
+
+
+class TestHealthEndpoints:
+    """Tests for the probe endpoints."""
+
+    async def test_live(self, async_client: AsyncClient):
+        """Test that liveness answers without touching dependencies."""
+        response = await async_client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+        assert response.headers["cache-control"] == "no-store"
+
+    async def test_ready(self, async_client: AsyncClient, monkeypatch):
+        """Test that readiness returns 200 with per-dependency results."""
+        from app.services import health
+
+        db, _ = make_check()
+        probe = health.ReadinessProbe({"database": db}, critical=["database"])
+        monkeypatch.setattr(health, "readiness_probe", probe)
+        response = await async_client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["checks"]["database"]["status"] == "ok"
+
+    async def test_not_ready(self, async_client: AsyncClient, monkeypatch):
+        """Test that readiness returns 503 when a critical dependency is down."""
+        from app.services import health
+
+        redis, _ = make_check(error=ConnectionError("Connection refused"))
+        probe = health.ReadinessProbe({"redis": redis}, critical=["redis"])
+        monkeypatch.setattr(health, "readiness_probe", probe)
+        response = await async_client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "fail"
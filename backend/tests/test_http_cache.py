@@ -0,0 +1,177 @@
+"""
+HTTP caching tests.
+Tests for ETag/Last-Modified validators and 304 responses on catalog GETs.
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+pytestmark = pytest.mark.http_cache
+
+
+class TestConditionalGet:
+    """Tests for conditional requests on product endpoints."""
+
+    async def test_catalog_responses_carry_validators(
+        self, async_client: AsyncClient, test_product: dict
+    ):
+        """Test that public catalog responses are cacheable."""
+        for path in ("/api/v1/products/", f"/api/v1/products/{test_product['id']}"):
+            response = await async_client.get(path)
+            assert response.status_code == 200
+            assert response.headers["etag"]
+            assert response.headers["last-modified"]
+            assert response.headers["cache-control"].startswith("public, max-age=")
+
+    async def test_matching_etag_returns_304_without_queries(
+        self, async_client: AsyncClient, test_db: AsyncSession, test_product: dict
+    ):
+        """Test that a current ETag is answered before the database is touched."""
+        path = f"/api/v1/products/{test_product['id']}"
+        etag = (await async_client.get(path)).headers["etag"]
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(test_db.bind.sync_engine, "before_cursor_execute", listener)
+        try:
+            response = await async_client.get(path, headers={"If-None-Match": etag})
+        finally:
+            event.remove(test_db.bind.sync_engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert statements == []
+
+    async def test_weak_and_listed_etags_match(
+        self, async_client: AsyncClient, test_product: dict
+    ):
+        """Test If-None-Match with weak tags and several candidates."""
+        etag = (await async_client.get("/api/v1/products/")).headers["etag"]
+        response = await async_client.get(
+            "/api/v1/products/", headers={"If-None-Match": f'"stale", W/{etag}'}
+        )
+        assert response.status_code == 304
+
+    async def test_if_modified_since(self, async_client: AsyncClient, test_product: dict):
+        """Test that Last-Modified can be used to revalidate too."""
+        last_modified = (await async_client.get("/api/v1/products/")).headers["last-modified"]
+        response = await async_client.get(
+            "/api/v1/products/", headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+
+    async def test_product_write_invalidates(
+        self, async_client: AsyncClient, admin_headers: dict, test_product: dict
+    ):
+        """Test that an admin edit changes the ETag and old copies are refreshed."""
+        path = f"/api/v1/products/{test_product['id']}"
+        etag = (await async_client.get(path)).headers["etag"]
+
+        await async_client.patch(f"{path}/featured", headers=admin_headers)
+
+        response = await async_client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["is_featured"] is True
+
+    async def test_new_review_invalidates(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that rating changes are not hidden behind a stale ETag."""
+        etag = (await async_client.get("/api/v1/products/")).headers["etag"]
+        await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 5}
+        )
+        response = await async_client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[0]["rating_count"] == 1
+
+    async def test_checkout_only_invalidates_pages_showing_its_stock(
+        self, async_client: AsyncClient, auth_headers: dict, test_db: AsyncSession, test_product: dict
+    ):
+        """Test that an order leaves the pages of other products and the featured list cached."""
+        from app.models.all import Product
+
+        other = Product(name="Other Honey", price=7.0, stock_quantity=10, is_featured=True)
+        test_db.add(other)
+        await test_db.commit()
+
+        paths = {
+            "sold": f"/api/v1/products/{test_product['id']}",
+            "list": "/api/v1/products/",
+            "other": f"/api/v1/products/{other.id}",
+            "featured": "/api/v1/products/featured",
+        }
+        etags = {name: (await async_client.get(path)).headers["etag"] for name, path in paths.items()}
+
+        response = await async_client.post(
+            "/api/v1/orders/", headers=auth_headers,
+            json={"items": [{"product_id": test_product["id"], "quantity": 1}]},
+        )
+        assert response.status_code == 200
+
+        statuses = {
+            name: (await async_client.get(path, headers={"If-None-Match": etags[name]})).status_code
+            for name, path in paths.items()
+        }
+        assert statuses == {"sold": 200, "list": 200, "other": 304, "featured": 304}
+
+
+class TestCatalogVersion:
+    """Tests for the version stores."""
+
+    async def test_never_bumped_catalog_is_not_dated_1970(self):
+        """Test that Last-Modified of an untouched catalog is when the store started, not epoch 0."""
+        from app.services.catalog_cache import InMemoryCatalogVersion
+
+        store = InMemoryCatalogVersion(clock=lambda: 1_700_000_000.0)
+        assert await store.current() == ([0], 1_700_000_000.0)
+
+    async def test_redis_store_initializes_missing_keys(self):
+        """Test that the first read of a scope stores its date, so later reads agree on it."""
+        from app.services.catalog_cache import RedisCatalogVersion
+
+        class FakePipeline:
+            def __init__(self, hashes):
+                self.hashes, self.calls = hashes, []
+
+            def __getattr__(self, name):
+                return lambda *args: self.calls.append((name, args))
+
+            async def execute(self):
+                replies = []
+                for name, (key, *args) in self.calls:
+                    fields = self.hashes.setdefault(key, {})
+                    if name == "hsetnx":
+                        replies.append(int(fields.setdefault(args[0], str(args[1])) == str(args[1])))
+                    elif name == "hmget":
+                        replies.append([fields.get(field) for field in args])
+                    elif name == "hincrby":
+                        fields[args[0]] = str(int(fields.get(args[0], 0)) + args[1])
+                        replies.append(int(fields[args[0]]))
+                    elif name == "hset":
+                        fields[args[0]] = str(args[1])
+                        replies.append(1)
+                return replies
+
+        class FakeRedis:
+            hashes = {}
+
+            def pipeline(self, transaction=True):
+                return FakePipeline(self.hashes)
+
+        now = [1_700_000_000.0]
+        store = RedisCatalogVersion(redis=FakeRedis(), clock=lambda: now[0])
+
+        assert await store.current(["catalog", "stock:7"]) == ([0, 0], 1_700_000_000.0)
+        now[0] += 60
+        assert await store.current(["catalog", "stock:7"]) == ([0, 0], 1_700_000_000.0)
+
+        await store.bump(["stock:7"])
+        assert await store.current(["catalog", "stock:7"]) == ([0, 1], 1_700_000_060.0)
+        assert await store.current(["catalog", "stock:8"]) == ([0, 0], 1_700_000_060.0)
@@ -0,0 +1,145 @@
+"""
+Lifespan tests.
+Tests for startup warm-up and shutdown of the shared resources.
+"""
+import asyncio
+import pytest
+
+
+pytestmark = pytest.mark.lifespan
+
+
+class TestWarmUp:
+    """Tests for warming up before serving traffic."""
+
+    async def test_steps_run_in_order_and_failures_are_skipped(self):
+        """Test that a failing or hung step is recorded and the rest still run."""
+        from app.core.lifespan import Resources
+
+        ran = []
+
+        async def ok():
+            ran.append("ok")
+            return {"connections": 3}
+
+        async def broken():
+            ran.append("broken")
+            raise ConnectionError("refused")
+
+        async def hung():
+            ran.append("hung")
+            await asyncio.sleep(10)
+
+        async def last():
+            ran.append("last")
+
+        resources = Resources(timeout=0.05)
+        report = await resources.warm_up({"ok": ok, "broken": broken, "hung": hung, "last": last})
+        assert ran == ["ok", "broken", "hung", "last"]
+        assert report["ok"]["connections"] == 3
+        assert report["broken"]["error"] == "refused"
+        assert "timed out" in report["hung"]["error"]
+        assert "error" not in report["last"]
+        assert all(step["ms"] >= 0 for step in report.values())
+
+    async def test_database_and_catalog(self, test_engine, tmp_path):
+        """Test that the database and catalog steps run against a pooled engine."""
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+        from app.core.config import settings
+        from app.core.lifespan import Resources
+        from app.db.base import Base
+        from app.services.catalog_cache import InMemoryCatalogVersion, set_catalog_version
+        from app.services.vector_index import product_index
+
+        # A file database: unlike the shared in-memory one, its pool hands out distinct connections
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warmup.db", poolclass=AsyncAdaptedQueuePool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        set_catalog_version(InMemoryCatalogVersion())
+        product_index.clear()
+        resources = Resources(engine=engine, session_factory=async_sessionmaker(engine))
+        try:
+            report = await resources.warm_up({
+                "database": resources._warm_database,
+                "catalog": resources._warm_catalog,
+            })
+            assert report["database"].get("connections") == settings.WARMUP_DB_CONNECTIONS, report
+            assert engine.pool.checkedin() == settings.WARMUP_DB_CONNECTIONS
+            assert "error" not in report["catalog"], report
+            # Built by the first request that needs it, not by every worker at startup
+            assert not product_index.loaded
+        finally:
+            product_index.clear()
+            set_catalog_version(None)
+            await engine.dispose()
+
+    async def test_vector_index_mapped_from_snapshot(self, monkeypatch, tmp_path):
+        """Test that the vector index is only loaded at startup from a shared snapshot."""
+        from app.core.config import settings
+        from app.core.lifespan import Resources
+        from app.services.vector_index import VectorIndex, product_index
+
+        resources = Resources()
+        product_index.clear()
+        monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "")
+        report = await resources.warm_up({"vector_index": resources._warm_vector_index})
+        assert "skipped" in report["vector_index"]
+        assert not product_index.loaded
+
+        snapshot = VectorIndex(dim=product_index.dim)
+        snapshot.add([1, 2], [[1.0] * snapshot.dim, [0.5] * snapshot.dim])
+        snapshot.save(str(tmp_path))
+        monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path))
+        try:
+            report = await resources.warm_up({"vector_index": resources._warm_vector_index})
+            assert report["vector_index"]["vectors"] == 2, report
+            # Memory-mapped: read-only pages shared with the other workers
+            assert not product_index._vectors.flags.writeable
+        finally:
+            product_index.clear()
+
+    async def test_redis_skipped_without_redis_backends(self, monkeypatch):
+        """Test that Redis is not contacted when every store is in memory."""
+        from app.core import lifespan
+        from app.core.config import settings
+
+        for name in lifespan._REDIS_BACKENDS:
+            monkeypatch.setattr(settings, name, "memory")
+        report = await lifespan.Resources().warm_up({"redis": lifespan.Resources()._warm_redis})
+        assert "skipped" in report["redis"]
+
+
+class TestClose:
+    """Tests for shutting down."""
+
+    async def test_tasks_cancelled_then_closers_newest_first(self):
+        """Test that background tasks stop before the resources they use are closed."""
+        from app.core.lifespan import Resources
+
+        events = []
+
+        async def background():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                events.append("task cancelled")
+                raise
+
+        def closer(name, fail=False):
+            async def close():
+                events.append(name)
+                if fail:
+                    raise RuntimeError("boom")
+            return close
+
+        resources = Resources(timeout=1)
+        resources.on_close("database", closer("database"))
+        resources.on_close("redis", closer("redis", fail=True))
+        resources.on_close("buffer", closer("buffer"))
+        task = resources.spawn(background(), name="background")
+        await asyncio.sleep(0)
+
+        await resources.close()
+        assert task.cancelled()
+        assert events == ["task cancelled", "buffer", "redis", "database"]
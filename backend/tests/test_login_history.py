@@ -0,0 +1,128 @@
+"""
+Login history tests.
+Tests for buffered login events and the Monthly Active Logins rollup.
+"""
+import asyncio
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.login_history
+
+
+class TestLoginHistoryBuffer:
+    """Tests for buffering and batched writes."""
+
+    async def test_login_is_buffered_not_written(
+        self, async_client: AsyncClient, test_db, test_user: dict
+    ):
+        """Test that logging in queues an event instead of writing a row."""
+        from sqlalchemy import func, select
+        from app.models.all import LoginHistory
+        from app.services.login_history import login_history
+
+        response = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["email"], "password": test_user["password"]},
+            headers={"User-Agent": "pytest-browser"}
+        )
+        assert response.status_code == 200
+        assert login_history.pending == 1
+        assert (await test_db.execute(select(func.count(LoginHistory.id)))).scalar() == 0
+
+        assert await login_history.flush() == 1
+        row = (await test_db.execute(select(LoginHistory))).scalars().one()
+        assert str(row.user_id) == str(test_user["id"])
+        assert row.device_agent == "pytest-browser"
+        assert row.ip_address
+
+    async def test_batches(self, test_db, test_user: dict):
+        """Test that events are written in batches of batch_size."""
+        from sqlalchemy import func, select
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        from app.models.all import LoginHistory
+        from app.services.login_history import LoginHistoryBuffer
+
+        sessions = []
+        maker = async_sessionmaker(test_db.bind)
+
+        def factory():
+            sessions.append(1)
+            return maker()
+
+        buffer = LoginHistoryBuffer(session_factory=factory, batch_size=10, flush_interval=60)
+        for _ in range(25):
+            buffer.record(test_user["id"], "10.0.0.1", "agent")
+        await asyncio.sleep(0)
+        await buffer.flush()
+        assert buffer.written == 25
+        assert len(sessions) == 3
+        assert (await test_db.execute(select(func.count(LoginHistory.id)))).scalar() == 25
+
+    async def test_timer_flush(self, test_db, test_user: dict):
+        """Test that a lone event is written after the flush interval."""
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        from app.services.login_history import LoginHistoryBuffer
+
+        buffer = LoginHistoryBuffer(session_factory=async_sessionmaker(test_db.bind), flush_interval=0.01)
+        buffer.record(test_user["id"])
+        await asyncio.sleep(0.1)
+        assert buffer.pending == 0
+        assert buffer.written == 1
+
+    async def test_failed_write_keeps_events(self, test_user: dict):
+        """Test that events survive a failed flush and the buffer stays bounded."""
+        from app.services.login_history import LoginHistoryBuffer
+
+        def broken():
+            raise ConnectionError("database down")
+
+        buffer = LoginHistoryBuffer(session_factory=broken, flush_interval=60, max_pending=3)
+        for _ in range(5):
+            buffer.record(test_user["id"])
+        assert buffer.pending == 3
+        assert buffer.dropped == 2
+        assert await buffer.flush() == 0
+        assert buffer.pending == 3
+        buffer._timer.cancel()
+
+
+class TestMonthlyRollup:
+    """Tests for the Monthly Active Logins rollup."""
+
+    async def test_rollup_counts_distinct_users(
+        self, async_client: AsyncClient, test_db, test_user: dict, test_admin: dict, admin_headers: dict
+    ):
+        """Test that the rollup counts logins and distinct users per month."""
+        from datetime import date, datetime
+        from app.models.all import LoginHistory
+        from app.services.login_history import login_history, refresh_monthly_rollup
+
+        await login_history.flush()  # the admin_headers login
+        for user, when in [
+            (test_user, datetime(2026, 9, 3)),
+            (test_user, datetime(2026, 9, 20)),
+            (test_user, datetime(2026, 10, 1)),
+            (test_admin, datetime(2026, 10, 2)),
+        ]:
+            test_db.add(LoginHistory(user_id=user["id"], login_at=when))
+        await test_db.commit()
+
+        rows = await refresh_monthly_rollup(test_db, months=3, today=date(2026, 10, 19))
+        assert [r["month"] for r in rows] == ["2026-08", "2026-09", "2026-10"]
+        assert rows[1] == {"month": "2026-09", "active_users": 1, "login_count": 2}
+        assert rows[2]["active_users"] == 2
+
+        # Refreshing again updates in place
+        await refresh_monthly_rollup(test_db, months=1, today=date(2026, 10, 19))
+
+        response = await async_client.get(
+            "/api/v1/analytics/logins/monthly", params={"months": 2}, headers=admin_headers
+        )
+        assert response.status_code == 200
+        assert [r["month"] for r in response.json()] == ["2026-09", "2026-10"]
+
+    async def test_rollup_requires_admin(self, async_client: AsyncClient, auth_headers: dict):
+        """Test that regular users cannot read the rollup."""
+        response = await async_client.get("/api/v1/analytics/logins/monthly", headers=auth_headers)
+        assert response.status_code == 403
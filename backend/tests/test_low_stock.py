@@ -0,0 +1,192 @@
+"""
+Low-stock tests.
+Tests for reorder thresholds, threshold-crossing detection and debounced alerts.
+"""
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.low_stock
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _add_product(test_db, **fields) -> int:
+    from app.models.all import Product
+
+    product = Product(**{"name": "Wildflower", "price": 10.0, **fields})
+    test_db.add(product)
+    await test_db.commit()
+    return product.id
+
+
+class TestCrossing:
+    """Tests for detecting the change that takes a product under its threshold."""
+
+    def test_became_low(self):
+        """Test that only the change crossing the threshold counts."""
+        from app.services.low_stock import became_low
+
+        product = SimpleNamespace(stock_quantity=9, reorder_threshold=10, is_active=True)
+        assert became_low(product, stock_before=12)
+        assert not became_low(product, stock_before=9)  # Already low
+        product.stock_quantity = 10
+        assert not became_low(product, stock_before=12)  # At the threshold is not below it
+        product.stock_quantity, product.is_active = 5, False
+        assert not became_low(product, stock_before=12)
+
+    def test_raised_threshold(self):
+        """Test that raising the threshold above the stock counts as a crossing."""
+        from app.services.low_stock import became_low
+
+        product = SimpleNamespace(stock_quantity=15, reorder_threshold=20, is_active=True)
+        assert became_low(product, stock_before=15, threshold_before=10)
+
+    async def test_order_records_crossing_once(
+        self, async_client: AsyncClient, auth_headers: dict, test_db
+    ):
+        """Test that the order taking stock under the threshold queues one alert."""
+        from app.services.low_stock import get_alert_buffer
+
+        product_id = await _add_product(test_db, stock_quantity=12, reorder_threshold=10)
+        buffer = get_alert_buffer()
+
+        for quantity in (2, 3, 1):
+            response = await async_client.post(
+                "/api/v1/orders/", headers=auth_headers,
+                json={"items": [{"product_id": product_id, "quantity": quantity}]},
+            )
+            assert response.status_code == 200
+
+        assert list(buffer._entries) == [product_id]
+        assert buffer._entries[product_id]["stock_quantity"] == 7
+
+    async def test_admin_update_records_crossing(
+        self, async_client: AsyncClient, admin_headers: dict, test_db
+    ):
+        """Test that setting the stock under the threshold from the admin queues an alert."""
+        from app.services.low_stock import get_alert_buffer
+
+        product_id = await _add_product(test_db, stock_quantity=50, reorder_threshold=5)
+        response = await async_client.put(
+            f"/api/v1/products/{product_id}", headers=admin_headers,
+            json={"name": "Wildflower", "price": 10.0, "stock_quantity": 4},
+        )
+        assert response.status_code == 200
+        assert list(get_alert_buffer()._entries) == [product_id]
+
+    async def test_new_products_get_default_threshold(
+        self, async_client: AsyncClient, admin_headers: dict, test_db
+    ):
+        """Test that products created without a threshold use LOW_STOCK_THRESHOLD."""
+        from app.core.config import settings
+        from app.models.all import Product
+
+        response = await async_client.post(
+            "/api/v1/products/", headers=admin_headers, json={"name": "Clover", "price": 8.0},
+        )
+        assert response.status_code == 200
+        product = await test_db.get(Product, response.json()["id"])
+        assert product.reorder_threshold == settings.LOW_STOCK_THRESHOLD
+
+
+class TestLowStockList:
+    """Tests for listing the products that are low on stock."""
+
+    async def test_uses_per_product_threshold(self, test_db):
+        """Test that each product is compared with its own threshold."""
+        from app.services.low_stock import low_stock_products
+
+        await _add_product(test_db, name="Low", stock_quantity=4, reorder_threshold=5)
+        await _add_product(test_db, name="Fine", stock_quantity=4, reorder_threshold=3)
+        await _add_product(test_db, name="Hidden", stock_quantity=0, reorder_threshold=5, is_active=False)
+
+        assert [p.name for p in await low_stock_products(test_db)] == ["Low"]
+
+    async def test_query_uses_partial_index(self, test_db):
+        """Test that the low-stock list is read from the partial index, not a table scan."""
+        from sqlalchemy import text
+        from app.services.low_stock import low_stock_query
+
+        if test_db.bind.dialect.name != "sqlite":
+            pytest.skip("query plan check is written for SQLite")
+        sql = low_stock_query(limit=5).compile(
+            dialect=test_db.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = (await test_db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+        assert any("ix_products_low_stock" in row[-1] for row in plan), plan
+
+
+class TestAlertBuffer:
+    """Tests for debouncing and batching alerts."""
+
+    async def test_debounce_and_max_delay(self, monkeypatch):
+        """Test that a batch waits for a quiet period, but not beyond the max delay."""
+        from app.core.config import settings
+        from app.services.low_stock import InMemoryAlertBuffer
+
+        monkeypatch.setattr(settings, "LOW_STOCK_ALERT_DEBOUNCE_SECONDS", 60)
+        monkeypatch.setattr(settings, "LOW_STOCK_ALERT_MAX_DELAY_SECONDS", 150)
+        clock = FakeClock()
+        buffer = InMemoryAlertBuffer(clock=clock)
+
+        await buffer.add([{"id": 1, "name": "A", "stock_quantity": 3}])
+        clock.now += 50
+        await buffer.add([{"id": 2, "name": "B", "stock_quantity": 1}])
+        clock.now += 50
+        assert await buffer.take_due() == []  # 50 s since the last one
+        await buffer.add([{"id": 1, "name": "A", "stock_quantity": 2}])
+        clock.now += 50
+        batch = await buffer.take_due()  # Still busy, but the first has waited 150 s
+
+        assert sorted((e["id"], e["stock_quantity"]) for e in batch) == [(1, 2), (2, 1)]
+        assert await buffer.take_due() == []
+
+    async def test_send_due_alerts_batches_one_email(self, monkeypatch):
+        """Test that due products go out in one email, lowest stock first."""
+        from app.core.config import settings
+        from app.services import low_stock
+        from app.services.email import email_service
+
+        clock = FakeClock()
+        low_stock.set_alert_buffer(low_stock.InMemoryAlertBuffer(clock=clock))
+        monkeypatch.setattr(settings, "ADMIN_EMAIL", "admin@example.com")
+        sent = []
+        monkeypatch.setattr(
+            email_service, "send_low_stock_alert",
+            lambda to, products: sent.append((to, [p["name"] for p in products])) or {"success": True},
+        )
+
+        await low_stock.record_low_stock([
+            {"id": 1, "name": "A", "stock_quantity": 3},
+            {"id": 2, "name": "B", "stock_quantity": 1},
+        ])
+        assert await low_stock.send_due_alerts() == []
+        clock.now += settings.LOW_STOCK_ALERT_DEBOUNCE_SECONDS
+        await low_stock.send_due_alerts()
+        await low_stock.send_due_alerts()
+
+        assert sent == [("admin@example.com", ["B", "A"])]
+        low_stock.set_alert_buffer(None)
+
+    async def test_record_never_fails(self):
+        """Test that an unavailable buffer does not fail the caller."""
+        from app.services import low_stock
+
+        class BrokenBuffer(low_stock.AlertBuffer):
+            async def add(self, entries):
+                raise ConnectionError("redis down")
+
+        low_stock.set_alert_buffer(BrokenBuffer())
+        try:
+            await low_stock.record_low_stock([{"id": 1, "name": "A", "stock_quantity": 0}])
+        finally:
+            low_stock.set_alert_buffer(None)
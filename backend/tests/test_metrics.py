@@ -0,0 +1,89 @@
+"""
+Instrumentation tests.
+Tests for the /metrics endpoint, per-route histograms and Server-Timing.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.metrics
+
+
+def parse_server_timing(header: str) -> dict:
+    """Map metric name -> (dur, desc) from a Server-Timing header."""
+    entries = {}
+    for entry in header.split(","):
+        name, *params = [p.strip() for p in entry.split(";")]
+        values = dict(p.split("=", 1) for p in params)
+        entries[name] = (float(values["dur"]), values.get("desc", "").strip('"'))
+    return entries
+
+
+class TestServerTiming:
+    """Tests for the Server-Timing header."""
+
+    async def test_db_queries_are_counted(self, async_client: AsyncClient, test_product: dict):
+        """Test that SQL statements run for a request show up in Server-Timing."""
+        response = await async_client.get(f"/api/v1/products/{test_product['id']}")
+        timing = parse_server_timing(response.headers["server-timing"])
+        assert timing["db"][1].endswith("queries")
+        assert int(timing["db"][1].split()[0]) >= 1
+        assert "serialize" in timing
+        assert timing["total"][0] >= timing["db"][0]
+
+    async def test_auth_phase(self, async_client: AsyncClient, test_user: dict):
+        """Test that password hashing time is attributed to the auth phase."""
+        response = await async_client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["email"], "password": test_user["password"]}
+        )
+        timing = parse_server_timing(response.headers["server-timing"])
+        assert timing["auth"][0] > 0
+
+
+class TestMetricsEndpoint:
+    """Tests for the Prometheus endpoint."""
+
+    async def test_route_histograms(self, async_client: AsyncClient, test_product: dict):
+        """Test that latency is recorded per route template, not per concrete URL."""
+        from app.core import metrics
+
+        route = "/api/v1/products/{product_id}"
+        before = metrics.http_request_duration_seconds.count("GET", route)
+        await async_client.get(f"/api/v1/products/{test_product['id']}")
+        await async_client.get("/api/v1/products/999999")
+        assert metrics.http_request_duration_seconds.count("GET", route) == before + 2
+        assert metrics.http_requests_total.value("GET", route, "404") >= 1
+
+        response = await async_client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/products/{product_id}",le="0.1"}' in body
+        assert "db_query_duration_seconds_count" in body
+
+    async def test_unmatched_paths_share_one_label(self, async_client: AsyncClient):
+        """Test that random 404 URLs can't blow up label cardinality."""
+        from app.core import metrics
+
+        await async_client.get("/no/such/page-1")
+        await async_client.get("/no/such/page-2")
+        assert metrics.http_requests_total.value("GET", "unmatched", "404") >= 2
+
+
+class TestHistogram:
+    """Tests for the histogram primitive."""
+
+    def test_cumulative_buckets(self):
+        """Test Prometheus cumulative bucket semantics."""
+        from app.core.metrics import Histogram
+
+        histogram = Histogram("h", "test", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+        lines = histogram.render()
+        assert 'h_bucket{le="0.1"} 1' in lines
+        assert 'h_bucket{le="1.0"} 3' in lines
+        assert 'h_bucket{le="+Inf"} 4' in lines
+        assert "h_count 4" in lines
@@ -0,0 +1,322 @@
+"""
+Schema tests.
+Tests for the Alembic migrations, the hot-path indexes and the integrity constraints.
+"""
+import re
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.migrations
+
+# Tables the customer-facing endpoints read on every request
+HOT_TABLES = {"orders", "order_items", "products", "promo_codes", "wishlists", "addresses", "users"}
+
+ADDRESS = {
+    "full_name": "Test User", "phone": "5550100", "address_line1": "1 Hive Lane",
+    "city": "Springfield", "state": "IL", "pincode": "62701", "is_default": True,
+}
+
+
+@asynccontextmanager
+async def _captured_selects(test_engine):
+    """Collect the SELECT statements (with their parameters) run inside the block."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def _table_scans(test_db, statements) -> list:
+    """The plan steps that read a hot table row by row instead of through an index."""
+    connection = await test_db.connection()
+    scans = []
+    for statement, parameters in statements:
+        plan = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        for row in plan:
+            match = re.fullmatch(r"SCAN (?:TABLE )?(\w+)(?: AS \w+)?", row[-1])
+            if match and match.group(1) in HOT_TABLES:
+                scans.append((row[-1], statement))
+    return scans
+
+
+class TestQueryPlans:
+    """Tests that the hot endpoints are served by indexes."""
+
+    @pytest.fixture(autouse=True)
+    def _sqlite_only(self, test_engine):
+        if test_engine.dialect.name != "sqlite":
+            pytest.skip("query plan checks are written for SQLite")
+
+    @pytest.mark.parametrize("path", [
+        "/api/v1/orders/me",
+        "/api/v1/wishlist",
+        "/api/v1/addresses",
+        "/api/v1/products/featured",
+    ])
+    async def test_customer_reads_use_indexes(
+        self, path, async_client: AsyncClient, auth_headers: dict, test_product: dict, test_engine, test_db
+    ):
+        """Test that none of the queries behind a hot GET scans a whole table."""
+        from sqlalchemy import update
+        from app.models.all import Product
+
+        await test_db.execute(update(Product).where(Product.id == test_product["id"]).values(is_featured=True))
+        await test_db.commit()
+        order = await async_client.post(
+            "/api/v1/orders/", headers=auth_headers,
+            json={"items": [{"product_id": test_product["id"], "quantity": 1}]},
+        )
+        assert order.status_code == 200
+        await async_client.post("/api/v1/wishlist", headers=auth_headers, json={"product_id": test_product["id"]})
+        await async_client.post("/api/v1/addresses", headers=auth_headers, json=ADDRESS)
+
+        async with _captured_selects(test_engine) as statements:
+            response = await async_client.get(path, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()
+        assert statements
+        assert await _table_scans(test_db, statements) == []
+
+    async def test_order_with_promo_code_uses_indexes(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict, test_engine, test_db
+    ):
+        """Test that placing an order, including the promo code lookup, reads through indexes."""
+        from app.models.all import PromoCode
+
+        test_db.add(PromoCode(code="BEES10", discount_percent=10.0))
+        await test_db.commit()
+
+        async with _captured_selects(test_engine) as statements:
+            response = await async_client.post(
+                "/api/v1/orders/", headers=auth_headers,
+                json={"items": [{"product_id": test_product["id"], "quantity": 1}], "promo_code": "BEES10"},
+            )
+        assert response.status_code == 200
+        assert any("promo_codes" in statement for statement, _ in statements)
+        assert await _table_scans(test_db, statements) == []
+
+
+class TestConstraints:
+    """Tests for the rules the database now enforces."""
+
+    async def test_wishlist_holds_a_product_once(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that adding a product twice is refused and leaves one row."""
+        body = {"product_id": test_product["id"]}
+        assert (await async_client.post("/api/v1/wishlist", headers=auth_headers, json=body)).status_code == 201
+
+        response = await async_client.post("/api/v1/wishlist", headers=auth_headers, json=body)
+        assert response.status_code == 400
+        assert len((await async_client.get("/api/v1/wishlist", headers=auth_headers)).json()) == 1
+
+    async def test_one_default_address(self, async_client: AsyncClient, auth_headers: dict):
+        """Test that a new default address replaces the previous default."""
+        first = await async_client.post("/api/v1/addresses", headers=auth_headers, json=ADDRESS)
+        second = await async_client.post("/api/v1/addresses", headers=auth_headers, json=ADDRESS)
+        assert first.status_code == second.status_code == 201
+
+        addresses = (await async_client.get("/api/v1/addresses", headers=auth_headers)).json()
+        assert [(a["id"], a["is_default"]) for a in addresses] == [
+            (first.json()["id"], False), (second.json()["id"], True)
+        ]
+
+    async def test_default_address_enforced_by_database(self, test_db, test_user: dict):
+        """Test that two default addresses for one user can't be stored."""
+        from sqlalchemy.exc import IntegrityError
+        from app.models.all import Address
+
+        for line in ("1 Hive Lane", "2 Hive Lane"):
+            test_db.add(Address(
+                user_id=test_user["id"], full_name="Test User", phone="5550100", address_line1=line,
+                city="Springfield", state="IL", pincode="62701", is_default=True,
+            ))
+        with pytest.raises(IntegrityError):
+            await test_db.commit()
+        await test_db.rollback()
+
+    async def test_stock_cannot_go_negative(self, test_db, test_product: dict):
+        """Test that the stock check holds even for writes that bypass the order endpoint."""
+        from sqlalchemy import update
+        from sqlalchemy.exc import IntegrityError
+        from app.models.all import Product
+
+        with pytest.raises(IntegrityError):
+            await test_db.execute(
+                update(Product).where(Product.id == test_product["id"]).values(stock_quantity=-1)
+            )
+        await test_db.rollback()
+
+    async def test_order_quantity_must_be_positive(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that a zero or negative quantity is rejected before it can touch stock."""
+        for quantity in (0, -3):
+            response = await async_client.post(
+                "/api/v1/orders/", headers=auth_headers,
+                json={"items": [{"product_id": test_product["id"], "quantity": quantity}]},
+            )
+            assert response.status_code == 422
+
+
+class TestMigrations:
+    """Tests for the Alembic migration chain."""
+
+    def _config(self, url: str):
+        from pathlib import Path
+        from alembic.config import Config
+
+        # No ini file: leaves the test run's logging configuration alone
+        config = Config()
+        config.set_main_option("script_location", str(Path(__file__).resolve().parents[1] / "alembic"))
+        config.set_main_option("sqlalchemy.url", url)
+        return config
+
+    def test_upgrade_matches_models(self, tmp_path):
+        """Test that upgrading an empty database gives the indexes and constraints of the models."""
+        from alembic import command
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from sqlalchemy import create_engine
+        from app.db.base import Base
+
+        database = tmp_path / "migrated.db"
+        command.upgrade(self._config(f"sqlite+aiosqlite:///{database}"), "head")
+
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={"compare_type": False})
+            assert context.get_current_revision() == "0005"
+            diffs = compare_metadata(context, Base.metadata)
+        engine.dispose()
+        # The HNSW index only exists on PostgreSQL
+        assert [d for d in diffs if d[1].name != "ix_products_embedding_hnsw"] == []
+
+    def test_downgrade_to_base(self, tmp_path):
+        """Test that every migration can be reverted."""
+        from alembic import command
+        from sqlalchemy import create_engine, inspect
+
+        database = tmp_path / "migrated.db"
+        config = self._config(f"sqlite+aiosqlite:///{database}")
+        command.upgrade(config, "head")
+        command.downgrade(config, "base")
+
+        engine = create_engine(f"sqlite:///{database}")
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+        engine.dispose()
+
+    def test_fixes_rows_that_break_new_constraints(self, tmp_path):
+        """Test that 0004 removes duplicate wishlist rows and extra default addresses before constraining them."""
+        from uuid import uuid4
+        from alembic import command
+        from sqlalchemy import create_engine, text
+
+        database = tmp_path / "migrated.db"
+        config = self._config(f"sqlite+aiosqlite:///{database}")
+        command.upgrade(config, "0003")
+
+        user = uuid4().hex
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (:id, 'a@b.c', 'x')"), {"id": user})
+            connection.execute(text("INSERT INTO products (id, name, price, stock_quantity) VALUES (1, 'Honey', 5, -2)"))
+            for created_at in ("2024-01-01", "2024-02-01"):
+                connection.execute(
+                    text("INSERT INTO wishlists (id, user_id, product_id, created_at) VALUES (:id, :user, 1, :at)"),
+                    {"id": uuid4().hex, "user": user, "at": created_at},
+                )
+                connection.execute(
+                    text(
+                        "INSERT INTO addresses (id, user_id, full_name, phone, address_line1, city, state, pincode,"
+                        " is_default, created_at) VALUES (:id, :user, 'A', '1', 'L', 'C', 'S', 'P', 1, :at)"
+                    ),
+                    {"id": uuid4().hex, "user": user, "at": created_at},
+                )
+
+        command.upgrade(config, "head")
+
+        with engine.connect() as connection:
+            assert connection.scalar(text("SELECT created_at FROM wishlists")) == "2024-01-01"
+            assert connection.execute(text(
+                "SELECT created_at, is_default FROM addresses ORDER BY created_at"
+            )).all() == [("2024-01-01", 0), ("2024-02-01", 1)]
+            assert connection.scalar(text("SELECT stock_quantity FROM products")) == 0
+        engine.dispose()
+
+    def test_upgrades_a_baseline_database(self, tmp_path):
+        """Test that a database built before the series gets its rating aggregates from the existing reviews."""
+        from uuid import uuid4
+        from alembic import command
+        from sqlalchemy import create_engine, text
+
+        database = tmp_path / "migrated.db"
+        config = self._config(f"sqlite+aiosqlite:///{database}")
+        command.upgrade(config, "0001")
+
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO products (id, name, price, stock_quantity) VALUES (1, 'Honey', 5, 3)"))
+            for number, rating in enumerate((5, 5, 2)):
+                user = uuid4().hex
+                connection.execute(
+                    text("INSERT INTO users (id, email, hashed_password) VALUES (:id, :email, 'x')"),
+                    {"id": user, "email": f"user{number}@b.c"},
+                )
+                connection.execute(
+                    text("INSERT INTO reviews (id, user_id, product_id, rating) VALUES (:id, :user, 1, :rating)"),
+                    {"id": uuid4().hex, "user": user, "rating": rating},
+                )
+
+        command.upgrade(config, "head")
+
+        with engine.connect() as connection:
+            assert connection.execute(text(
+                "SELECT rating_count, rating_sum, rating_2_count, rating_5_count, rating_1_count FROM products"
+            )).one() == (3, 12, 1, 2, 0)
+        engine.dispose()
+
+    def test_keeps_latest_review_per_user(self, tmp_path):
+        """Test that 0005 keeps each user's latest review of a product and recounts the ratings."""
+        from uuid import uuid4
+        from alembic import command
+        from sqlalchemy import create_engine, text
+
+        database = tmp_path / "migrated.db"
+        config = self._config(f"sqlite+aiosqlite:///{database}")
+        command.upgrade(config, "0004")
+
+        user = uuid4().hex
+        engine = create_engine(f"sqlite:///{database}")
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (:id, 'a@b.c', 'x')"), {"id": user})
+            connection.execute(text(
+                "INSERT INTO products (id, name, price, stock_quantity, rating_count, rating_sum, rating_2_count,"
+                " rating_5_count) VALUES (1, 'Honey', 5, 3, 2, 7, 1, 1)"
+            ))
+            for rating, created_at in ((2, "2024-01-01"), (5, "2024-02-01")):
+                connection.execute(
+                    text("INSERT INTO reviews (id, user_id, product_id, rating, created_at) VALUES (:id, :user, 1, :rating, :at)"),
+                    {"id": uuid4().hex, "user": user, "rating": rating, "at": created_at},
+                )
+
+        command.upgrade(config, "head")
+
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT rating FROM reviews")).scalars().all() == [5]
+            assert connection.execute(text(
+                "SELECT rating_count, rating_sum, rating_2_count, rating_5_count FROM products"
+            )).one() == (1, 5, 0, 1)
+        engine.dispose()
@@ -32,7 +32,55 @@ class TestCreateOrder:
         data = response.json()
         assert "id" in data
         assert data["total_amount"] == test_product["price"] * 2
-        assert data["status"] == "Processing"
+        assert data["status"] == "pending"
+
+    async def test_confirmation_email_greets_customer_by_name(
+        self, async_client: AsyncClient, auth_headers: dict, test_user: dict, test_product: dict, monkeypatch
+    ):
+        """Test that the order confirmation uses the customer's name, not the fallback."""
+        from app.services.email import email_service
+        from app.services.task_queue import get_task_queue
+
+        monkeypatch.setattr(email_service, "is_configured", lambda: True)
+
+        response = await async_client.post(
+            "/api/v1/orders/",
+            headers=auth_headers,
+            json={"items": [{"product_id": test_product["id"], "quantity": 1}]}
+        )
+        assert response.status_code == 200
+        assert [
+            (to_email, template, context["customer_name"])
+            for name, (to_email, template, context) in get_task_queue().sent if name == "email.send"
+        ] == [(test_user["email"], "order_confirmation", test_user["full_name"])]
+
+    async def test_confirmation_email_sent_inline_without_broker(
+        self, async_client: AsyncClient, auth_headers: dict, test_user: dict, test_product: dict, monkeypatch
+    ):
+        """Test that the email is still sent, off the event loop, when the task can't be queued."""
+        import threading
+        from app.services.email import email_service
+        from app.services.task_queue import TaskQueue, set_task_queue
+
+        class DownQueue(TaskQueue):
+            async def enqueue(self, name, *args):
+                raise ConnectionError("broker down")
+
+        sent = []
+        set_task_queue(DownQueue())
+        monkeypatch.setattr(email_service, "is_configured", lambda: True)
+        monkeypatch.setattr(
+            email_service, "send_email",
+            lambda **kwargs: sent.append((kwargs["to_email"], threading.current_thread() is threading.main_thread()))
+        )
+
+        response = await async_client.post(
+            "/api/v1/orders/",
+            headers=auth_headers,
+            json={"items": [{"product_id": test_product["id"], "quantity": 1}]}
+        )
+        assert response.status_code == 200
+        assert sent == [(test_user["email"], False)]
 
     async def test_create_order_multiple_products(
         self, async_client: AsyncClient, auth_headers: dict, test_db
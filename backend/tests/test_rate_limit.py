@@ -0,0 +1,146 @@
+"""
+Rate limiting tests.
+Tests for token buckets, rule matching and the 429 response.
+"""
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+
+pytestmark = pytest.mark.rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_app(**kwargs):
+    """A tiny app behind the middleware, so limits are small and explicit."""
+    from fastapi import FastAPI
+    from app.core.middleware import RateLimitMiddleware
+
+    kwargs.setdefault("rules", {"GET /limited": "2/minute", "GET /api/*": "3/minute"})
+    kwargs.setdefault("default_ip", "5/minute")
+    kwargs.setdefault("default_user", "4/minute")
+    kwargs.setdefault("exempt_paths", "/health")
+    kwargs.setdefault("enabled", True)
+
+    app = FastAPI()
+    for path in ("/limited", "/api/items", "/other", "/health", "/health/live"):
+        app.add_api_route(path, lambda: {"ok": True}, methods=["GET"])
+    app.add_middleware(RateLimitMiddleware, **kwargs)
+    return app
+
+
+async def hit(app, path: str, times: int, client=("10.0.0.1", 1), headers=None) -> list:
+    async with AsyncClient(transport=ASGITransport(app=app, client=client), base_url="http://test") as c:
+        return [await c.get(path, headers=headers) for _ in range(times)]
+
+
+@pytest.fixture
+def limiter():
+    from app.services.rate_limit import InMemoryRateLimiter, set_rate_limiter
+
+    limiter = InMemoryRateLimiter(clock=FakeClock())
+    set_rate_limiter(limiter)
+    yield limiter
+    set_rate_limiter(None)
+
+
+class TestTokenBucket:
+    """Tests for the in-memory token bucket."""
+
+    def test_parse_rate(self):
+        """Test the rate notation."""
+        from app.services.rate_limit import Rate, parse_rate
+
+        assert parse_rate("10/minute") == Rate(10, 60)
+        assert parse_rate("5/30") == Rate(5, 30)
+        with pytest.raises(ValueError):
+            parse_rate("lots/minute")
+
+    async def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and refills at the average rate."""
+        from app.services.rate_limit import InMemoryRateLimiter, parse_rate
+
+        clock = FakeClock()
+        limiter = InMemoryRateLimiter(clock=clock)
+        rate = parse_rate("3/minute")
+
+        results = [await limiter.hit("k", rate) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[2].remaining == 0
+        assert results[3].retry_after == pytest.approx(20.0)
+
+        clock.now = 20
+        assert (await limiter.hit("k", rate)).allowed
+        assert not (await limiter.hit("k", rate)).allowed
+
+
+class TestRateLimitMiddleware:
+    """Tests for the middleware in front of routes."""
+
+    async def test_route_rule_returns_429_with_retry_after(self, limiter):
+        """Test that an exact route rule is enforced with Retry-After."""
+        responses = await hit(make_app(), "/limited", 3)
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["x-ratelimit-limit"] == "2"
+        assert responses[0].headers["x-ratelimit-remaining"] == "1"
+        assert responses[2].headers["retry-after"] == "30"
+
+    async def test_prefix_rule(self, limiter):
+        """Test that a trailing * rule matches every path under it."""
+        responses = await hit(make_app(), "/api/items", 4)
+        assert [r.status_code for r in responses] == [200, 200, 200, 429]
+
+    async def test_clients_are_limited_independently(self, limiter):
+        """Test that one noisy IP does not use up another client's bucket."""
+        app = make_app()
+        await hit(app, "/limited", 3, client=("10.0.0.1", 1))
+        responses = await hit(app, "/limited", 1, client=("10.0.0.2", 1))
+        assert responses[0].status_code == 200
+
+    async def test_signed_in_users_are_keyed_by_user(self, limiter):
+        """Test that users get the user default, regardless of their IP."""
+        from app.core import security
+
+        headers = {"Authorization": f"Bearer {security.create_access_token({'sub': 'bee@example.com'})}"}
+        app = make_app()
+        await hit(app, "/other", 2, client=("10.0.0.1", 1), headers=headers)
+        responses = await hit(app, "/other", 3, client=("10.0.0.2", 1), headers=headers)
+        assert [r.status_code for r in responses] == [200, 200, 429]
+
+    async def test_exempt_paths(self, limiter):
+        """Test that health checks are never limited."""
+        app = make_app()
+        assert all(r.status_code == 200 for r in await hit(app, "/health", 10))
+        assert all(r.status_code == 200 for r in await hit(app, "/health/live", 10))
+
+    async def test_backend_failure_allows_requests(self):
+        """Test that an unavailable limiter backend does not take the API down."""
+        from app.services.rate_limit import RateLimiter, set_rate_limiter
+
+        class BrokenLimiter(RateLimiter):
+            async def hit(self, key, rate, cost=1):
+                raise ConnectionError("redis down")
+
+        set_rate_limiter(BrokenLimiter())
+        try:
+            responses = await hit(make_app(), "/limited", 5)
+        finally:
+            set_rate_limiter(None)
+        assert all(r.status_code == 200 for r in responses)
+
+    async def test_login_is_limited(self, async_client: AsyncClient):
+        """Test that the real app protects the token endpoint."""
+        statuses = []
+        for _ in range(11):
+            response = await async_client.post(
+                "/api/v1/auth/token",
+                data={"username": "nobody@example.com", "password": "wrong"}
+            )
+            statuses.append(response.status_code)
+        assert statuses == [401] * 10 + [429]
@@ -0,0 +1,285 @@
+"""
+Return endpoint tests.
+Tests for requesting, approving, rejecting and processing returns.
+"""
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.returns
+
+
+@pytest_asyncio.fixture
+async def delivered_order(test_db, test_user: dict, test_product: dict) -> dict:
+    """
+    Create a delivered order for the test user with two units of the test product.
+    The product stock is left as if the order had been placed (100 - 2).
+    """
+    from app.models.all import Order, OrderItem, Product
+    from sqlalchemy.future import select
+
+    result = await test_db.execute(select(Product).where(Product.id == test_product["id"]))
+    product = result.scalars().first()
+    product.stock_quantity -= 2
+
+    order = Order(
+        user_id=test_user["id"],
+        total_amount=test_product["price"] * 2,
+        status="delivered"
+    )
+    test_db.add(order)
+    await test_db.flush()
+    test_db.add(OrderItem(
+        order_id=order.id,
+        product_id=test_product["id"],
+        quantity=2,
+        price_at_purchase=test_product["price"]
+    ))
+    await test_db.commit()
+    return {"id": order.id}
+
+
+class TestRequestReturn:
+    """Tests for customers requesting returns."""
+
+    async def test_request_return_for_delivered_order(
+        self, async_client: AsyncClient, auth_headers: dict, delivered_order: dict
+    ):
+        """Test requesting a return for a delivered order."""
+        response = await async_client.post(
+            "/api/v1/returns/",
+            headers=auth_headers,
+            json={"order_id": str(delivered_order["id"]), "reason": "Jar arrived cracked"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "pending"
+        assert data["refund_amount"] is None
+
+    async def test_request_return_twice(
+        self, async_client: AsyncClient, auth_headers: dict, delivered_order: dict
+    ):
+        """Test that only one return can be open per order."""
+        payload = {"order_id": str(delivered_order["id"]), "reason": "Wrong flavour"}
+        await async_client.post("/api/v1/returns/", headers=auth_headers, json=payload)
+        response = await async_client.post("/api/v1/returns/", headers=auth_headers, json=payload)
+        assert response.status_code == 400
+
+    async def test_request_return_for_undelivered_order(
+        self, async_client: AsyncClient, auth_headers: dict, delivered_order: dict, test_db
+    ):
+        """Test that orders which have not been delivered cannot be returned."""
+        from app.models.all import Order
+        from sqlalchemy.future import select
+
+        result = await test_db.execute(select(Order).where(Order.id == delivered_order["id"]))
+        result.scalars().first().status = "pending"
+        await test_db.commit()
+
+        response = await async_client.post(
+            "/api/v1/returns/",
+            headers=auth_headers,
+            json={"order_id": str(delivered_order["id"]), "reason": "Changed my mind"}
+        )
+        assert response.status_code == 400
+
+    async def test_request_return_without_auth(self, async_client: AsyncClient, delivered_order: dict):
+        """Test requesting a return without authentication."""
+        response = await async_client.post(
+            "/api/v1/returns/",
+            json={"order_id": str(delivered_order["id"]), "reason": "No auth"}
+        )
+        assert response.status_code == 401
+
+
+class TestProcessReturns:
+    """Tests for the admin approve/reject/process flow."""
+
+    async def test_approve_and_process_restocks_and_refunds(
+        self,
+        async_client: AsyncClient,
+        auth_headers: dict,
+        admin_headers: dict,
+        delivered_order: dict,
+        test_product: dict,
+        test_db
+    ):
+        """Test that processing a return restocks items and records the refund."""
+        from app.models.all import Order, Product
+        from sqlalchemy.future import select
+
+        response = await async_client.post(
+            "/api/v1/returns/",
+            headers=auth_headers,
+            json={"order_id": str(delivered_order["id"]), "reason": "Crystallised"}
+        )
+        return_id = response.json()["id"]
+
+        response = await async_client.patch(f"/api/v1/returns/{return_id}/approve", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "approved"
+
+        response = await async_client.post(
+            "/api/v1/returns/process",
+            headers=admin_headers,
+            json={"return_ids": [return_id]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]["status"] == "processed"
+        assert data[0]["refund_amount"] == round(test_product["price"] * 2, 2)
+
+        result = await test_db.execute(select(Product).where(Product.id == test_product["id"]))
+        product = result.scalars().first()
+        await test_db.refresh(product)
+        assert product.stock_quantity == 100
+
+        result = await test_db.execute(select(Order).where(Order.id == delivered_order["id"]))
+        assert result.scalars().first().status == "returned"
+
+    async def test_process_claims_each_return_once(
+        self, async_client: AsyncClient, admin_headers: dict, delivered_order: dict, test_product: dict, test_db
+    ):
+        """Test that a return processed twice is restocked and refunded only by the first batch."""
+        from app.models.all import Product, Return
+        from app.services import returns as returns_service
+        from sqlalchemy.future import select
+
+        ret = Return(order_id=delivered_order["id"], reason="Cracked lid", status="approved")
+        test_db.add(ret)
+        await test_db.commit()
+
+        first = await returns_service.process_returns(test_db, [ret.id])
+        # A second batch that had already read the return as approved
+        second = await returns_service.process_returns(test_db, [ret.id])
+        await test_db.commit()
+
+        assert [r.id for r in first] == [ret.id]
+        assert second == []
+        result = await test_db.execute(select(Product).where(Product.id == test_product["id"]))
+        product = result.scalars().first()
+        await test_db.refresh(product)
+        assert product.stock_quantity == 100
+
+        response = await async_client.post(
+            "/api/v1/returns/process", headers=admin_headers, json={"return_ids": [str(ret.id)]}
+        )
+        assert response.status_code == 400
+
+    async def test_order_cannot_be_marked_returned_manually(
+        self, async_client: AsyncClient, admin_headers: dict, delivered_order: dict, test_db
+    ):
+        """Test that the order status endpoint refuses "returned", which skips restocking and refunds."""
+        from app.models.all import Order
+        from sqlalchemy.future import select
+
+        response = await async_client.patch(
+            f"/api/v1/orders/{delivered_order['id']}/status",
+            headers=admin_headers,
+            params={"status": "returned"}
+        )
+        assert response.status_code == 400
+
+        result = await test_db.execute(select(Order).where(Order.id == delivered_order["id"]))
+        assert result.scalars().first().status == "delivered"
+
+    async def test_process_unapproved_return(
+        self, async_client: AsyncClient, auth_headers: dict, admin_headers: dict, delivered_order: dict
+    ):
+        """Test that pending returns cannot be processed."""
+        response = await async_client.post(
+            "/api/v1/returns/",
+            headers=auth_headers,
+            json={"order_id": str(delivered_order["id"]), "reason": "Too sweet"}
+        )
+        response = await async_client.post(
+            "/api/v1/returns/process",
+            headers=admin_headers,
+            json={"return_ids": [response.json()["id"]]}
+        )
+        assert response.status_code == 400
+
+    async def test_reject_return(
+        self, async_client: AsyncClient, auth_headers: dict, admin_headers: dict, delivered_order: dict
+    ):
+        """Test rejecting a pending return."""
+        response = await async_client.post(
+            "/api/v1/returns/",
+            headers=auth_headers,
+            json={"order_id": str(delivered_order["id"]), "reason": "Opened jar"}
+        )
+        response = await async_client.patch(
+            f"/api/v1/returns/{response.json()['id']}/reject", headers=admin_headers
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "rejected"
+
+    async def test_process_as_regular_user(
+        self, async_client: AsyncClient, auth_headers: dict, delivered_order: dict
+    ):
+        """Test that regular users cannot process returns."""
+        import uuid
+        response = await async_client.post(
+            "/api/v1/returns/process",
+            headers=auth_headers,
+            json={"return_ids": [str(uuid.uuid4())]}
+        )
+        assert response.status_code == 403
+
+
+class TestReturnQueue:
+    """Tests for the admin returns queue."""
+
+    async def test_queue_pages_without_duplicates(
+        self, async_client: AsyncClient, admin_headers: dict, test_user: dict, test_db
+    ):
+        """Test walking the queue with cursors visits every return exactly once."""
+        from app.models.all import Order, Return
+        from datetime import datetime
+
+        # Same timestamp for every return so the id tie-breaker is exercised
+        requested_at = datetime.utcnow()
+        for i in range(5):
+            order = Order(user_id=test_user["id"], total_amount=10.0, status="delivered")
+            test_db.add(order)
+            await test_db.flush()
+            test_db.add(Return(
+                order_id=order.id,
+                reason=f"Reason {i}",
+                status="pending",
+                requested_at=requested_at
+            ))
+        await test_db.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get(
+                "/api/v1/returns/queue", headers=admin_headers, params=params
+            )
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page["items"]) <= 2
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    async def test_queue_invalid_cursor(self, async_client: AsyncClient, admin_headers: dict):
+        """Test that a malformed cursor is rejected."""
+        response = await async_client.get(
+            "/api/v1/returns/queue", headers=admin_headers, params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+
+    async def test_queue_as_regular_user(self, async_client: AsyncClient, auth_headers: dict):
+        """Test that regular users cannot view the returns queue."""
+        response = await async_client.get("/api/v1/returns/queue", headers=auth_headers)
+        assert response.status_code == 403
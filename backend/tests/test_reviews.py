@@ -0,0 +1,181 @@
+"""
+Review endpoint tests.
+Tests for creating, listing and deleting reviews and the rating aggregates.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.reviews
+
+
+class TestCreateReview:
+    """Tests for creating reviews."""
+
+    async def test_create_review_updates_aggregates(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that a new review is reflected in the product listing."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 4, "comment": "Lovely and floral"}
+        )
+        assert response.status_code == 200
+        assert response.json()["rating"] == 4
+
+        response = await async_client.get("/api/v1/products/")
+        product = next(p for p in response.json() if p["id"] == test_product["id"])
+        assert product["rating_count"] == 1
+        assert product["rating_average"] == 4.0
+
+    async def test_create_review_twice(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that a user can only review a product once."""
+        payload = {"product_id": test_product["id"], "rating": 5}
+        await async_client.post("/api/v1/reviews/", headers=auth_headers, json=payload)
+        response = await async_client.post("/api/v1/reviews/", headers=auth_headers, json=payload)
+        assert response.status_code == 409
+
+        summary = await async_client.get(f"/api/v1/reviews/summary/{test_product['id']}")
+        assert summary.json()["rating_count"] == 1
+
+    async def test_review_enforced_by_database(self, test_db, test_user: dict, test_product: dict):
+        """Test that two reviews of one product by one user can't be stored."""
+        from sqlalchemy.exc import IntegrityError
+        from app.models.all import Review
+
+        for rating in (4, 5):
+            test_db.add(Review(user_id=test_user["id"], product_id=test_product["id"], rating=rating))
+        with pytest.raises(IntegrityError):
+            await test_db.commit()
+        await test_db.rollback()
+
+    async def test_create_review_invalid_rating(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test that ratings outside 1-5 are rejected."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 6}
+        )
+        assert response.status_code == 422
+
+    async def test_create_review_nonexistent_product(
+        self, async_client: AsyncClient, auth_headers: dict
+    ):
+        """Test reviewing a product that doesn't exist."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": 99999, "rating": 3}
+        )
+        assert response.status_code == 404
+
+    async def test_create_review_without_auth(self, async_client: AsyncClient, test_product: dict):
+        """Test creating a review without authentication."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            json={"product_id": test_product["id"], "rating": 3}
+        )
+        assert response.status_code == 401
+
+
+class TestRatingAggregates:
+    """Tests for the incrementally maintained rating aggregates."""
+
+    async def test_summary_and_delete(
+        self,
+        async_client: AsyncClient,
+        auth_headers: dict,
+        admin_headers: dict,
+        test_product: dict
+    ):
+        """Test histogram after two reviews and after one is deleted."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 5}
+        )
+        user_review_id = response.json()["id"]
+        await async_client.post(
+            "/api/v1/reviews/",
+            headers=admin_headers,
+            json={"product_id": test_product["id"], "rating": 2}
+        )
+
+        response = await async_client.get(f"/api/v1/reviews/summary/{test_product['id']}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rating_count"] == 2
+        assert data["rating_average"] == 3.5
+        assert data["rating_histogram"] == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}
+
+        response = await async_client.delete(f"/api/v1/reviews/{user_review_id}", headers=auth_headers)
+        assert response.status_code == 200
+
+        response = await async_client.get(f"/api/v1/reviews/summary/{test_product['id']}")
+        data = response.json()
+        assert data["rating_count"] == 1
+        assert data["rating_average"] == 2.0
+        assert data["rating_histogram"]["5"] == 0
+
+    async def test_recompute_matches_incremental(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict, test_db
+    ):
+        """Test that a full recompute agrees with the incremental counters."""
+        from app.models.all import Product
+        from app.services.reviews import recompute_rating_aggregates
+        from sqlalchemy.future import select
+
+        await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 3}
+        )
+        result = await test_db.execute(select(Product).where(Product.id == test_product["id"]))
+        product = result.scalars().first()
+        await test_db.refresh(product)
+        incremental = (product.rating_count, product.rating_sum, product.rating_histogram)
+
+        await recompute_rating_aggregates(test_db)
+        await test_db.commit()
+        await test_db.refresh(product)
+        assert (product.rating_count, product.rating_sum, product.rating_histogram) == incremental
+
+    async def test_delete_other_users_review(
+        self, async_client: AsyncClient, auth_headers: dict, admin_headers: dict, test_product: dict
+    ):
+        """Test that users cannot delete reviews they did not write."""
+        response = await async_client.post(
+            "/api/v1/reviews/",
+            headers=admin_headers,
+            json={"product_id": test_product["id"], "rating": 1}
+        )
+        response = await async_client.delete(
+            f"/api/v1/reviews/{response.json()['id']}", headers=auth_headers
+        )
+        assert response.status_code == 403
+
+
+class TestListReviews:
+    """Tests for listing reviews."""
+
+    async def test_list_reviews_for_product(
+        self, async_client: AsyncClient, auth_headers: dict, test_product: dict
+    ):
+        """Test listing reviews for a product."""
+        await async_client.post(
+            "/api/v1/reviews/",
+            headers=auth_headers,
+            json={"product_id": test_product["id"], "rating": 5, "comment": "Best on toast"}
+        )
+        response = await async_client.get(
+            "/api/v1/reviews/", params={"product_id": test_product["id"]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["comment"] == "Best on toast"
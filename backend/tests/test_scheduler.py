@@ -0,0 +1,252 @@
+"""
+Scheduler tests.
+Tests for schedules, leader election, job timeouts and the scheduled jobs.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+
+pytestmark = pytest.mark.scheduler
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _ts(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def _make_scheduler(clock, store, lease=30.0):
+    from app.services.scheduler import InMemoryLeaderLock, Scheduler
+
+    return Scheduler(lock=InMemoryLeaderLock(store=store, clock=clock), lease=lease, tick=0.01, clock=clock)
+
+
+class TestCron:
+    """Tests for cron expressions."""
+
+    def test_step_and_fixed_fields(self):
+        """Test the next run for a step field and for a monthly schedule."""
+        from app.services.scheduler import Cron
+
+        assert Cron("*/15 * * * *").next_after(_ts(2024, 5, 10, 12, 7, 30)) == _ts(2024, 5, 10, 12, 15)
+        assert Cron("0 7 1 * *").next_after(_ts(2024, 5, 10, 12, 7)) == _ts(2024, 6, 1, 7, 0)
+        assert Cron("0 7 1 * *").next_after(_ts(2024, 12, 1, 7, 0)) == _ts(2025, 1, 1, 7, 0)
+
+    def test_day_or_weekday(self):
+        """Test that a restricted day and weekday match either, as in cron."""
+        from app.services.scheduler import Cron
+
+        # 2024-05-10 is a Friday; the next Monday is the 13th, before the 15th
+        assert Cron("0 0 15 * 1").next_after(_ts(2024, 5, 10)) == _ts(2024, 5, 13)
+        assert Cron("0 0 * * 7").next_after(_ts(2024, 5, 10)) == _ts(2024, 5, 12)
+
+    @pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "a * * * *"])
+    def test_invalid_expressions(self, expression):
+        """Test that malformed expressions are rejected up front."""
+        from app.services.scheduler import Cron
+
+        with pytest.raises(ValueError):
+            Cron(expression)
+
+
+class TestLeaderElection:
+    """Tests for running shared jobs on one process only."""
+
+    @pytest.mark.asyncio
+    async def test_only_leader_runs_shared_jobs(self):
+        """Test that shared jobs run once across processes and per-process jobs everywhere."""
+        from app.services.scheduler import Every, Job
+
+        clock, store = FakeClock(), {}
+        runs = []
+
+        async def record(name):
+            runs.append(name)
+
+        schedulers = [_make_scheduler(clock, store) for _ in range(2)]
+        for scheduler in schedulers:
+            scheduler.add(Job("shared", lambda: record("shared"), Every(60)))
+            scheduler.add(Job("local", lambda: record("local"), Every(60), per_process=True))
+
+        clock.now += 60
+        started = [await scheduler.run_pending() for scheduler in schedulers]
+        await asyncio.sleep(0.01)
+
+        assert started == [["shared", "local"], ["local"]]
+        assert sorted(runs) == ["local", "local", "shared"]
+        assert [s.is_leader for s in schedulers] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_standby_takes_over_after_lease(self):
+        """Test that another process leads once the leader stops renewing."""
+        clock, store = FakeClock(), {}
+        leader, standby = _make_scheduler(clock, store), _make_scheduler(clock, store)
+
+        assert await leader.elect() is True
+        assert await standby.elect() is False
+        clock.now += 31
+        assert leader.is_leader is False
+        assert await standby.elect() is True
+        assert await leader.elect() is False
+
+    @pytest.mark.asyncio
+    async def test_lock_error_means_not_leader(self):
+        """Test that an unreachable lock backend stops shared jobs instead of failing."""
+        from app.services.scheduler import LeaderLock, Scheduler
+
+        class BrokenLock(LeaderLock):
+            async def acquire(self, lease):
+                raise ConnectionError("redis down")
+
+        scheduler = Scheduler(lock=BrokenLock())
+        assert await scheduler.elect() is False
+
+
+class TestJobRuns:
+    """Tests for timeouts, overlap and metrics."""
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_recorded(self):
+        """Test that a job running past its timeout is cancelled and counted."""
+        from app.services.scheduler import Every, Job, scheduler_job_runs_total
+
+        scheduler = _make_scheduler(FakeClock(), {})
+        scheduler.add(Job("slow_test_job", lambda: asyncio.sleep(5), Every(60), timeout=0.01))
+        before = scheduler_job_runs_total.value("slow_test_job", "timeout")
+
+        assert await scheduler.run_job("slow_test_job") == "timeout"
+        assert scheduler_job_runs_total.value("slow_test_job", "timeout") == before + 1
+        assert scheduler.last_status["slow_test_job"] == "timeout"
+
+    @pytest.mark.asyncio
+    async def test_errors_are_contained(self):
+        """Test that a failing job is reported without affecting the scheduler."""
+        from app.services.scheduler import Every, Job
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        scheduler = _make_scheduler(FakeClock(), {})
+        scheduler.add(Job("failing", fail, Every(60)))
+        assert await scheduler.run_job("failing") == "error"
+
+    @pytest.mark.asyncio
+    async def test_job_does_not_overlap_itself(self):
+        """Test that a due job still running from last time is skipped."""
+        from app.services.scheduler import Every, Job
+
+        clock = FakeClock()
+        release = asyncio.Event()
+        scheduler = _make_scheduler(clock, {})
+        scheduler.add(Job("long", release.wait, Every(10)))
+
+        clock.now += 10
+        assert await scheduler.run_pending() == ["long"]
+        clock.now += 10
+        assert await scheduler.run_pending() == []
+        release.set()
+        await asyncio.sleep(0.01)
+        clock.now += 10
+        assert await scheduler.run_pending() == ["long"]
+
+    @pytest.mark.asyncio
+    async def test_jitter_delays_runs(self):
+        """Test that jitter only ever pushes a run later, within its bound."""
+        from app.services.scheduler import Every, Job
+
+        clock = FakeClock()
+        scheduler = _make_scheduler(clock, {})
+        for i in range(20):
+            scheduler.add(Job(f"job{i}", asyncio.sleep, Every(60), jitter=5))
+        offsets = [run - clock.now - 60 for run in scheduler.next_run.values()]
+        assert all(0 <= offset <= 5 for offset in offsets)
+
+    @pytest.mark.asyncio
+    async def test_run_releases_lock_on_cancel(self):
+        """Test that a stopped scheduler gives up leadership right away."""
+        from app.services.scheduler import InMemoryLeaderLock, Scheduler
+
+        store = {}
+        scheduler = Scheduler(lock=InMemoryLeaderLock(store=store), tick=0.01)
+        task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.05)
+        assert scheduler.is_leader
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert store == {}
+        assert not scheduler.is_leader
+        assert await InMemoryLeaderLock(store=store).acquire(30) is True
+
+
+class TestJobs:
+    """Tests for the scheduled jobs."""
+
+    @pytest.mark.asyncio
+    async def test_monthly_report_covers_previous_month(self, test_db, test_product, monkeypatch):
+        """Test the KPIs of the previous month, leaving out other months and cancelled orders."""
+        from datetime import date
+        from app.core.config import settings
+        from app.models.all import Order, OrderItem
+        from app.services.scheduler import send_monthly_report
+
+        def order(total, created_at, status="delivered"):
+            o = Order(total_amount=total, status=status, created_at=created_at)
+            o.items.append(OrderItem(product_id=test_product["id"], quantity=2, price_at_purchase=total / 2))
+            return o
+
+        test_db.add_all([
+            order(40.0, datetime(2024, 4, 3)),
+            order(20.0, datetime(2024, 4, 30, 23)),
+            order(99.0, datetime(2024, 4, 10), status="cancelled"),
+            order(15.0, datetime(2024, 5, 2)),
+        ])
+        await test_db.commit()
+        monkeypatch.setattr(settings, "ADMIN_EMAIL", "")
+
+        report = await send_monthly_report(test_db, today=date(2024, 5, 1))
+
+        assert report["month"] == "April 2024"
+        assert report["total_orders"] == 2
+        assert report["total_revenue"] == 60.0
+        assert report["avg_order_value"] == 30.0
+        assert report["top_products"] == f"- {test_product['name']}: 4 sold"
+
+    async def test_vector_index_refresh_only_rebuilds_when_stale(self, test_db, monkeypatch):
+        """Test that the periodic refresh leaves a current index alone and rebuilds a stale one."""
+        from app.services.index_version import get_index_version
+        from app.services.scheduler import refresh_vector_index
+        from app.services.vector_index import product_index
+
+        await product_index.ensure_loaded(test_db)
+        rebuilds = []
+        original = product_index.load_from_db
+        monkeypatch.setattr(
+            product_index, "load_from_db", lambda *args, **kwargs: rebuilds.append(1) or original(*args, **kwargs)
+        )
+
+        await refresh_vector_index(test_db)
+        assert rebuilds == []
+
+        await get_index_version().bump()
+        await refresh_vector_index(test_db)
+        assert rebuilds == [1]
+        assert product_index.version == await get_index_version().current()
+
+    def test_default_jobs(self):
+        """Test that stock alerts and the report are scheduled and only cache refresh runs per process."""
+        from app.services.scheduler import default_jobs
+
+        jobs = {job.name: job for job in default_jobs()}
+        assert {
+            "low_stock_alerts", "monthly_report", "login_rollup", "refresh_token_purge", "embedding_backfill",
+        } <= set(jobs)
+        assert [name for name, job in jobs.items() if job.per_process] == ["vector_index_refresh"]
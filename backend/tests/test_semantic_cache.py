@@ -0,0 +1,119 @@
+"""
+Semantic cache tests.
+Tests for cache hits, TTL expiry, LRU eviction and single-flight LLM calls.
+"""
+import asyncio
+import pytest
+
+from app.services.embeddings import HashingEmbedder
+from app.services.llm import StubLLM
+from app.services.semantic_cache import InMemorySemanticCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(**kwargs) -> InMemorySemanticCache:
+    kwargs.setdefault("threshold", 0.9)
+    kwargs.setdefault("ttl_seconds", 60)
+    kwargs.setdefault("max_entries", 100)
+    kwargs.setdefault("llm", StubLLM())
+    return InMemorySemanticCache(embedder=HashingEmbedder(dim=256), **kwargs)
+
+
+class TestSemanticCache:
+    """Tests for the in-memory semantic cache."""
+
+    async def test_repeated_question_hits_llm_once(self):
+        """Test that asking the same question twice calls the LLM once."""
+        cache = make_cache()
+        first = await cache.ask("Which honey is best for sore throat?")
+        second = await cache.ask("which honey is best for sore throat?")
+        assert first == second
+        assert cache.llm.calls == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    async def test_concurrent_identical_questions_share_one_call(self):
+        """Test that a burst of the same question results in a single LLM request."""
+        cache = make_cache(llm=StubLLM(delay=0.05))
+        answers = await asyncio.gather(*[
+            cache.ask("which honey is best for sore throat") for _ in range(5)
+        ])
+        assert len(set(answers)) == 1
+        assert cache.llm.calls == 1
+
+    async def test_streamed_miss_releases_waiting_requests(self):
+        """Test that requests for a question being streamed wait for that answer."""
+        cache = make_cache()
+        answer, flight = await cache.begin("can bees make honey in winter")
+        assert answer is None and flight is not None
+
+        waiting = asyncio.ensure_future(cache.begin("Can bees make honey in  winter"))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        await cache.finish(flight, "They live on stores.")
+        assert await waiting == ("They live on stores.", None)
+        assert await cache.lookup("can bees make honey in winter") == "They live on stores."
+
+    async def test_abandoned_stream_hands_over_the_question(self):
+        """Test that a waiting request answers the question itself when the stream gives up."""
+        cache = make_cache()
+        _, flight = await cache.begin("what is creamed honey")
+        waiting = asyncio.ensure_future(cache.begin("what is creamed honey"))
+        await asyncio.sleep(0)
+
+        await cache.finish(flight, None)
+        answer, second_flight = await waiting
+        assert answer is None and second_flight is not None
+        await cache.finish(second_flight, "Honey crystallised on purpose.")
+        assert await cache.ask("what is creamed honey") == "Honey crystallised on purpose."
+        assert cache.llm.calls == 0
+
+    async def test_unrelated_question_misses(self):
+        """Test that a dissimilar question goes to the LLM."""
+        cache = make_cache()
+        await cache.ask("which honey is best for sore throat")
+        await cache.ask("how do I store raw comb honey")
+        assert cache.llm.calls == 2
+        assert cache.stats()["misses"] == 2
+
+    async def test_entries_expire_after_ttl(self):
+        """Test that an expired entry is not served."""
+        clock = FakeClock()
+        cache = make_cache(clock=clock, ttl_seconds=10)
+        await cache.ask("is manuka honey safe for kids")
+        clock.now = 11
+        await cache.ask("is manuka honey safe for kids")
+        assert cache.llm.calls == 2
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache never grows past max_entries and evicts the LRU entry."""
+        cache = make_cache(max_entries=2)
+        await cache.ask("question about acacia honey")
+        await cache.ask("question about buckwheat honey")
+        # Touch acacia so buckwheat becomes least recently used
+        await cache.ask("question about acacia honey")
+        await cache.ask("question about wildflower honey")
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+
+        calls = cache.llm.calls
+        await cache.ask("question about acacia honey")
+        assert cache.llm.calls == calls
+        await cache.ask("question about buckwheat honey")
+        assert cache.llm.calls == calls + 1
+
+    async def test_lookup_and_store(self):
+        """Test the lower level lookup/store API."""
+        cache = make_cache()
+        assert await cache.lookup("best honey for tea") is None
+        await cache.store("best honey for tea", "Acacia, it is mild.")
+        assert await cache.lookup("Best honey for tea") == "Acacia, it is mild."
+        assert cache.llm.calls == 0
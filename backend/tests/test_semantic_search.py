@@ -0,0 +1,172 @@
+"""
+Semantic search tests.
+Tests for the embedding pipeline and the /products/semantic-search endpoint.
+"""
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.products
+
+
+@pytest_asyncio.fixture
+async def local_embedder():
+    """Use the deterministic local embedder instead of the OpenAI API."""
+    from app.services import embeddings
+
+    embedder = embeddings.HashingEmbedder()
+    embeddings.set_embedder(embedder)
+    yield embedder
+    embeddings.set_embedder(None)
+
+
+@pytest_asyncio.fixture
+async def honey_catalog(test_db) -> dict:
+    """Create a few distinct products and return their ids by name."""
+    from app.models.all import Product
+
+    products = [
+        Product(name="Manuka Honey", category="Premium", price=45.0,
+                description="New Zealand manuka honey, soothing for a sore throat"),
+        Product(name="Buckwheat Honey", category="Dark", price=15.0,
+                description="Dark robust honey rich in antioxidants"),
+        Product(name="Acacia Honey", category="Standard", price=18.5,
+                description="Clear mild honey with vanilla notes"),
+    ]
+    test_db.add_all(products)
+    await test_db.commit()
+    return {p.name: p.id for p in products}
+
+
+class TestEmbeddingPipeline:
+    """Tests for batched product embedding."""
+
+    async def test_local_embedder_is_deterministic(self, local_embedder):
+        """Test the local embedder returns identical unit vectors for identical text."""
+        first, second = await local_embedder.embed(["wildflower honey", "wildflower honey"])
+        assert first == second
+        assert len(first) == local_embedder.dim
+        assert abs(sum(v * v for v in first) - 1.0) < 1e-9
+
+    async def test_embed_products_in_batches(self, test_db, honey_catalog, local_embedder):
+        """Test that every product without an embedding gets one, across several batches."""
+        from app.models.all import Product
+        from app.services.embeddings import embed_products
+        from sqlalchemy.future import select
+
+        count = await embed_products(test_db, batch_size=2)
+        assert count == 3
+
+        result = await test_db.execute(select(Product.id).where(Product.embedding.is_(None)))
+        assert result.all() == []
+
+        # Nothing left to do on a second run
+        assert await embed_products(test_db, batch_size=2) == 0
+
+    async def test_update_invalidates_embedding(
+        self, async_client: AsyncClient, admin_headers: dict, test_db, honey_catalog, local_embedder
+    ):
+        """Test that changing a product's text clears its embedding."""
+        from app.models.all import Product
+        from app.services.embeddings import embed_products
+        from sqlalchemy.future import select
+
+        await embed_products(test_db)
+        product_id = honey_catalog["Acacia Honey"]
+        response = await async_client.put(
+            f"/api/v1/products/{product_id}",
+            headers=admin_headers,
+            json={"name": "Acacia Honey", "price": 18.5, "description": "Now with lavender"}
+        )
+        assert response.status_code == 200
+
+        result = await test_db.execute(select(Product.embedding).where(Product.id == product_id))
+        assert result.scalar() is None
+
+    async def test_writes_queue_re_embedding(
+        self, async_client: AsyncClient, admin_headers: dict, honey_catalog
+    ):
+        """Test that new products and text edits are sent to the AI worker, other edits are not."""
+        from app.services.task_queue import get_task_queue
+
+        response = await async_client.post(
+            "/api/v1/products/", headers=admin_headers,
+            json={"name": "Clover Honey", "price": 9.0, "description": "Light and sweet"}
+        )
+        new_id = response.json()["id"]
+        product_id = honey_catalog["Acacia Honey"]
+        for description in ("Clear mild honey with vanilla notes", "Now with lavender"):
+            await async_client.put(
+                f"/api/v1/products/{product_id}", headers=admin_headers,
+                json={"name": "Acacia Honey", "price": 18.5, "category": "Standard", "description": description}
+            )
+
+        assert list(get_task_queue().sent) == [
+            ("ai.embed_products", ([new_id],)),
+            ("ai.embed_products", ([product_id],)),
+        ]
+
+    async def test_backfill_job_queues_missing_embeddings(self, test_db, honey_catalog, local_embedder):
+        """Test that the scheduled backfill only queues work when some product has no embedding."""
+        from app.services.embeddings import embed_products
+        from app.services.scheduler import enqueue_missing_embeddings
+        from app.services.task_queue import get_task_queue
+
+        assert await enqueue_missing_embeddings(test_db) is True
+        await embed_products(test_db)
+        assert await enqueue_missing_embeddings(test_db) is False
+        assert list(get_task_queue().sent) == [("ai.embed_products", ())]
+
+
+class TestSemanticSearch:
+    """Tests for the semantic search endpoint."""
+
+    async def test_semantic_search_ranks_best_match_first(
+        self, async_client: AsyncClient, test_db, honey_catalog, local_embedder
+    ):
+        """Test that the closest product is returned first."""
+        from app.services.embeddings import embed_products
+
+        await embed_products(test_db)
+        response = await async_client.get(
+            "/api/v1/products/semantic-search", params={"q": "honey for a sore throat", "limit": 2}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert data[0]["id"] == honey_catalog["Manuka Honey"]
+
+    async def test_semantic_search_requires_query(self, async_client: AsyncClient, local_embedder):
+        """Test that an empty query is rejected."""
+        response = await async_client.get("/api/v1/products/semantic-search", params={"q": ""})
+        assert response.status_code == 422
+
+    def test_hnsw_index_ddl_on_postgresql(self):
+        """Test the HNSW index is emitted for PostgreSQL with cosine ops."""
+        from app.models.all import Product
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateIndex
+
+        index = next(i for i in Product.__table__.indexes if i.name == "ix_products_embedding_hnsw")
+        ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        assert "USING hnsw" in ddl
+        assert "vector_cosine_ops" in ddl
+
+    def test_nearest_products_sql_on_postgresql(self):
+        """Test the PostgreSQL search orders by cosine distance to a pgvector-encoded query."""
+        from app.core.config import settings
+        from app.services.embeddings import nearest_products_query
+        from sqlalchemy.dialects import postgresql
+
+        dialect = postgresql.dialect()
+        query_vector = [0.5] * settings.EMBEDDING_DIM
+        compiled = nearest_products_query(query_vector, limit=3).compile(dialect=dialect)
+        sql = " ".join(str(compiled).split())
+        assert "WHERE products.embedding IS NOT NULL AND products.is_active = true" in sql
+        assert "ORDER BY products.embedding <=> %(embedding_1)s" in sql
+        assert "LIMIT %(param_1)s" in sql
+
+        # The query vector is bound through pgvector's Vector type, in its text form
+        bind_type = compiled.binds["embedding_1"].type.dialect_impl(dialect)
+        assert bind_type.bind_processor(dialect)(query_vector) == "[" + ",".join(["0.5"] * settings.EMBEDDING_DIM) + "]"
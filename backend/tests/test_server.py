@@ -0,0 +1,71 @@
+"""
+Production server tests.
+Tests for worker sizing, the gunicorn options and graceful shutdown.
+"""
+import pytest
+
+
+pytestmark = pytest.mark.server
+
+
+class TestWorkerCount:
+    """Tests for sizing the worker pool."""
+
+    def test_configured_count_wins(self):
+        """Test that WEB_CONCURRENCY overrides the core count."""
+        from app.server import worker_count
+
+        assert worker_count(configured=3, cpus=16) == 3
+
+    def test_one_worker_per_core(self):
+        """Test that the automatic count follows the cores."""
+        from app.server import worker_count
+
+        assert worker_count(configured=0, cpus=4) == 4
+
+    def test_automatic_count_is_capped(self):
+        """Test that big machines don't get a pool per core without limit."""
+        from app.core.config import settings
+        from app.server import worker_count
+
+        assert worker_count(configured=0, cpus=256) == settings.SERVER_MAX_WORKERS
+
+
+class TestGunicornOptions:
+    """Tests for the options handed to gunicorn."""
+
+    def test_options_from_settings(self):
+        """Test that workers, preload and the shutdown timeout come from settings."""
+        from app.core.config import settings
+        from app.server import gunicorn_options, post_fork, when_ready
+
+        options = gunicorn_options(workers=2, bind="127.0.0.1:9000")
+        assert options["workers"] == 2
+        assert options["bind"] == "127.0.0.1:9000"
+        assert options["worker_class"] == "app.server.Worker"
+        assert options["preload_app"] == settings.SERVER_PRELOAD
+        assert options["graceful_timeout"] == settings.SERVER_GRACEFUL_TIMEOUT
+        assert options["post_fork"] is post_fork
+        assert options["when_ready"] is when_ready
+
+    def test_options_accepted_by_gunicorn(self):
+        """Test that gunicorn knows every option the launcher sets."""
+        from gunicorn.config import Config
+        from app.server import gunicorn_options
+
+        config = Config()
+        for key, value in gunicorn_options(workers=2).items():
+            config.set(key, value)
+        assert config.worker_class.__name__ == "Worker"
+        assert config.worker_class.CONFIG_KWARGS["loop"] == "uvloop"
+        assert config.worker_class.CONFIG_KWARGS["http"] == "httptools"
+
+
+class TestShutdown:
+    """Tests for what a worker does before it exits."""
+
+    def test_shutdown_drains_in_order(self):
+        """Test that login events are flushed before the pools they need are closed."""
+        from app.core.lifespan import resources
+
+        assert resources.closers == ["login_history", "redis", "database"]
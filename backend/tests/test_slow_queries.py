@@ -0,0 +1,102 @@
+"""
+Slow query log tests.
+Tests for SQL fingerprinting, per-fingerprint aggregates and the admin endpoint.
+"""
+import pytest
+from httpx import AsyncClient
+
+
+pytestmark = pytest.mark.slow_queries
+
+
+class TestFingerprint:
+    """Tests for statement normalisation."""
+
+    @pytest.mark.parametrize("a,b", [
+        ("SELECT * FROM products WHERE id = 1", "select *  from products\nwhere id = 42"),
+        ("SELECT * FROM users WHERE email = 'a@x.com'", "SELECT * FROM users WHERE email = 'o''neil@x.com'"),
+        ("SELECT * FROM products WHERE id IN ($1, $2, $3)", "SELECT * FROM products WHERE id IN ($1)"),
+        ("SELECT * FROM products WHERE id IN (?, ?)", "SELECT * FROM products WHERE id IN (%(id_1)s)"),
+        ("INSERT INTO t (a) VALUES (?), (?), (?)", "INSERT INTO t (a) VALUES (?)"),
+    ])
+    def test_equivalent_statements_share_a_fingerprint(self, a: str, b: str):
+        """Test that statements differing only in values normalise to the same text."""
+        from app.core.slow_queries import fingerprint
+
+        assert fingerprint(a) == fingerprint(b)
+
+    def test_identifiers_with_digits_are_kept(self):
+        """Test that column names like rating_5_count are not mistaken for literals."""
+        from app.core.slow_queries import fingerprint
+
+        assert "rating_5_count" in fingerprint("SELECT products.rating_5_count FROM products")
+        assert "::text" in fingerprint("SELECT $1::text")
+
+
+class TestSlowQueryLog:
+    """Tests for aggregation and sampling."""
+
+    def test_aggregates_and_samples(self):
+        """Test per-fingerprint totals and that only slow runs are sampled."""
+        from app.core.slow_queries import SlowQueryLog
+
+        log = SlowQueryLog(threshold_ms=100, log_parameters=True)
+        log.record(None, "SELECT * FROM products WHERE id = $1", (1,), 0.01)
+        log.record(None, "SELECT * FROM products WHERE id = $1", (2,), 0.25)
+        log.record(None, "SELECT count(*) FROM users", (), 0.02)
+
+        top = log.top()
+        assert top[0]["fingerprint"] == "select * from products where id = ?"
+        assert top[0]["count"] == 2
+        assert top[0]["slow_count"] == 1
+        assert top[0]["max_ms"] == 250.0
+        assert top[0]["samples"][0]["parameters"] == "(2,)"
+        assert log.top(order_by="count")[0]["count"] == 2
+
+    def test_parameters_not_kept_by_default(self):
+        """Test that parameters (possibly personal data) are opt-in."""
+        from app.core.slow_queries import SlowQueryLog
+
+        log = SlowQueryLog(threshold_ms=0)
+        log.record(None, "SELECT * FROM users WHERE email = $1", ("bee@example.com",), 0.5)
+        assert "parameters" not in log.top()[0]["samples"][0]
+
+    def test_fingerprint_cap_evicts_cheapest(self):
+        """Test that the number of tracked fingerprints is bounded."""
+        from app.core.slow_queries import SlowQueryLog
+
+        log = SlowQueryLog(threshold_ms=1000, max_fingerprints=2)
+        log.record(None, "SELECT a FROM t", (), 0.5)
+        log.record(None, "SELECT b FROM t", (), 0.001)
+        log.record(None, "SELECT c FROM t", (), 0.2)
+        assert [q["fingerprint"] for q in log.top()] == ["select a from t", "select c from t"]
+
+
+class TestSlowQueryEndpoint:
+    """Tests for the admin endpoint."""
+
+    async def test_admin_sees_top_queries(
+        self, async_client: AsyncClient, admin_headers: dict, test_product: dict
+    ):
+        """Test that statements run by requests are aggregated and listed."""
+        from app.core.slow_queries import slow_query_log
+
+        slow_query_log.reset()
+        for _ in range(3):
+            await async_client.get(f"/api/v1/products/{test_product['id']}")
+
+        response = await async_client.get(
+            "/api/v1/analytics/slow-queries?order_by=count", headers=admin_headers
+        )
+        assert response.status_code == 200
+        queries = response.json()["queries"]
+        product_lookup = next(q for q in queries if "from products" in q["fingerprint"] and "where products.id = ?" in q["fingerprint"])
+        assert product_lookup["count"] >= 3
+
+        response = await async_client.delete("/api/v1/analytics/slow-queries", headers=admin_headers)
+        assert response.status_code == 200
+
+    async def test_requires_admin(self, async_client: AsyncClient, auth_headers: dict):
+        """Test that customers cannot read the query log."""
+        response = await async_client.get("/api/v1/analytics/slow-queries", headers=auth_headers)
+        assert response.status_code == 403
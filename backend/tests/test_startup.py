@@ -0,0 +1,83 @@
+"""
+Startup tests.
+Tests that API startup stays free of subsystems that load on first use.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+pytestmark = pytest.mark.startup
+
+
+class TestImports:
+    """Tests for what importing the app pulls in."""
+
+    def test_app_import_defers_heavy_subsystems(self):
+        """Test that numpy, the AI services and SMTP are not imported with the app."""
+        from benchmarks.importtime import DEFERRED_MODULES
+
+        env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+        code = (
+            "import sys, app.main\n"
+            f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(__file__)),
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
+
+    def test_importtime_parser(self):
+        """Test that -X importtime output is parsed with nesting depth."""
+        from benchmarks.importtime import by_package, parse
+
+        records = parse(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |     sqlalchemy.sql\n"
+            "import time:        50 |        150 |   sqlalchemy\n"
+            "import time:        20 |         20 |   app.api.deps\n"
+            "import time:        30 |        200 | app.main\n"
+        )
+        assert [(r.name, r.depth) for r in records] == [
+            ("sqlalchemy.sql", 2), ("sqlalchemy", 1), ("app.api.deps", 1), ("app.main", 0)
+        ]
+        assert by_package(records) == {"sqlalchemy": 150, "app.api": 20, "app.main": 30}
+
+
+class TestOpenAIKey:
+    """Tests for running without an OpenAI key."""
+
+    def test_missing_key_fails_on_first_use(self, monkeypatch):
+        """Test that the OpenAI backends only need the key when they are used."""
+        from app.core.config import settings
+        from app.services.embeddings import OpenAIEmbedder
+        from app.services.llm import OpenAIChatClient
+
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+        for client in (OpenAIChatClient(), OpenAIEmbedder()):
+            with pytest.raises(RuntimeError, match="OPENAI_API_KEY"):
+                client._get_client()
+
+
+class TestBenchmarkEnvironment:
+    """Tests for running the load benchmark without external services."""
+
+    def test_every_store_runs_in_process(self):
+        """Test that the benchmark moves every *_BACKEND store off Redis, not only the ones it lists."""
+        env = {key: value for key, value in os.environ.items() if not key.endswith("_BACKEND")}
+        code = (
+            "import benchmarks.load\n"
+            "from app.core.config import settings\n"
+            "print(sorted({getattr(settings, name) for name in type(settings).model_fields\n"
+            "              if name.endswith('_BACKEND') and name != 'CELERY_RESULT_BACKEND'}))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(__file__)),
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "['memory']"
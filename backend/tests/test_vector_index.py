@@ -0,0 +1,267 @@
+"""
+Vector index tests.
+Tests for the in-process NumPy index and "similar honeys" on the product page.
+"""
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+from app.services.vector_index import VectorIndex
+
+
+pytestmark = pytest.mark.products
+
+
+def _unit(dim: int, *hot: int) -> list:
+    vector = [0.0] * dim
+    for i in hot:
+        vector[i] = 1.0
+    return vector
+
+
+class TestVectorIndex:
+    """Tests for VectorIndex add/remove/search/persistence."""
+
+    def test_search_orders_by_cosine_similarity(self):
+        """Test that the best match comes first and k is respected."""
+        index = VectorIndex(dim=4)
+        index.add([1, 2, 3], [_unit(4, 0), _unit(4, 0, 1), _unit(4, 2)])
+        results = index.search([_unit(4, 0)], k=2)[0]
+        assert [item_id for item_id, _ in results] == [1, 2]
+        assert results[0][1] == pytest.approx(1.0)
+
+    def test_batched_queries(self):
+        """Test several queries are answered in one call."""
+        index = VectorIndex(dim=4)
+        index.add([1, 2], [_unit(4, 0), _unit(4, 3)])
+        results = index.search([_unit(4, 3), _unit(4, 0)], k=1)
+        assert [r[0][0] for r in results] == [2, 1]
+
+    def test_remove_keeps_remaining_rows_addressable(self):
+        """Test removing a middle row moves the last row into its place."""
+        index = VectorIndex(dim=4)
+        index.add([1, 2, 3], [_unit(4, 0), _unit(4, 1), _unit(4, 2)])
+        index.remove([1, 99])
+        assert len(index) == 2
+        assert 1 not in index
+        assert index.search([_unit(4, 2)], k=1)[0][0][0] == 3
+
+    def test_add_replaces_existing_vector(self):
+        """Test re-adding an id updates it instead of duplicating it."""
+        index = VectorIndex(dim=4)
+        index.add([1], [_unit(4, 0)])
+        index.add([1], [_unit(4, 3)])
+        assert len(index) == 1
+        assert index.search([_unit(4, 3)], k=1)[0][0][0] == 1
+
+    def test_similar_excludes_self(self):
+        """Test similar() never recommends the product itself."""
+        index = VectorIndex(dim=4)
+        index.add([1, 2, 3], [_unit(4, 0), _unit(4, 0, 1), _unit(4, 3)])
+        assert [item_id for item_id, _ in index.similar(1, k=1)] == [2]
+
+    def test_save_and_memory_mapped_load(self, tmp_path):
+        """Test a saved index loads memory-mapped and becomes writable on first add."""
+        index = VectorIndex(dim=4)
+        index.add([1, 2], [_unit(4, 0), _unit(4, 1)])
+        index.save(str(tmp_path))
+
+        loaded = VectorIndex(dim=4)
+        assert loaded.load(str(tmp_path))
+        assert isinstance(loaded._vectors, np.memmap)
+        assert loaded.search([_unit(4, 1)], k=1)[0][0][0] == 2
+
+        loaded.add([3], [_unit(4, 2)])
+        assert len(loaded) == 3
+        assert not isinstance(loaded._vectors, np.memmap)
+
+    def test_snapshot_keeps_its_version(self, tmp_path):
+        """Test that a snapshot loads at the version it was built at, not at a later one."""
+        index = VectorIndex(dim=4)
+        index.add([1], [_unit(4, 0)])
+        index.loaded, index.version = True, 3
+        index.save(str(tmp_path))
+
+        loaded = VectorIndex(dim=4)
+        assert loaded.load(str(tmp_path))
+        assert loaded.version == 3
+
+    def test_load_missing_path(self, tmp_path):
+        """Test loading from an empty directory reports nothing was loaded."""
+        assert not VectorIndex(dim=4).load(str(tmp_path / "missing"))
+
+
+class TestSimilarProducts:
+    """Tests for similar products on the product detail endpoint."""
+
+    async def test_read_product_includes_similar_ids(
+        self, async_client: AsyncClient, test_db
+    ):
+        """Test that similar products are ranked from the index."""
+        from app.models.all import Product
+        from app.services import embeddings
+
+        embeddings.set_embedder(embeddings.HashingEmbedder())
+        try:
+            products = [
+                Product(name="Manuka Honey", category="Premium", price=45.0,
+                        description="Manuka honey from New Zealand"),
+                Product(name="Manuka Honey UMF 20", category="Premium", price=65.0,
+                        description="Strong manuka honey from New Zealand"),
+                Product(name="Beeswax Candle", category="Gifts", price=9.0,
+                        description="Hand poured candle"),
+            ]
+            test_db.add_all(products)
+            await test_db.commit()
+            await embeddings.embed_products(test_db)
+        finally:
+            embeddings.set_embedder(None)
+
+        response = await async_client.get(f"/api/v1/products/{products[0].id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert products[0].id not in data["similar_product_ids"]
+        assert data["similar_product_ids"][0] == products[1].id
+
+    async def test_deleted_product_leaves_index(
+        self, async_client: AsyncClient, admin_headers: dict, test_db
+    ):
+        """Test that deleting a product removes it from recommendations."""
+        from app.models.all import Product
+        from app.services.vector_index import product_index
+
+        product = Product(name="Short Lived Honey", price=5.0)
+        test_db.add(product)
+        await test_db.commit()
+        product_index.add([product.id], [_unit(product_index.dim, 0)])
+
+        response = await async_client.delete(f"/api/v1/products/{product.id}", headers=admin_headers)
+        assert response.status_code == 200
+        assert product.id not in product_index
+
+
+class TestIndexVersion:
+    """Tests for keeping each worker's copy of the index current."""
+
+    async def _embedded_products(self, test_db) -> list:
+        from app.models.all import Product
+        from app.services import embeddings
+
+        embeddings.set_embedder(embeddings.HashingEmbedder())
+        try:
+            products = [Product(name="Clover Honey", price=8.0), Product(name="Heather Honey", price=11.0)]
+            test_db.add_all(products)
+            await test_db.commit()
+            await embeddings.embed_products(test_db)
+        finally:
+            embeddings.set_embedder(None)
+        return products
+
+    async def test_other_worker_rebuilds_after_change(
+        self, async_client: AsyncClient, admin_headers: dict, test_db
+    ):
+        """Test that a product deactivated through one worker leaves another worker's index."""
+        products = await self._embedded_products(test_db)
+        other_worker = VectorIndex()
+        await other_worker.ensure_loaded(test_db)
+        assert products[0].id in other_worker
+
+        response = await async_client.put(
+            f"/api/v1/products/{products[0].id}", headers=admin_headers,
+            json={"name": "Clover Honey", "price": 8.0, "is_active": False},
+        )
+        assert response.status_code == 200
+
+        await other_worker.ensure_loaded(test_db)
+        assert products[0].id not in other_worker
+        assert products[1].id in other_worker
+
+    async def test_current_index_is_not_rebuilt(self, test_db, monkeypatch):
+        """Test that an index at the published version is used as it is."""
+        await self._embedded_products(test_db)
+        index = VectorIndex()
+        await index.ensure_loaded(test_db)
+
+        loads = []
+        monkeypatch.setattr(index, "load_from_db", lambda *args, **kwargs: loads.append(1))
+        await index.ensure_loaded(test_db)
+        assert loads == []
+
+    async def test_version_unavailable_keeps_loaded_index(self, test_db):
+        """Test that a Redis outage serves the loaded index instead of failing the request."""
+        from app.services.index_version import IndexVersion, set_index_version
+
+        class Down(IndexVersion):
+            async def current(self) -> int:
+                raise ConnectionError("redis down")
+
+        products = await self._embedded_products(test_db)
+        index = VectorIndex()
+        await index.ensure_loaded(test_db)
+
+        set_index_version(Down())
+        await index.ensure_loaded(test_db)
+        assert products[0].id in index
+
+    async def test_stale_snapshot_is_rebuilt(self, test_db, tmp_path, monkeypatch):
+        """Test that a snapshot saved before the latest write is not served as current."""
+        from app.core.config import settings
+        from app.services.index_version import get_index_version
+
+        products = await self._embedded_products(test_db)
+        monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", str(tmp_path))
+        snapshot = VectorIndex()
+        await snapshot.refresh(test_db)
+        snapshot.remove([products[0].id])  # As if saved before products[0] was embedded
+        snapshot.save(str(tmp_path))
+
+        current = VectorIndex()
+        await current.ensure_loaded(test_db)
+        assert isinstance(current._vectors, np.memmap)
+
+        await get_index_version().bump()
+        stale = VectorIndex()
+        await stale.ensure_loaded(test_db)
+        assert not isinstance(stale._vectors, np.memmap)
+        assert products[0].id in stale
+        assert stale.version == await get_index_version().current()
+
+    async def test_writer_adopts_its_own_change(
+        self, async_client: AsyncClient, admin_headers: dict, test_db, monkeypatch
+    ):
+        """Test that the worker serving a write updates its copy in place instead of rebuilding it."""
+        from app.services.vector_index import product_index
+
+        products = await self._embedded_products(test_db)
+        await product_index.ensure_loaded(test_db)
+        rebuilds = []
+        original = product_index.load_from_db
+        monkeypatch.setattr(
+            product_index, "load_from_db", lambda *args, **kwargs: rebuilds.append(1) or original(*args, **kwargs)
+        )
+        path = f"/api/v1/products/{products[0].id}"
+
+        await async_client.put(
+            path, headers=admin_headers, json={"name": "Clover Honey", "price": 8.0, "is_active": False}
+        )
+        await product_index.ensure_loaded(test_db)
+        assert products[0].id not in product_index
+
+        await async_client.put(
+            path, headers=admin_headers, json={"name": "Clover Honey", "price": 8.0, "is_active": True}
+        )
+        await product_index.ensure_loaded(test_db)
+        assert products[0].id in product_index
+        assert rebuilds == []
+
+    async def test_version_is_not_adopted_over_another_workers_change(self, test_db):
+        """Test that a copy that missed another worker's bump still rebuilds after its own."""
+        from app.services.index_version import get_index_version
+
+        await self._embedded_products(test_db)
+        index = VectorIndex()
+        await index.ensure_loaded(test_db)
+
+        await get_index_version().bump()  # Another worker's write
+        index.adopt_version(await get_index_version().bump())
+        assert index.version != await get_index_version().current()
@@ -0,0 +1,164 @@
+"""
+Background worker tests.
+Tests for queue routing, eager task execution and request batching.
+"""
+import asyncio
+import pytest
+
+
+pytestmark = pytest.mark.worker
+
+
+@pytest.fixture
+def eager_worker():
+    """Run tasks inline with a stub model and a batching local embedder."""
+    from app.services.batching import BatchingEmbedder
+    from app.services.embeddings import HashingEmbedder, set_embedder
+    from app.services.llm import StubLLM, set_llm
+    from app.services.semantic_cache import InMemorySemanticCache, set_semantic_cache
+    from app.worker.celery_app import celery_app
+
+    celery_app.conf.task_always_eager = True
+    llm = StubLLM()
+    embedder = BatchingEmbedder(HashingEmbedder(dim=256))
+    set_llm(llm)
+    set_embedder(embedder)
+    set_semantic_cache(InMemorySemanticCache(llm=llm))
+    yield llm, embedder
+    celery_app.conf.task_always_eager = False
+    set_llm(None)
+    set_embedder(None)
+    set_semantic_cache(None)
+
+
+class TestRouting:
+    """Tests for task routing."""
+
+    @pytest.mark.parametrize("task_name,queue", [
+        ("ai.embed_products", "ai"),
+        ("ai.answer_questions", "ai"),
+        ("email.send", "email"),
+        ("analytics.recompute_ratings", "analytics"),
+        ("analytics.rollup_logins", "analytics"),
+    ])
+    def test_tasks_route_to_their_queue(self, task_name: str, queue: str):
+        """Test that each task family lands on its own queue."""
+        from app.worker.celery_app import celery_app
+        import app.worker.tasks  # noqa: F401  (registers the tasks)
+
+        assert task_name in celery_app.tasks
+        assert celery_app.amqp.router.route({}, task_name)["queue"].name == queue
+
+
+class TestEagerTasks:
+    """Tests for running tasks without a broker."""
+
+    def test_answer_questions_batches_and_dedupes(self, eager_worker):
+        """Test that duplicate questions share one LLM call and embeddings share one request."""
+        from app.worker.tasks import answer_questions
+
+        llm, embedder = eager_worker
+        questions = ["is raw honey safe", "is raw honey safe", "how to store comb honey"]
+        answers = answer_questions.delay(questions).get()
+
+        assert answers[0] == answers[1] == "Stub answer: is raw honey safe"
+        assert answers[2] == "Stub answer: how to store comb honey"
+        assert llm.calls == 2
+        assert embedder.stats == {"batches": 1, "items": 2}
+
+    async def test_eager_task_from_running_loop(self, eager_worker):
+        """Test that an eager task can be enqueued from async code."""
+        from app.worker.tasks import answer_questions
+
+        assert answer_questions.delay(["hello"]).get() == ["Stub answer: hello"]
+
+    def test_send_email_unconfigured(self, eager_worker):
+        """Test that an unconfigured SMTP server is reported, not retried."""
+        from app.worker.tasks import send_email
+
+        result = send_email.delay("a@example.com", "order_shipped", {}).get()
+        assert result["success"] is False
+
+
+class TestTaskQueue:
+    """Tests for handing tasks from the API to the workers."""
+
+    async def test_publishes_by_name(self, monkeypatch):
+        """Test that tasks are sent by name onto the broker."""
+        from app.services.task_queue import CeleryTaskQueue
+        from app.worker.celery_app import celery_app
+
+        sent = []
+        monkeypatch.setattr(celery_app, "send_task", lambda name, args: sent.append((name, args)))
+        await CeleryTaskQueue().enqueue("ai.embed_products", [7])
+        assert sent == [("ai.embed_products", ([7],))]
+
+    async def test_eager_runs_inline(self, eager_worker, monkeypatch):
+        """Test that eager mode runs the task instead of publishing it."""
+        from app.services.email import email_service
+        from app.services.task_queue import CeleryTaskQueue
+
+        sent = []
+        monkeypatch.setattr(email_service, "send_email", lambda *args: sent.append(args) or {"success": True})
+        await CeleryTaskQueue().enqueue("email.send", "a@example.com", "order_shipped", {})
+        assert sent == [("a@example.com", "order_shipped", {})]
+
+    async def test_enqueue_never_raises(self):
+        """Test that an unreachable broker is reported, not raised."""
+        from app.services.task_queue import TaskQueue, enqueue, set_task_queue
+
+        class DownQueue(TaskQueue):
+            async def enqueue(self, name, *args):
+                raise ConnectionError("broker down")
+
+        set_task_queue(DownQueue())
+        try:
+            assert await enqueue("email.send", "a@example.com", "order_shipped", {}) is False
+        finally:
+            set_task_queue(None)
+
+
+class TestMicroBatcher:
+    """Tests for coalescing concurrent calls."""
+
+    async def test_concurrent_submits_share_one_call(self):
+        """Test that items submitted together are sent as one batch, in order."""
+        from app.services.batching import MicroBatcher
+
+        calls = []
+
+        async def double(items):
+            calls.append(list(items))
+            return [i * 2 for i in items]
+
+        batcher = MicroBatcher(double, max_size=100, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        assert results == [i * 2 for i in range(10)]
+        assert calls == [list(range(10))]
+
+    async def test_full_batch_flushes_early(self):
+        """Test that batches never exceed max_size."""
+        from app.services.batching import MicroBatcher
+
+        sizes = []
+
+        async def echo(items):
+            sizes.append(len(items))
+            return items
+
+        batcher = MicroBatcher(echo, max_size=2, max_wait=10)
+        assert await batcher.submit_many([1, 2, 3, 4]) == [1, 2, 3, 4]
+        assert sizes == [2, 2]
+
+    async def test_failure_reaches_every_caller(self):
+        """Test that a failed batch raises in every waiting caller."""
+        from app.services.batching import MicroBatcher
+
+        async def broken(items):
+            raise RuntimeError("provider down")
+
+        batcher = MicroBatcher(broken, max_size=10, max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)